@@ -2,13 +2,24 @@ from abc import ABC, abstractmethod
 from typing import List, Optional, Dict
 import requests
 from ..models import EventNormalized
+from ..time_window import TimeWindow
 
 
 class BaseAggregator(ABC):
     """Base class for all feed aggregators."""
 
-    def __init__(self, session: Optional[requests.Session] = None):
+    def __init__(
+        self,
+        session: Optional[requests.Session] = None,
+        time_window: Optional[TimeWindow] = None,
+    ):
         self.session = session or requests.Session()
+        # Horizonte de fechas: los eventos fuera se descartan antes de normalizar
+        self.time_window = time_window
+
+    def _in_time_window(self, dtstart) -> bool:
+        """Indica si un evento con este DTSTART debe procesarse."""
+        return self.time_window is None or self.time_window.contains(dtstart)
 
     @abstractmethod
     def extract(
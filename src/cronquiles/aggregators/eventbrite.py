@@ -7,6 +7,7 @@ from bs4 import BeautifulSoup
 
 from .base import BaseAggregator
 from ..models import EventNormalized
+from ..time_window import TimeWindow
 
 logger = logging.getLogger(__name__)
 
@@ -213,8 +214,8 @@ class EventbriteExtractor:
 class EventbriteAggregator(BaseAggregator):
     """Aggregator for Eventbrite URLs (Organizers or Single Events)."""
 
-    def __init__(self, session=None):
-        super().__init__(session)
+    def __init__(self, session=None, time_window: Optional[TimeWindow] = None):
+        super().__init__(session, time_window)
         self.extractor = EventbriteExtractor(self.session)
 
     def extract(
@@ -230,7 +231,11 @@ class EventbriteAggregator(BaseAggregator):
         events = []
         try:
             raw_data = self.extractor.extract_from_url(url)
+            skipped = 0
             for data in raw_data:
+                if not self._in_time_window(data.get("dtstart")):
+                    skipped += 1
+                    continue
                 try:
                     # Use provided name as organizer if missing
                     if name and not data.get("organizer"):
@@ -242,6 +247,10 @@ class EventbriteAggregator(BaseAggregator):
                     events.append(event_norm)
                 except Exception as e:
                     logger.error(f"Error converting Eventbrite event from {url}: {e}")
+            if skipped:
+                logger.info(
+                    f"Skipped {skipped} Eventbrite events outside {self.time_window}"
+                )
         except Exception as e:
             logger.error(f"Failed to process Eventbrite feed {url}: {e}")
 
@@ -5,6 +5,7 @@ from typing import Dict, List, Optional
 import requests
 
 from ..models import EventNormalized
+from ..time_window import TimeWindow
 from .base import BaseAggregator
 
 logger = logging.getLogger(__name__)
@@ -16,8 +17,13 @@ class GdgCommunityDev(BaseAggregator):
     Usa el api publico para recabar los eventos.
     """
 
-    def __init__(self, session: Optional[requests.Session] = None):
+    def __init__(
+        self,
+        session: Optional[requests.Session] = None,
+        time_window: Optional[TimeWindow] = None,
+    ):
         self.session = session or requests.Session()
+        self.time_window = time_window
 
     def extract(
         self, source: str | Dict, feed_name: Optional[str] = None
@@ -62,7 +68,11 @@ class GdgCommunityDev(BaseAggregator):
                 return []
             events = []
             raw_events = data.get("results", [])
+            skipped = 0
             for event in raw_events:
+                if not self._in_time_window(event.get("start_date_iso")):
+                    skipped += 1
+                    continue
                 try:
                     event_norm = self._payload_to_normalized(event, url, name)
                     events.append(event_norm)
@@ -70,6 +80,10 @@ class GdgCommunityDev(BaseAggregator):
                     logger.error(
                         f"Error converting GdgCommunityDev event from {url}: {e}"
                     )
+            if skipped:
+                logger.info(
+                    f"Skipped {skipped} GdgCommunityDev events outside {self.time_window}"
+                )
             return events
         except Exception as e:
             logger.error(f"Failed to process GdgCommunityDev feed {url}: {e}")
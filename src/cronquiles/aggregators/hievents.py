@@ -3,6 +3,7 @@ import requests
 from typing import List, Optional, Dict
 from .base import BaseAggregator
 from ..models import EventNormalized
+from ..time_window import TimeWindow
 
 logger = logging.getLogger(__name__)
 
@@ -13,8 +14,12 @@ class HiEventsAggregator(BaseAggregator):
     Uses the public API instead of scraping to get reliable data.
     """
 
-    def __init__(self, session: Optional[requests.Session] = None):
-        super().__init__(session)
+    def __init__(
+        self,
+        session: Optional[requests.Session] = None,
+        time_window: Optional[TimeWindow] = None,
+    ):
+        super().__init__(session, time_window)
         self.session.headers.update({"Accept": "application/json"})
 
     def extract(
@@ -54,7 +59,11 @@ class HiEventsAggregator(BaseAggregator):
             events = []
             # Hi.Events returns events in a 'data' array
             raw_events = data.get("data", [])
+            skipped = 0
             for raw in raw_events:
+                if not self._in_time_window(raw.get("start_date")):
+                    skipped += 1
+                    continue
                 try:
                     event_norm = self._map_to_normalized(raw, url, name)
                     if event_norm:
@@ -62,6 +71,10 @@ class HiEventsAggregator(BaseAggregator):
                 except Exception as e:
                     logger.error(f"Error mapping Hi.Events event: {e}")
 
+            if skipped:
+                logger.info(
+                    f"Skipped {skipped} Hi.Events events outside {self.time_window}"
+                )
             return events
         except Exception as e:
             logger.error(f"Failed to process Hi.Events feed {url}: {e}")
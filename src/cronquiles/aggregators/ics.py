@@ -1,13 +1,91 @@
 import logging
 import requests
+from concurrent.futures import Executor
 from typing import List, Optional, Dict
 from icalendar import Calendar
 from .base import BaseAggregator
 from ..models import EventNormalized
+from ..time_window import TimeWindow
 
 logger = logging.getLogger(__name__)
 
 
+def parse_ics_events(
+    text: str,
+    source_url: str,
+    feed_name: Optional[str] = None,
+    time_window: Optional[TimeWindow] = None,
+) -> List[EventNormalized]:
+    """
+    Parsea el cuerpo de un feed ICS y normaliza sus eventos.
+
+    Función de módulo (picklable) para poder ejecutarse en un pool de procesos:
+    recibe el texto crudo y devuelve los EventNormalized, que viajan de vuelta
+    con el evento original serializado de forma compacta.
+    """
+    try:
+        calendar = Calendar.from_ical(text)
+    except Exception as e:
+        logger.error(f"Error parsing feed {source_url}: {e}")
+        return []
+    return events_from_calendar(calendar, source_url, feed_name, time_window)
+
+
+def events_from_calendar(
+    calendar: Calendar,
+    source_url: str,
+    feed_name: Optional[str] = None,
+    time_window: Optional[TimeWindow] = None,
+) -> List[EventNormalized]:
+    """
+    Normaliza los VEVENT (no cancelados) de un calendario ya parseado.
+
+    Con `time_window`, los eventos cuyo DTSTART cae fuera de la ventana se
+    descartan antes de normalizarlos.
+    """
+    events = []
+    skipped = 0
+
+    # Try to infer feed name from calendar if not provided
+    if not feed_name:
+        cal_name = calendar.get("X-WR-CALNAME")
+        if cal_name:
+            if isinstance(cal_name, list):
+                cal_name = cal_name[0]
+            feed_name = str(cal_name)
+            # Cleanup bytes string repr
+            if "b'" in feed_name:
+                try:
+                    feed_name = eval(feed_name).decode("utf-8", errors="ignore")
+                except Exception:
+                    pass
+            logger.info(f"Using X-WR-CALNAME as feed name: {feed_name}")
+
+    for component in calendar.walk():
+        if component.name == "VEVENT":
+            try:
+                status = component.get("status", "").upper()
+                if status == "CANCELLED":
+                    continue
+
+                if time_window is not None:
+                    dtstart = component.get("dtstart")
+                    if not time_window.contains(getattr(dtstart, "dt", None)):
+                        skipped += 1
+                        continue
+
+                event_norm = EventNormalized(component, source_url, feed_name)
+                events.append(event_norm)
+            except Exception as e:
+                logger.warning(f"Error processing event from {source_url}: {e}")
+                continue
+
+    if skipped:
+        logger.info(f"Skipped {skipped} events outside {time_window} from {source_url}")
+    logger.info(f"Extracted {len(events)} events from {source_url}")
+    return events
+
+
 class GenericICSAggregator(BaseAggregator):
     """Aggregator for standard ICS feeds."""
 
@@ -16,23 +94,25 @@ class GenericICSAggregator(BaseAggregator):
         session: Optional[requests.Session] = None,
         timeout: int = 30,
         max_retries: int = 2,
+        parse_executor: Optional[Executor] = None,
+        time_window: Optional[TimeWindow] = None,
     ):
-        super().__init__(session)
+        super().__init__(session, time_window)
         self.timeout = timeout
         self.max_retries = max_retries
+        # Pool de procesos opcional para parsear/normalizar fuera del hilo de I/O
+        self.parse_executor = parse_executor
         self.session.headers.update({"User-Agent": "Cron-Quiles-ICS-Aggregator/1.0"})
 
-    def fetch_feed(self, url: str) -> Optional[Calendar]:
+    def fetch_feed_text(self, url: str) -> Optional[str]:
+        """Descarga el cuerpo crudo de un feed ICS (con reintentos), sin parsearlo."""
         for attempt in range(self.max_retries):
             try:
                 logger.info(f"Fetching feed: {url} (attempt {attempt + 1})")
                 response = self.session.get(url, timeout=self.timeout)
                 response.raise_for_status()
                 response.encoding = response.apparent_encoding or "utf-8"
-
-                calendar = Calendar.from_ical(response.text)
-                logger.info(f"Successfully parsed feed: {url}")
-                return calendar
+                return response.text
             except Exception as e:
                 logger.warning(f"Error fetching {url} (attempt {attempt + 1}): {e}")
                 if attempt == self.max_retries - 1:
@@ -42,41 +122,57 @@ class GenericICSAggregator(BaseAggregator):
 
         return None
 
-    def extract_events_from_calendar(
-        self, calendar: Calendar, source_url: str, feed_name: Optional[str] = None
+    def fetch_feed(self, url: str) -> Optional[Calendar]:
+        """
+        Descarga (con los reintentos de fetch_feed_text) y parsea un feed. Un
+        feed mal formado no se vuelve a descargar: el mismo cuerpo fallaría igual.
+        """
+        text = self.fetch_feed_text(url)
+        if text is None:
+            return None
+        try:
+            calendar = Calendar.from_ical(text)
+        except Exception as e:
+            logger.error(f"Error parsing feed {url}: {e}")
+            return None
+        logger.info(f"Successfully parsed feed: {url}")
+        return calendar
+
+    def fetch_and_parse(
+        self, url: str, source_url: str, feed_name: Optional[str] = None
     ) -> List[EventNormalized]:
-        events = []
-
-        # Try to infer feed name from calendar if not provided
-        if not feed_name:
-            cal_name = calendar.get("X-WR-CALNAME")
-            if cal_name:
-                if isinstance(cal_name, list):
-                    cal_name = cal_name[0]
-                feed_name = str(cal_name)
-                # Cleanup bytes string repr
-                if "b'" in feed_name:
-                    try:
-                        feed_name = eval(feed_name).decode("utf-8", errors="ignore")
-                    except Exception:
-                        pass
-                logger.info(f"Using X-WR-CALNAME as feed name: {feed_name}")
-
-        for component in calendar.walk():
-            if component.name == "VEVENT":
-                try:
-                    status = component.get("status", "").upper()
-                    if status == "CANCELLED":
-                        continue
+        """
+        Descarga un feed y normaliza sus eventos.
 
-                    event_norm = EventNormalized(component, source_url, feed_name)
-                    events.append(event_norm)
-                except Exception as e:
-                    logger.warning(f"Error processing event from {source_url}: {e}")
-                    continue
+        Con `parse_executor` el parseo y la normalización (CPU) se envían al
+        pool de procesos y este hilo solo espera el resultado; sin él se hace
+        en el mismo hilo, como siempre. Si el pool falla (proceso caído,
+        resultado que no se puede deserializar, pool ya cerrado) el feed se
+        parsea en este hilo con el texto ya descargado.
+        """
+        if self.parse_executor is None:
+            calendar = self.fetch_feed(url)
+            if calendar:
+                return self.extract_events_from_calendar(
+                    calendar, source_url, feed_name
+                )
+            return []
+
+        text = self.fetch_feed_text(url)
+        if text is None:
+            return []
+        try:
+            return self.parse_executor.submit(
+                parse_ics_events, text, source_url, feed_name, self.time_window
+            ).result()
+        except Exception as e:
+            logger.warning(f"Parse pool failed for {url}, parsing in-process: {e}")
+            return parse_ics_events(text, source_url, feed_name, self.time_window)
 
-        logger.info(f"Extracted {len(events)} events from {source_url}")
-        return events
+    def extract_events_from_calendar(
+        self, calendar: Calendar, source_url: str, feed_name: Optional[str] = None
+    ) -> List[EventNormalized]:
+        return events_from_calendar(calendar, source_url, feed_name, self.time_window)
 
     def extract(
         self, source: str | Dict, feed_name: Optional[str] = None
@@ -87,7 +183,4 @@ class GenericICSAggregator(BaseAggregator):
         if not url:
             return []
 
-        calendar = self.fetch_feed(url)
-        if calendar:
-            return self.extract_events_from_calendar(calendar, url, name)
-        return []
+        return self.fetch_and_parse(url, url, name)
@@ -1,10 +1,12 @@
 import logging
 import re
 import time
+from concurrent.futures import Executor
 from typing import List, Optional, Dict
 from urllib.parse import urlparse, parse_qs
 from .ics import GenericICSAggregator
 from ..models import EventNormalized
+from ..time_window import TimeWindow
 
 logger = logging.getLogger(__name__)
 
@@ -19,8 +21,10 @@ class LumaAggregator(GenericICSAggregator):
         max_retries: int = 2,
         url_cache: Optional[Dict] = None,
         skip_enrich: bool = False,
+        parse_executor: Optional[Executor] = None,
+        time_window: Optional[TimeWindow] = None,
     ):
-        super().__init__(session, timeout, max_retries)
+        super().__init__(session, timeout, max_retries, parse_executor, time_window)
         self.skip_enrich = skip_enrich
         # Cache persistente compartido con ICSAggregator
         self.url_cache = (
@@ -200,15 +204,11 @@ class LumaAggregator(GenericICSAggregator):
         # Convertir a URL de API para obtener el feed ICS
         fetch_url = self._convert_luma_url_to_ics(original_url)
 
-        # Obtener el calendario usando la URL de API
-        calendar = self.fetch_feed(fetch_url)
-        if not calendar:
-            return []
-
-        # Extraer eventos usando la URL ORIGINAL como source_url
+        # Obtener el calendario usando la URL de API y extraer eventos usando
+        # la URL ORIGINAL como source_url
         # (importante para que el matching de comunidades funcione en main.py)
         # La vanity URL está guardada en self.vanity_url_cache para uso en generate_json
-        events = self.extract_events_from_calendar(calendar, original_url, name)
+        events = self.fetch_and_parse(fetch_url, original_url, name)
 
         # Enrich events needing location
         to_enrich = [
@@ -1,8 +1,10 @@
 import logging
 import time
+from concurrent.futures import Executor
 from typing import List, Optional, Dict
 from .ics import GenericICSAggregator
 from ..models import EventNormalized
+from ..time_window import TimeWindow
 
 logger = logging.getLogger(__name__)
 
@@ -16,8 +18,10 @@ class MeetupAggregator(GenericICSAggregator):
         timeout: int = 30,
         max_retries: int = 2,
         skip_enrich: bool = False,
+        parse_executor: Optional[Executor] = None,
+        time_window: Optional[TimeWindow] = None,
     ):
-        super().__init__(session, timeout, max_retries)
+        super().__init__(session, timeout, max_retries, parse_executor, time_window)
         self.skip_enrich = skip_enrich
 
     def extract(
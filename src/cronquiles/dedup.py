@@ -0,0 +1,730 @@
+"""
+Dedup - Deduplicación difusa de eventos entre plataformas.
+
+`ICSAggregator.deduplicate_events` solo une eventos con el mismo `hash_key`
+(primeros 40 caracteres del título + bloque de 2 horas). Este módulo agrega una
+segunda etapa para copias del mismo evento con títulos escritos distinto
+("Python CDMX: Intro a FastAPI" vs "Intro a FastAPI - Python CDMX"):
+
+1. Blocking por tiempo: solo se comparan eventos de la misma ventana (UTC) de
+   `time_tolerance_hours` o de la ventana vecina, sin importar el organizador
+   (las plataformas lo escriben distinto).
+2. Dentro de cada ventana se compara el conjunto de tokens del título
+   (Jaccard). Las ventanas grandes usan MinHash + LSH para generar candidatos
+   sin comparar todos contra todos.
+3. Los pares similares y cercanos en tiempo se agrupan con union-find.
+
+Cada fusión queda registrada en una traza auditable.
+
+La etapa exacta previa (`group_duplicates`) une por UID del VEVENT, URL
+canónica del evento y hash_key, y con `TimeNeighborIndex` corrige los cortes de
+los bloques de 2 horas del hash (17:59Z y 18:00Z caen en bloques distintos).
+
+`DedupIndex` aplica las mismas reglas de forma incremental contra el historial
+persistido (ver HistoryManager.merge_events).
+"""
+
+import bisect
+import logging
+import re
+import zlib
+from itertools import combinations
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from dateutil import tz
+from unidecode import unidecode
+
+from .models import EventNormalized, canonical_url
+from .storage import JSONFile
+
+logger = logging.getLogger(__name__)
+
+# Palabras que no distinguen un evento de otro
+STOPWORDS = {
+    "a",
+    "al",
+    "and",
+    "at",
+    "con",
+    "de",
+    "del",
+    "el",
+    "en",
+    "for",
+    "in",
+    "la",
+    "las",
+    "los",
+    "of",
+    "on",
+    "para",
+    "por",
+    "the",
+    "to",
+    "un",
+    "una",
+    "with",
+    "y",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Primo de Mersenne para las permutaciones de MinHash
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def title_tokens(text: str) -> Set[str]:
+    """Conjunto de tokens significativos de un título (sin acentos ni stopwords)."""
+    if not text:
+        return set()
+    tokens = _TOKEN_RE.findall(unidecode(text).lower())
+    return {t for t in tokens if t not in STOPWORDS}
+
+
+def title_similarity(a: Set[str], b: Set[str]) -> float:
+    """
+    Similitud (Jaccard) entre dos conjuntos de tokens.
+
+    Un título contenido en otro no cuenta como el mismo evento: "Taller de
+    Python" y "Taller de Python avanzado" son sesiones distintas, igual que
+    "Tulsa: Guest Pass" y "Austin: Guest Pass".
+    """
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def time_block(start: float, tolerance: float) -> int:
+    """Ventana de tiempo (timestamp UTC // tolerancia en segundos) para el blocking."""
+    return int(start // tolerance)
+
+
+class _UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            # La raíz es siempre el índice menor: clusters estables
+            if rj < ri:
+                ri, rj = rj, ri
+            self.parent[rj] = ri
+
+
+class MinHashLSH:
+    """
+    MinHash + LSH por bandas, determinista (mismas permutaciones en cada ejecución).
+
+    Con `bands` x `rows` = `num_perm`, la probabilidad de que un par con Jaccard
+    s sea candidato es 1 - (1 - s^rows)^bands.
+    """
+
+    def __init__(self, num_perm: int = 32, bands: int = 16):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._band_ranges = [
+            (band * self.rows, (band + 1) * self.rows) for band in range(bands)
+        ]
+        # Coeficientes (a, b) derivados de forma determinista
+        self._perms = [
+            (
+                zlib.crc32(f"a{i}".encode()) * 2654435761 % _MERSENNE_PRIME | 1,
+                zlib.crc32(f"b{i}".encode()) * 40503 % _MERSENNE_PRIME,
+            )
+            for i in range(num_perm)
+        ]
+
+    def signature(self, tokens: Iterable[str]) -> Tuple[int, ...]:
+        hashes = [zlib.crc32(t.encode()) for t in tokens]
+        return tuple(
+            min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self._perms
+        )
+
+    def candidate_pairs(self, token_sets: List[Set[str]]) -> Set[Tuple[int, int]]:
+        """Pares (i, j), i < j, que comparten al menos una banda."""
+        buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+        for idx, tokens in enumerate(token_sets):
+            if not tokens:
+                continue
+            sig = self.signature(tokens)
+            for band, (start, end) in enumerate(self._band_ranges):
+                buckets.setdefault((band, sig[start:end]), []).append(idx)
+
+        pairs = set()
+        for members in buckets.values():
+            pairs.update(combinations(members, 2))
+        return pairs
+
+
+class TimeNeighborIndex:
+    """
+    Índice ordenado por (prefijo del título normalizado, dtstart).
+
+    Para cada prefijo guarda los timestamps ordenados, de modo que los vecinos
+    de un evento dentro de ±tolerancia se encuentran con bisect en O(log n),
+    sin importar en qué bloque de 2 horas de `_compute_hash` cayeron.
+    """
+
+    def __init__(
+        self,
+        events: List[EventNormalized],
+        time_tolerance_hours: float = 2,
+        prefix_len: int = 40,
+    ):
+        self.tolerance = timedelta(hours=time_tolerance_hours).total_seconds()
+        self.prefix_len = prefix_len
+        entries: Dict[str, List[Tuple[float, int]]] = {}
+        for idx, event in enumerate(events):
+            if not event.dtstart:
+                continue
+            ts = event.dtstart.astimezone(tz.UTC).timestamp()
+            entries.setdefault(self.prefix(event), []).append((ts, idx))
+
+        # Arreglos paralelos ordenados por timestamp (para bisect)
+        self._times: Dict[str, List[float]] = {}
+        self._indexes: Dict[str, List[int]] = {}
+        for key, items in entries.items():
+            items.sort()
+            self._times[key] = [ts for ts, _ in items]
+            self._indexes[key] = [idx for _, idx in items]
+
+    def prefix(self, event: EventNormalized) -> str:
+        """Misma truncación del título que `_compute_hash`."""
+        return event.title[: self.prefix_len] if event.title else ""
+
+    def neighbors(self, event: EventNormalized) -> List[int]:
+        """Índices de los eventos con el mismo prefijo a menos de la tolerancia."""
+        if not event.dtstart:
+            return []
+        key = self.prefix(event)
+        times = self._times.get(key)
+        if not times:
+            return []
+        ts = event.dtstart.astimezone(tz.UTC).timestamp()
+        # Intervalo abierto: dos sesiones exactamente a 2 h siguen separadas
+        lo = bisect.bisect_right(times, ts - self.tolerance)
+        hi = bisect.bisect_left(times, ts + self.tolerance)
+        return self._indexes[key][lo:hi]
+
+    def close_pairs(self) -> Iterable[Tuple[int, int]]:
+        """
+        Pares (anterior, posterior) con el mismo prefijo separados por menos de
+        la tolerancia, en orden de dtstart.
+        """
+        for key, times in self._times.items():
+            indexes = self._indexes[key]
+            start = 0
+            for pos in range(1, len(times)):
+                while times[pos] - times[start] >= self.tolerance:
+                    start += 1
+                for prev in range(start, pos):
+                    yield indexes[prev], indexes[pos]
+
+
+# URLs canónicas que identifican a un solo evento (no un calendario, grupo o sitio).
+# En Luma solo lu.ma/event/evt-...: lu.ma/{slug} puede ser un evento o un
+# calendario (lu.ma/cdmx-tech); los eventos de Luma se unen por UID.
+_EVENT_URL_RE = re.compile(
+    r"^(?:meetup\.com/events/\d+"
+    r"|eventbrite\.com/e/\d+"
+    r"|lu\.ma/event/evt-[A-Za-z0-9]+"
+    r"|gdg\.community\.dev/events/details/.+"
+    r"|.+/event/\d+(?:/.*)?)$"
+)
+
+# Un UID o URL compartido por eventos a más de este rango (recurrencias con el
+# mismo UID, página de un calendario) no identifica a un solo evento.
+MAX_EXACT_KEY_SPAN = timedelta(hours=24)
+
+
+def event_url_key(url: str) -> str:
+    """URL canónica si apunta a la página de un evento concreto, si no ""."""
+    canonical = canonical_url(url)
+    return canonical if canonical and _EVENT_URL_RE.match(canonical) else ""
+
+
+def exact_keys(uid: str, url: str) -> List[str]:
+    """Llaves exactas de un evento: UID del VEVENT y URL canónica del evento."""
+    keys = []
+    if uid:
+        keys.append(f"uid:{uid}")
+    url_key = event_url_key(url)
+    if url_key:
+        keys.append(f"url:{url_key}")
+    return keys
+
+
+class ExactKeyIndex:
+    """
+    Índice hash llave exacta (UID / URL canónica) -> eventos.
+
+    Se evalúa antes que la deduplicación por título/hora: reconoce en O(1) el
+    mismo evento que llega por dos feeds o cuyo título cambió entre descargas.
+    """
+
+    def __init__(self, events: List[EventNormalized]):
+        self._entries: Dict[str, List[int]] = {}
+        for idx, event in enumerate(events):
+            if not event.dtstart:
+                continue
+            for key in exact_keys(event.uid, event.url):
+                self._entries.setdefault(key, []).append(idx)
+        self._starts = {
+            idx: events[idx].dtstart.astimezone(tz.UTC)
+            for members in self._entries.values()
+            for idx in members
+        }
+
+    def groups(self) -> Iterable[List[int]]:
+        """Grupos de eventos que comparten una llave y caen en el mismo rango de 24 h."""
+        for members in self._entries.values():
+            if len(members) < 2:
+                continue
+            starts = [self._starts[idx] for idx in members]
+            if max(starts) - min(starts) > MAX_EXACT_KEY_SPAN:
+                continue
+            yield members
+
+
+def group_duplicates(
+    events: List[EventNormalized], time_tolerance_hours: float = 2
+) -> List[List[EventNormalized]]:
+    """
+    Agrupa eventos duplicados, en este orden:
+
+    1. Llaves exactas (UID / URL canónica del evento), ver ExactKeyIndex
+    2. Mismo hash_key
+    3. Mismo prefijo de título a menos de la tolerancia, aunque el redondeo a
+       bloques de 2 horas los haya separado (TimeNeighborIndex). Dos grupos
+       solo se unen si el resultado sigue abarcando menos de la tolerancia: una
+       serie del mismo título cada hora no se encadena en un solo evento.
+
+    Los grupos se devuelven en el orden de aparición de su primer evento.
+    """
+    uf = _UnionFind(len(events))
+
+    for members in ExactKeyIndex(events).groups():
+        for idx in members[1:]:
+            uf.union(members[0], idx)
+
+    first_by_hash: Dict[str, int] = {}
+    for idx, event in enumerate(events):
+        uf.union(first_by_hash.setdefault(event.hash_key, idx), idx)
+
+    # Raíz -> (primer, último) dtstart del grupo
+    spans: Dict[int, Tuple[datetime, datetime]] = {}
+    for idx, event in enumerate(events):
+        if not event.dtstart:
+            continue
+        start = event.dtstart.astimezone(tz.UTC)
+        root = uf.find(idx)
+        first, last = spans.get(root, (start, start))
+        spans[root] = (min(first, start), max(last, start))
+
+    tolerance = timedelta(hours=time_tolerance_hours)
+    for a, b in TimeNeighborIndex(events, time_tolerance_hours).close_pairs():
+        ra, rb = uf.find(a), uf.find(b)
+        if ra == rb:
+            continue
+        first = min(spans[ra][0], spans[rb][0])
+        last = max(spans[ra][1], spans[rb][1])
+        if last - first >= tolerance:
+            continue
+        uf.union(ra, rb)
+        spans[uf.find(ra)] = (first, last)
+
+    groups: Dict[int, List[EventNormalized]] = {}
+    for idx, event in enumerate(events):
+        groups.setdefault(uf.find(idx), []).append(event)
+    return list(groups.values())
+
+
+class FuzzyDeduplicator:
+    """
+    Une eventos duplicados con títulos distintos dentro de ventanas de tiempo.
+
+    Args:
+        threshold: Similitud mínima de títulos (ver title_similarity)
+        time_tolerance_hours: Diferencia máxima entre los dtstart de un par
+        lsh_min_block: Tamaño de bloque a partir del cual se usa MinHash/LSH
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.85,
+        time_tolerance_hours: float = 2,
+        lsh_min_block: int = 32,
+        lsh: Optional[MinHashLSH] = None,
+    ):
+        self.threshold = threshold
+        self.time_tolerance = timedelta(hours=time_tolerance_hours)
+        self.lsh_min_block = lsh_min_block
+        self.lsh = lsh or MinHashLSH()
+
+    def block_key(self, event: EventNormalized) -> Optional[int]:
+        """Ventana de tiempo del evento (ver time_block), o None si no tiene fecha."""
+        if not event.dtstart:
+            return None
+        return time_block(
+            event.dtstart.astimezone(tz.UTC).timestamp(),
+            self.time_tolerance.total_seconds(),
+        )
+
+    def deduplicate(
+        self, events: List[EventNormalized]
+    ) -> Tuple[List[EventNormalized], List[Dict]]:
+        """
+        Returns:
+            (eventos deduplicados, traza de fusiones)
+        """
+        blocks: Dict[int, List[int]] = {}
+        # Misma conversión a UTC que _compute_hash (naive = hora local)
+        starts = [e.dtstart.astimezone(tz.UTC) if e.dtstart else None for e in events]
+        for idx, event in enumerate(events):
+            key = self.block_key(event)
+            if key is not None:
+                blocks.setdefault(key, []).append(idx)
+
+        uf = _UnionFind(len(events))
+        pair_scores: List[Tuple[int, float]] = []
+
+        for block, own in blocks.items():
+            # La ventana y la siguiente: los pares a menos de la tolerancia
+            # quedan en la misma ventana o en vecinas
+            members = own + blocks.get(block + 1, [])
+            if len(members) < 2:
+                continue
+            token_sets = [title_tokens(events[idx].summary) for idx in members]
+
+            if len(members) >= self.lsh_min_block:
+                local_pairs = self.lsh.candidate_pairs(token_sets)
+            else:
+                local_pairs = combinations(range(len(members)), 2)
+
+            for i, j in local_pairs:
+                if min(i, j) >= len(own):
+                    # Los dos son de la ventana siguiente: se comparan en su turno
+                    continue
+                a, b = members[i], members[j]
+                if abs(starts[a] - starts[b]) > self.time_tolerance:
+                    continue
+                score = title_similarity(token_sets[i], token_sets[j])
+                if score >= self.threshold:
+                    uf.union(a, b)
+                    pair_scores.append((a, score))
+
+        clusters: Dict[int, List[int]] = {}
+        for idx in range(len(events)):
+            clusters.setdefault(uf.find(idx), []).append(idx)
+
+        cluster_scores: Dict[int, List[float]] = {}
+        for idx, score in pair_scores:
+            cluster_scores.setdefault(uf.find(idx), []).append(score)
+
+        result = []
+        trace = []
+        for root in sorted(clusters):
+            members = clusters[root]
+            if len(members) == 1:
+                result.append(events[members[0]])
+                continue
+
+            group = [events[i] for i in members]
+            selected = merge_group(group)
+            result.append(selected)
+
+            trace.append(
+                {
+                    "kept": _trace_entry(selected),
+                    "merged": [_trace_entry(e) for e in group if e is not selected],
+                    "block": datetime.fromtimestamp(
+                        self.block_key(selected) * self.time_tolerance.total_seconds(),
+                        tz.UTC,
+                    ).isoformat(),
+                    "min_similarity": round(min(cluster_scores[root]), 3),
+                }
+            )
+            logger.info(
+                f"Deduplicado (difuso): conservado '{selected.summary}' "
+                f"de {len(group)} eventos similares (fuentes: {len(selected.sources)})"
+            )
+
+        return result, trace
+
+
+def merge_group(group: List[EventNormalized]) -> EventNormalized:
+    """
+    Conserva el mejor evento de un grupo de duplicados (con URL y descripción
+    más larga) y combina las URLs de los demás en su campo sources.
+    """
+    group = sorted(
+        group,
+        key=lambda e: (
+            bool(e.url and e.url.startswith("http")),
+            len(e.description),
+        ),
+        reverse=True,
+    )
+    selected = group[0]
+    for duplicate in group[1:]:
+        for dup_url in duplicate.sources:
+            if (
+                dup_url
+                and dup_url.startswith("http")
+                and dup_url not in selected.sources
+            ):
+                selected.sources.append(dup_url)
+    return selected
+
+
+def _trace_entry(event: EventNormalized) -> Dict:
+    return {
+        "title": event.summary,
+        "organizer": event.organizer,
+        "dtstart": event.dtstart.isoformat() if event.dtstart else None,
+        "url": event.url,
+        "hash_key": event.hash_key,
+    }
+
+
+# Cambiar al modificar las llaves o las reglas de DedupIndex: un índice de otra
+# versión se descarta y se vuelve a deduplicar el historial completo una vez.
+DEDUP_INDEX_VERSION = 4
+
+
+class DedupIndex:
+    """
+    Índice persistente de deduplicación del historial: llave -> id canónico.
+
+    El id canónico es la llave del evento en el historial (su hash_key). Las
+    llaves son el hash_key, el UID y la URL canónica del evento y los de todas
+    las copias que se le unieron en corridas anteriores (alias). Por cada id se
+    guarda además lo necesario para las comparaciones por tiempo y difusas, así
+    que un evento nuevo se compara solo contra sus candidatos, sin reconstruir
+    ni volver a deduplicar el historial completo.
+    """
+
+    def __init__(
+        self,
+        time_tolerance_hours: float = 2,
+        threshold: float = 0.85,
+        prefix_len: int = 40,
+    ):
+        self.tolerance = timedelta(hours=time_tolerance_hours).total_seconds()
+        self.threshold = threshold
+        self.prefix_len = prefix_len
+        self.keys: Dict[str, str] = {}
+        self.entries: Dict[str, Dict] = {}
+        self._file: Optional[JSONFile] = None
+        # Derivados en memoria (no se persisten)
+        self._by_prefix: Dict[str, List[Tuple[float, str]]] = {}
+        self._by_block: Dict[int, Set[str]] = {}
+        # id -> llaves que apuntan a él (remove/rename sin recorrer self.keys)
+        self._keys_of: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, event_id: str) -> bool:
+        return event_id in self.entries
+
+    def _entry_for(self, event: EventNormalized) -> Dict:
+        return {
+            "start": (
+                event.dtstart.astimezone(tz.UTC).timestamp() if event.dtstart else None
+            ),
+            "prefix": event.title[: self.prefix_len] if event.title else "",
+            "tokens": sorted(title_tokens(event.summary)),
+        }
+
+    def _link(self, event_id: str, entry: Dict):
+        if entry["start"] is not None:
+            bisect.insort(
+                self._by_prefix.setdefault(entry["prefix"], []),
+                (entry["start"], event_id),
+            )
+            block = time_block(entry["start"], self.tolerance)
+            self._by_block.setdefault(block, set()).add(event_id)
+
+    def _unlink(self, event_id: str, entry: Dict):
+        if entry["start"] is not None:
+            items = self._by_prefix.get(entry["prefix"], [])
+            pos = bisect.bisect_left(items, (entry["start"], event_id))
+            if pos < len(items) and items[pos] == (entry["start"], event_id):
+                del items[pos]
+            block = time_block(entry["start"], self.tolerance)
+            self._by_block.get(block, set()).discard(event_id)
+
+    def _set_key(self, key: str, event_id: str):
+        previous = self.keys.get(key)
+        if previous is not None and previous != event_id:
+            self._keys_of.get(previous, set()).discard(key)
+        self.keys[key] = event_id
+        self._keys_of.setdefault(event_id, set()).add(key)
+
+    def _drop_keys(self, event_id: str):
+        for key in self._keys_of.pop(event_id, ()):
+            del self.keys[key]
+
+    def add(self, event_id: str, event: EventNormalized):
+        """Registra (o actualiza) un evento del historial y sus llaves."""
+        self.remove(event_id, keep_keys=True)
+        entry = self._entry_for(event)
+        self.entries[event_id] = entry
+        self._link(event_id, entry)
+        self._set_key(f"hash:{event.hash_key}", event_id)
+        for key in exact_keys(event.uid, event.url):
+            self._set_key(key, event_id)
+
+    def remove(self, event_id: str, keep_keys: bool = False):
+        """Quita un evento del índice (y sus llaves, salvo keep_keys)."""
+        entry = self.entries.pop(event_id, None)
+        if entry is not None:
+            self._unlink(event_id, entry)
+        if not keep_keys:
+            self._drop_keys(event_id)
+
+    def rename(self, old_id: str, new_id: str):
+        """Cambia el id canónico de un evento; sus llaves pasan a apuntar al nuevo."""
+        entry = self.entries.pop(old_id, None)
+        if entry is None:
+            return
+        self._unlink(old_id, entry)
+        self.entries[new_id] = entry
+        self._link(new_id, entry)
+        keys = self._keys_of.pop(old_id, set())
+        for key in keys:
+            self.keys[key] = new_id
+        self._keys_of.setdefault(new_id, set()).update(keys)
+
+    def match(self, event: EventNormalized, fuzzy: bool = True) -> Tuple[str, str]:
+        """
+        Busca el evento del historial del que `event` es una copia, con las
+        mismas reglas que deduplicate_events.
+
+        Returns:
+            (id canónico, motivo) o ("", "") si es un evento nuevo. El motivo
+            es "hash", "uid", "url", "time" o "fuzzy".
+        """
+        event_id = self.keys.get(f"hash:{event.hash_key}")
+        if event_id in self.entries:
+            return event_id, "hash"
+
+        if not event.dtstart:
+            return "", ""
+        start = event.dtstart.astimezone(tz.UTC).timestamp()
+        max_span = MAX_EXACT_KEY_SPAN.total_seconds()
+
+        for key in exact_keys(event.uid, event.url):
+            event_id = self.keys.get(key)
+            entry = self.entries.get(event_id) if event_id else None
+            if entry and entry["start"] is not None:
+                if abs(entry["start"] - start) <= max_span:
+                    return event_id, key.split(":", 1)[0]
+
+        prefix = event.title[: self.prefix_len] if event.title else ""
+        items = self._by_prefix.get(prefix, [])
+        # Intervalo abierto, igual que TimeNeighborIndex
+        pos = bisect.bisect_right(items, (start - self.tolerance, "\uffff"))
+        if pos < len(items) and items[pos][0] < start + self.tolerance:
+            return items[pos][1], "time"
+
+        if fuzzy:
+            block = time_block(start, self.tolerance)
+            tokens = title_tokens(event.summary)
+            candidates = set()
+            for neighbor in (block - 1, block, block + 1):
+                candidates.update(self._by_block.get(neighbor, ()))
+            for event_id in sorted(candidates):
+                entry = self.entries[event_id]
+                if abs(entry["start"] - start) > self.tolerance:
+                    continue
+                if title_similarity(tokens, set(entry["tokens"])) >= self.threshold:
+                    return event_id, "fuzzy"
+
+        return "", ""
+
+    def retain(
+        self,
+        event_ids: Iterable[str],
+        scope: Optional[Callable[[Dict], bool]] = None,
+    ) -> int:
+        """
+        Descarta las entradas de ids que ya no están en el historial.
+
+        Con `scope` solo se revisan las entradas para las que scope(entry) es
+        True (ej: las de particiones del historial que sí se cargaron).
+        """
+        event_ids = set(event_ids)
+        stale = [
+            event_id
+            for event_id, entry in self.entries.items()
+            if event_id not in event_ids and (scope is None or scope(entry))
+        ]
+        for event_id in stale:
+            self.remove(event_id)
+        return len(stale)
+
+    def clear(self):
+        self.keys = {}
+        self.entries = {}
+        self._rebuild_derived()
+
+    def _rebuild_derived(self):
+        self._by_prefix = {}
+        self._by_block = {}
+        self._keys_of = {}
+        for event_id, entry in self.entries.items():
+            self._link(event_id, entry)
+        for key, event_id in self.keys.items():
+            self._keys_of.setdefault(event_id, set()).add(key)
+
+    def load(self, path: Path) -> bool:
+        """
+        Carga el índice persistido.
+
+        Returns:
+            False si no existe, no se puede leer o es de otra versión (en ese
+            caso el historial debe deduplicarse completo y reconstruir el índice)
+        """
+        self.clear()
+        self._file = JSONFile(path, indent=None)
+        if not self._file.exists():
+            return False
+        try:
+            data = self._file.load()
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load dedup index: {e}")
+            return False
+        if not isinstance(data, dict) or data.get("version") != DEDUP_INDEX_VERSION:
+            logger.info("Dedup index is from an older version, ignoring it.")
+            return False
+
+        self.keys = dict(data.get("keys", {}))
+        self.entries = dict(data.get("entries", {}))
+        self._rebuild_derived()
+        return True
+
+    def save(self, path: Path) -> bool:
+        """Escribe el índice (atómico; no se reescribe si no cambió)."""
+        if self._file is None or self._file.path != Path(path):
+            self._file = JSONFile(path, indent=None)
+        return self._file.save(
+            {
+                "version": DEDUP_INDEX_VERSION,
+                "keys": self.keys,
+                "entries": self.entries,
+            }
+        )
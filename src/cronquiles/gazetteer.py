@@ -0,0 +1,631 @@
+"""
+Gazetteer - Resolución offline de estado y ciudad para ubicaciones en México.
+
+La mayoría de los eventos están en las zonas metropolitanas grandes (CDMX,
+Guadalajara, Monterrey, Puebla, Querétaro, Mérida...), así que su estado y
+ciudad se pueden resolver sin llamar al geocodificador: un índice de nombres
+de estado (más abreviaturas como "Jal.", "N.L." o "CDMX"), municipios y
+colonias -> (ciudad, código ISO del estado).
+
+El índice se genera con `tools/build_gazetteer.py` y se empaqueta en
+`data/mx_gazetteer.json`: los estados salen de geo_index, los municipios de
+MUNICIPALITIES y las colonias de las respuestas ya guardadas en
+`geocoding_cache.json`. Las llaves son canonical_query (sin acentos, casefold,
+puntuación colapsada). El artefacto también guarda los puntos de referencia de
+reverse_geocoding.py: las cabeceras de MUNICIPALITY_SEATS y las coordenadas de
+las respuestas del cache.
+
+resolve() solo responde si la ubicación es claramente mexicana: termina en
+"México"/"MX" (o ya se identificó como mexicana), o termina en un estado y otro
+componente es un municipio de ese estado (ej: "Monterrey, NL"). Los nombres que
+existen en varios estados (ej: "Guadalupe", "Benito Juárez") solo se resuelven
+si la ubicación también trae el estado.
+"""
+
+import json
+import logging
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from . import geo_index
+from .geocoding_cache import canonical_query
+
+logger = logging.getLogger(__name__)
+
+GAZETTEER_FILE = Path(__file__).parent / "data" / "mx_gazetteer.json"
+
+# Último componente que indica el país
+COUNTRY_KEYS = {"mexico", "mx"}
+
+# Estados que son una sola ciudad: si no se encontró otra, es la ciudad
+CITY_STATES = {"MX-CMX": "Ciudad de México"}
+
+# Nombres cortos y abreviaturas de uso común (además del nombre ISO y el código)
+STATE_ABBREVIATIONS: Dict[str, List[str]] = {
+    "MX-AGU": ["Ags."],
+    "MX-BCN": ["B.C.", "BC"],
+    "MX-BCS": ["B.C.S.", "BCS"],
+    "MX-CAM": ["Camp."],
+    "MX-CHH": ["Chih."],
+    "MX-CHP": ["Chis."],
+    "MX-CMX": ["CDMX", "CD MX", "D.F.", "DF", "Distrito Federal"],
+    "MX-COA": ["Coahuila", "Coah."],
+    "MX-DUR": ["Dgo."],
+    "MX-GRO": ["Gro."],
+    "MX-GUA": ["Gto."],
+    "MX-HID": ["Hgo."],
+    "MX-JAL": ["Jal."],
+    "MX-MEX": ["Méx.", "Edo. Méx.", "Edo. de México", "Estado de México", "Edomex"],
+    "MX-MIC": ["Michoacán", "Mich."],
+    "MX-MOR": ["Mor."],
+    "MX-NAY": ["Nay."],
+    "MX-NLE": ["N.L.", "NL"],
+    "MX-OAX": ["Oax."],
+    "MX-PUE": ["Pue."],
+    "MX-QUE": ["Qro."],
+    "MX-ROO": ["Q.R.", "Q. Roo", "QRoo"],
+    "MX-SIN": ["Sin."],
+    "MX-SLP": ["S.L.P.", "SLP"],
+    "MX-SON": ["Son."],
+    "MX-TAB": ["Tab."],
+    "MX-TAM": ["Tamps."],
+    "MX-TLA": ["Tlax."],
+    "MX-VER": ["Veracruz", "Ver."],
+    "MX-YUC": ["Yuc."],
+    "MX-ZAC": ["Zac."],
+}
+
+# Municipios (y alcaldías de la CDMX) por estado: ciudad -> otros nombres
+MUNICIPALITIES: Dict[str, Dict[str, List[str]]] = {
+    "MX-AGU": {"Aguascalientes": []},
+    "MX-BCN": {
+        "Tijuana": [],
+        "Mexicali": [],
+        "Ensenada": [],
+        "Tecate": [],
+        "Playas de Rosarito": ["Rosarito"],
+    },
+    "MX-BCS": {"La Paz": [], "Los Cabos": ["Cabo San Lucas", "San José del Cabo"]},
+    "MX-CAM": {"Campeche": ["San Francisco de Campeche"], "Ciudad del Carmen": []},
+    "MX-CHH": {"Chihuahua": [], "Ciudad Juárez": ["Cd. Juárez"]},
+    "MX-CHP": {
+        "Tuxtla Gutiérrez": [],
+        "San Cristóbal de las Casas": [],
+        "Tapachula": [],
+    },
+    "MX-CMX": {
+        "Ciudad de México": [
+            "Mexico City",
+            "Cd. de México",
+            "Cdad. de México",
+            "Álvaro Obregón",
+            "Azcapotzalco",
+            "Benito Juárez",
+            "Coyoacán",
+            "Cuajimalpa de Morelos",
+            "Cuajimalpa",
+            "Cuauhtémoc",
+            "Gustavo A. Madero",
+            "Iztacalco",
+            "Iztapalapa",
+            "La Magdalena Contreras",
+            "Miguel Hidalgo",
+            "Milpa Alta",
+            "Tláhuac",
+            "Tlalpan",
+            "Venustiano Carranza",
+            "Xochimilco",
+        ]
+    },
+    "MX-COA": {"Saltillo": [], "Torreón": [], "Monclova": [], "Piedras Negras": []},
+    "MX-COL": {"Colima": [], "Manzanillo": [], "Villa de Álvarez": []},
+    "MX-DUR": {"Durango": ["Victoria de Durango"], "Gómez Palacio": []},
+    "MX-GRO": {
+        "Acapulco": ["Acapulco de Juárez"],
+        "Chilpancingo": ["Chilpancingo de los Bravo"],
+        "Zihuatanejo": [],
+        "Taxco": ["Taxco de Alarcón"],
+    },
+    "MX-GUA": {
+        "León": ["León de los Aldama"],
+        "Guanajuato": [],
+        "Irapuato": [],
+        "Celaya": [],
+        "Salamanca": [],
+        "San Miguel de Allende": [],
+    },
+    "MX-HID": {
+        "Pachuca": ["Pachuca de Soto"],
+        "Mineral de la Reforma": [],
+        "Tulancingo": ["Tulancingo de Bravo"],
+    },
+    "MX-JAL": {
+        "Guadalajara": [],
+        "Zapopan": [],
+        "San Pedro Tlaquepaque": ["Tlaquepaque"],
+        "Tonalá": [],
+        "Tlajomulco de Zúñiga": ["Tlajomulco"],
+        "El Salto": [],
+        "Puerto Vallarta": [],
+    },
+    "MX-MEX": {
+        "Toluca": ["Toluca de Lerdo"],
+        "Metepec": [],
+        "Naucalpan de Juárez": ["Naucalpan"],
+        "Tlalnepantla de Baz": ["Tlalnepantla"],
+        "Ecatepec de Morelos": ["Ecatepec"],
+        "Nezahualcóyotl": ["Ciudad Nezahualcóyotl", "Neza"],
+        "Huixquilucan": [],
+        "Atizapán de Zaragoza": ["Atizapán"],
+        "Cuautitlán Izcalli": [],
+        "Coacalco": ["Coacalco de Berriozábal"],
+        "Tecámac": [],
+        "Texcoco": [],
+        "Chalco": [],
+        "Ixtapaluca": [],
+    },
+    "MX-MIC": {"Morelia": [], "Uruapan": [], "Zamora": []},
+    "MX-MOR": {"Cuernavaca": [], "Jiutepec": [], "Temixco": [], "Cuautla": []},
+    "MX-NAY": {"Tepic": [], "Bahía de Banderas": []},
+    "MX-NLE": {
+        "Monterrey": [],
+        "San Pedro Garza García": [],
+        "San Nicolás de los Garza": [],
+        "Guadalupe": [],
+        "Apodaca": [],
+        "Santa Catarina": [],
+        "General Escobedo": ["Escobedo"],
+    },
+    "MX-OAX": {"Oaxaca de Juárez": ["Oaxaca"], "Salina Cruz": []},
+    "MX-PUE": {
+        "Puebla": ["Heroica Puebla de Zaragoza", "Puebla de Zaragoza"],
+        "San Andrés Cholula": [],
+        "San Pedro Cholula": ["Cholula", "Cholula de Rivadavia"],
+        "Tehuacán": [],
+        "Atlixco": [],
+    },
+    "MX-QUE": {
+        "Querétaro": ["Santiago de Querétaro"],
+        "Corregidora": [],
+        "El Marqués": [],
+        "San Juan del Río": [],
+    },
+    "MX-ROO": {
+        "Cancún": ["Benito Juárez"],
+        "Playa del Carmen": ["Solidaridad"],
+        "Chetumal": ["Othón P. Blanco"],
+        "Tulum": [],
+        "Cozumel": [],
+    },
+    "MX-SIN": {"Culiacán": ["Culiacán Rosales"], "Mazatlán": [], "Los Mochis": []},
+    "MX-SLP": {"San Luis Potosí": [], "Soledad de Graciano Sánchez": []},
+    "MX-SON": {
+        "Hermosillo": [],
+        "Ciudad Obregón": ["Cajeme"],
+        "Nogales": [],
+        "Guaymas": [],
+    },
+    "MX-TAB": {"Villahermosa": []},
+    "MX-TAM": {
+        "Tampico": [],
+        "Ciudad Madero": [],
+        "Altamira": [],
+        "Reynosa": [],
+        "Matamoros": [],
+        "Nuevo Laredo": [],
+        "Ciudad Victoria": [],
+    },
+    "MX-TLA": {"Tlaxcala": ["Tlaxcala de Xicohténcatl"], "Apizaco": []},
+    "MX-VER": {
+        "Veracruz": [],
+        "Boca del Río": [],
+        "Xalapa": ["Xalapa-Enríquez", "Jalapa"],
+        "Coatzacoalcos": [],
+        "Córdoba": [],
+        "Orizaba": [],
+        "Poza Rica": ["Poza Rica de Hidalgo"],
+    },
+    "MX-YUC": {"Mérida": [], "Progreso": [], "Valladolid": [], "Kanasín": []},
+    "MX-ZAC": {"Zacatecas": [], "Fresnillo": [], "Guadalupe": []},
+}
+
+# Coordenadas (lat, lon) de la cabecera de los municipios de MUNICIPALITIES (o
+# de uno de sus otros nombres; en la CDMX, de cada alcaldía). Son los puntos de
+# referencia de reverse_geocoding.py junto con las respuestas del cache.
+MUNICIPALITY_SEATS: Dict[str, Dict[str, Tuple[float, float]]] = {
+    "MX-AGU": {"Aguascalientes": (21.8853, -102.2916)},
+    "MX-BCN": {
+        "Tijuana": (32.5149, -117.0382),
+        "Mexicali": (32.6245, -115.4523),
+        "Ensenada": (31.8667, -116.5964),
+        "Tecate": (32.5725, -116.6264),
+        "Playas de Rosarito": (32.3661, -117.0618),
+    },
+    "MX-BCS": {
+        "La Paz": (24.1426, -110.3128),
+        "San José del Cabo": (23.0630, -109.7020),
+        "Cabo San Lucas": (22.8905, -109.9167),
+    },
+    "MX-CAM": {
+        "Campeche": (19.8301, -90.5349),
+        "Ciudad del Carmen": (18.6490, -91.8220),
+    },
+    "MX-CHH": {
+        "Chihuahua": (28.6320, -106.0691),
+        "Ciudad Juárez": (31.6904, -106.4245),
+    },
+    "MX-CHP": {
+        "Tuxtla Gutiérrez": (16.7516, -93.1030),
+        "San Cristóbal de las Casas": (16.7370, -92.6376),
+        "Tapachula": (14.9039, -92.2575),
+    },
+    "MX-CMX": {
+        "Cuauhtémoc": (19.4326, -99.1332),
+        "Álvaro Obregón": (19.3587, -99.2036),
+        "Azcapotzalco": (19.4840, -99.1850),
+        "Benito Juárez": (19.3720, -99.1560),
+        "Coyoacán": (19.3467, -99.1617),
+        "Cuajimalpa de Morelos": (19.3570, -99.2990),
+        "Gustavo A. Madero": (19.4847, -99.1133),
+        "Iztacalco": (19.3950, -99.0970),
+        "Iztapalapa": (19.3574, -99.0927),
+        "La Magdalena Contreras": (19.3040, -99.2410),
+        "Miguel Hidalgo": (19.4330, -99.1900),
+        "Milpa Alta": (19.1920, -99.0230),
+        "Tláhuac": (19.2860, -99.0050),
+        "Tlalpan": (19.2880, -99.1670),
+        "Venustiano Carranza": (19.4300, -99.1000),
+        "Xochimilco": (19.2620, -99.1040),
+    },
+    "MX-COA": {
+        "Saltillo": (25.4232, -101.0053),
+        "Torreón": (25.5428, -103.4068),
+        "Monclova": (26.9080, -101.4215),
+        "Piedras Negras": (28.7000, -100.5236),
+    },
+    "MX-COL": {
+        "Colima": (19.2433, -103.7250),
+        "Manzanillo": (19.1138, -104.3385),
+        "Villa de Álvarez": (19.2671, -103.7372),
+    },
+    "MX-DUR": {
+        "Durango": (24.0277, -104.6532),
+        "Gómez Palacio": (25.5611, -103.4983),
+    },
+    "MX-GRO": {
+        "Acapulco": (16.8531, -99.8237),
+        "Chilpancingo": (17.5515, -99.5006),
+        "Zihuatanejo": (17.6417, -101.5519),
+        "Taxco": (18.5560, -99.6050),
+    },
+    "MX-GUA": {
+        "León": (21.1250, -101.6860),
+        "Guanajuato": (21.0190, -101.2574),
+        "Irapuato": (20.6767, -101.3563),
+        "Celaya": (20.5233, -100.8157),
+        "Salamanca": (20.5739, -101.1957),
+        "San Miguel de Allende": (20.9144, -100.7452),
+    },
+    "MX-HID": {
+        "Pachuca": (20.1011, -98.7591),
+        "Mineral de la Reforma": (20.0717, -98.6967),
+        "Tulancingo": (20.0836, -98.3634),
+    },
+    "MX-JAL": {
+        "Guadalajara": (20.6767, -103.3475),
+        "Zapopan": (20.7214, -103.3918),
+        "San Pedro Tlaquepaque": (20.6409, -103.2933),
+        "Tonalá": (20.6238, -103.2344),
+        "Tlajomulco de Zúñiga": (20.4736, -103.4470),
+        "El Salto": (20.5197, -103.1814),
+        "Puerto Vallarta": (20.6534, -105.2253),
+    },
+    "MX-MEX": {
+        "Toluca": (19.2826, -99.6557),
+        "Metepec": (19.2513, -99.6047),
+        "Naucalpan de Juárez": (19.4785, -99.2396),
+        "Tlalnepantla de Baz": (19.5400, -99.1950),
+        "Ecatepec de Morelos": (19.6018, -99.0507),
+        "Nezahualcóyotl": (19.4006, -99.0148),
+        "Huixquilucan": (19.3600, -99.3500),
+        "Atizapán de Zaragoza": (19.5667, -99.2500),
+        "Cuautitlán Izcalli": (19.6469, -99.2466),
+        "Coacalco": (19.6320, -99.1100),
+        "Tecámac": (19.7130, -98.9680),
+        "Texcoco": (19.5100, -98.8800),
+        "Chalco": (19.2640, -98.8970),
+        "Ixtapaluca": (19.3180, -98.8820),
+    },
+    "MX-MIC": {
+        "Morelia": (19.7060, -101.1950),
+        "Uruapan": (19.4208, -102.0628),
+        "Zamora": (19.9855, -102.2839),
+    },
+    "MX-MOR": {
+        "Cuernavaca": (18.9242, -99.2216),
+        "Jiutepec": (18.8817, -99.1775),
+        "Temixco": (18.8500, -99.2333),
+        "Cuautla": (18.8120, -98.9550),
+    },
+    "MX-NAY": {
+        "Tepic": (21.5042, -104.8946),
+        "Bahía de Banderas": (20.7550, -105.3340),
+    },
+    "MX-NLE": {
+        "Monterrey": (25.6866, -100.3161),
+        "San Pedro Garza García": (25.6573, -100.4026),
+        "San Nicolás de los Garza": (25.7441, -100.2836),
+        "Guadalupe": (25.6775, -100.2597),
+        "Apodaca": (25.7817, -100.1886),
+        "Santa Catarina": (25.6733, -100.4586),
+        "General Escobedo": (25.7970, -100.3130),
+    },
+    "MX-OAX": {
+        "Oaxaca de Juárez": (17.0732, -96.7266),
+        "Salina Cruz": (16.1670, -95.2000),
+    },
+    "MX-PUE": {
+        "Puebla": (19.0414, -98.2063),
+        "San Andrés Cholula": (19.0500, -98.2970),
+        "San Pedro Cholula": (19.0630, -98.3060),
+        "Tehuacán": (18.4620, -97.3930),
+        "Atlixco": (18.9080, -98.4360),
+    },
+    "MX-QUE": {
+        "Querétaro": (20.5888, -100.3899),
+        "Corregidora": (20.5400, -100.4400),
+        "San Juan del Río": (20.3890, -99.9960),
+    },
+    "MX-ROO": {
+        "Cancún": (21.1619, -86.8515),
+        "Playa del Carmen": (20.6296, -87.0739),
+        "Chetumal": (18.5001, -88.2961),
+        "Tulum": (20.2114, -87.4654),
+        "Cozumel": (20.5083, -86.9458),
+    },
+    "MX-SIN": {
+        "Culiacán": (24.8091, -107.3940),
+        "Mazatlán": (23.2494, -106.4111),
+        "Los Mochis": (25.7904, -108.9859),
+    },
+    "MX-SLP": {
+        "San Luis Potosí": (22.1565, -100.9855),
+        "Soledad de Graciano Sánchez": (22.1830, -100.9390),
+    },
+    "MX-SON": {
+        "Hermosillo": (29.0729, -110.9559),
+        "Ciudad Obregón": (27.4828, -109.9304),
+        "Nogales": (31.3086, -110.9422),
+        "Guaymas": (27.9180, -110.8990),
+    },
+    "MX-TAB": {"Villahermosa": (17.9892, -92.9475)},
+    "MX-TAM": {
+        "Tampico": (22.2331, -97.8611),
+        "Ciudad Madero": (22.2760, -97.8320),
+        "Altamira": (22.3930, -97.9430),
+        "Reynosa": (26.0508, -98.2979),
+        "Matamoros": (25.8690, -97.5027),
+        "Nuevo Laredo": (27.4779, -99.5496),
+        "Ciudad Victoria": (23.7369, -99.1411),
+    },
+    "MX-TLA": {"Tlaxcala": (19.3181, -98.2375), "Apizaco": (19.4160, -98.1400)},
+    "MX-VER": {
+        "Veracruz": (19.1738, -96.1342),
+        "Boca del Río": (19.1056, -96.1064),
+        "Xalapa": (19.5438, -96.9102),
+        "Coatzacoalcos": (18.1345, -94.4590),
+        "Córdoba": (18.8842, -96.9256),
+        "Orizaba": (18.8500, -97.1000),
+        "Poza Rica": (20.5330, -97.4590),
+    },
+    "MX-YUC": {
+        "Mérida": (20.9674, -89.5926),
+        "Progreso": (21.2833, -89.6667),
+        "Valladolid": (20.6896, -88.2011),
+        "Kanasín": (20.9340, -89.5580),
+    },
+    "MX-ZAC": {
+        "Zacatecas": (22.7709, -102.5832),
+        "Fresnillo": (23.1750, -102.8680),
+        "Guadalupe": (22.7470, -102.5180),
+    },
+}
+
+# Colonias del cache que no identifican una ciudad (existen en casi todas)
+GENERIC_COLONIAS = {"centro", "del centro", "zona centro", "centro historico", "juarez"}
+
+# Campos de la respuesta de Nominatim con la colonia
+COLONIA_FIELDS = ("neighbourhood", "suburb", "quarter")
+
+_POSTAL_CODE_RE = re.compile(r"^(c\.?\s*p\.?\s*)?\d{4,5}\s+", re.IGNORECASE)
+
+
+class Place(NamedTuple):
+    """Estado (código ISO) y ciudad ("" si solo se conoce el estado)."""
+
+    state_code: str
+    city: str = ""
+
+
+_lock = threading.Lock()
+_states: Optional[Dict[str, str]] = None
+_municipalities: Dict[str, List[Place]] = {}
+_colonias: Dict[str, List[Place]] = {}
+_points: List[Tuple[float, float, Place]] = []
+
+
+def part_key(part: str) -> str:
+    """Llave de un componente de la ubicación: sin código postal y canónica."""
+    return canonical_query(_POSTAL_CODE_RE.sub("", part.strip()))
+
+
+def _add(index: Dict[str, List[List[str]]], name: str, city: str, state_code: str):
+    places = index.setdefault(part_key(name), [])
+    if [city, state_code] not in places:
+        places.append([city, state_code])
+
+
+def build_gazetteer(geocoding_cache: Optional[Dict] = None) -> Dict:
+    """
+    Genera el índice serializable: estados (geo_index + abreviaturas),
+    municipios (MUNICIPALITIES), colonias de las respuestas de Nominatim
+    guardadas en el cache de geocodificación y puntos de referencia para el
+    geocodificador inverso (cabeceras y coordenadas de esas respuestas).
+    """
+    states: Dict[str, str] = {}
+    for sub in geo_index.subdivisions_for("MX"):
+        for name in [sub.name, sub.code, sub.code.split("-")[1]]:
+            states[part_key(name)] = sub.code
+        for name in STATE_ABBREVIATIONS.get(sub.code, []):
+            states[part_key(name)] = sub.code
+
+    municipalities: Dict[str, List[List[str]]] = {}
+    for state_code, cities in MUNICIPALITIES.items():
+        for city, aliases in cities.items():
+            for name in [city, *aliases]:
+                _add(municipalities, name, city, state_code)
+
+    points = []
+    for state_code, seats in MUNICIPALITY_SEATS.items():
+        cities = {}
+        for city, aliases in MUNICIPALITIES[state_code].items():
+            cities.update({name: city for name in [city, *aliases]})
+        for name, (lat, lon) in seats.items():
+            points.append([lat, lon, cities[name], state_code])
+
+    colonias: Dict[str, List[List[str]]] = {}
+    for stored in (geocoding_cache or {}).values():
+        address = (stored or {}).get("address") or {}
+        state_code = address.get("ISO3166-2-lvl4", "")
+        city = address.get("city") or address.get("town") or ""
+        if not state_code.startswith("MX-") or not city:
+            continue
+        if "lat" in stored and "lon" in stored:
+            lat, lon = round(float(stored["lat"]), 4), round(float(stored["lon"]), 4)
+            if [lat, lon, city, state_code] not in points:
+                points.append([lat, lon, city, state_code])
+        for field in COLONIA_FIELDS:
+            name = address.get(field)
+            if name and part_key(name) not in GENERIC_COLONIAS:
+                _add(colonias, name, city, state_code)
+    colonias = {
+        key: places
+        for key, places in colonias.items()
+        if key not in municipalities and key not in states
+    }
+
+    return {
+        "states": dict(sorted(states.items())),
+        "municipalities": dict(sorted(municipalities.items())),
+        "colonias": dict(sorted(colonias.items())),
+        "points": points,
+    }
+
+
+def _load():
+    """Carga el índice una sola vez (del artefacto, o sin colonias si no existe)."""
+    global _states
+    if _states is not None:
+        return
+
+    with _lock:
+        if _states is not None:
+            return
+
+        try:
+            with open(GAZETTEER_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(
+                f"Gazetteer not available ({e}), building it without colonias"
+            )
+            data = build_gazetteer()
+
+        for field, index in (
+            ("municipalities", _municipalities),
+            ("colonias", _colonias),
+        ):
+            for key, places in data[field].items():
+                index[key] = [Place(state_code, city) for city, state_code in places]
+        _points.extend(
+            (lat, lon, Place(state_code, city))
+            for lat, lon, city, state_code in data["points"]
+        )
+        _states = data["states"]
+
+
+def points() -> List[Tuple[float, float, Place]]:
+    """Puntos de referencia (lat, lon, Place) para reverse_geocoding.py."""
+    _load()
+    return list(_points)
+
+
+def state_code(part: str) -> Optional[str]:
+    """Código ISO del estado si el componente es un estado o su abreviatura."""
+    _load()
+    return _states.get(part_key(part))
+
+
+def _find_city(
+    index: Dict[str, List[Place]], keys: List[str], state_code: str, skip: int
+) -> Optional[Place]:
+    """El componente más a la derecha que corresponde a una sola ciudad del estado."""
+    for position in range(len(keys) - 1, -1, -1):
+        if position == skip:
+            continue
+        places = {
+            place
+            for place in index.get(keys[position], [])
+            if not state_code or place.state_code == state_code
+        }
+        if len(places) == 1:
+            return places.pop()
+    return None
+
+
+def resolve(parts: Sequence[str], in_mexico: bool = False) -> Optional[Place]:
+    """
+    Resuelve estado y ciudad de los componentes de una ubicación.
+
+    Args:
+        parts: Componentes de la ubicación separados por coma, en orden
+        in_mexico: La ubicación ya se identificó como mexicana por otro medio
+
+    Returns:
+        Place, o None si no es claramente una ubicación en México o no se
+        encontró el estado
+    """
+    _load()
+    keys = [key for key in (part_key(part) for part in parts) if key]
+    if keys and keys[-1] in COUNTRY_KEYS:
+        in_mexico = True
+        keys.pop()
+    if not keys:
+        return None
+
+    # El estado: el componente más a la derecha que es un estado
+    state_code = ""
+    state_at = -1
+    for position in range(len(keys) - 1, -1, -1):
+        if keys[position] in _states:
+            state_code, state_at = _states[keys[position]], position
+            break
+
+    if not in_mexico:
+        # Sin "México" solo cuenta un municipio del estado del último
+        # componente: una abreviatura sola ("NL", "BC", "Col.") o un municipio
+        # solo ("León", "Córdoba") también existen fuera de México
+        if state_at != len(keys) - 1:
+            return None
+        return _find_city(_municipalities, keys, state_code, state_at)
+
+    place = _find_city(_municipalities, keys, state_code, state_at) or _find_city(
+        _colonias, keys, state_code, state_at
+    )
+    if place:
+        return place
+    if state_code:
+        return Place(state_code, CITY_STATES.get(state_code, ""))
+    return None
@@ -0,0 +1,170 @@
+"""
+Geo Index - Índice precalculado de países y subdivisiones (ISO 3166).
+
+Reemplaza las búsquedas por llamada a `pycountry` (que carga y escanea sus JSON
+completos) por un índice normalizado generado una sola vez con
+`tools/build_geo_index.py` y empaquetado en `data/geo_index.json`.
+
+Las búsquedas son case-insensitive, igual que `pycountry.countries.get(...)`.
+"""
+
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = Path(__file__).parent / "data" / "geo_index.json"
+
+# Campos de país que se indexan (además de alpha_2)
+COUNTRY_KEY_FIELDS = ("name", "official_name", "alpha_3")
+
+
+class Country(NamedTuple):
+    """País ISO 3166-1 (mismos nombres de atributos que pycountry)."""
+
+    alpha_2: str
+    alpha_3: str
+    name: str
+    official_name: str
+
+
+class Subdivision(NamedTuple):
+    """Subdivisión ISO 3166-2 (mismos nombres de atributos que pycountry)."""
+
+    code: str
+    name: str
+    type: str
+    country_code: str
+
+
+_lock = threading.Lock()
+_countries: Optional[Dict[str, Country]] = None
+_country_keys: Dict[str, Dict[str, str]] = {}
+_subdivisions: Dict[str, Subdivision] = {}
+_subdivisions_by_country: Dict[str, List[Subdivision]] = {}
+_subdivision_keys: Dict[str, Dict[str, str]] = {}
+
+
+def build_index() -> Dict:
+    """
+    Genera el índice serializable a partir de pycountry.
+
+    Respeta la semántica de pycountry: llaves en minúsculas y, ante llaves
+    duplicadas, gana la última entrada de la base de datos.
+    """
+    import pycountry
+
+    countries = []
+    country_keys: Dict[str, Dict[str, str]] = {f: {} for f in COUNTRY_KEY_FIELDS}
+    for c in pycountry.countries:
+        official_name = getattr(c, "official_name", "") or ""
+        countries.append([c.alpha_2, c.alpha_3, c.name, official_name])
+        for field, value in (
+            ("name", c.name),
+            ("official_name", official_name),
+            ("alpha_3", c.alpha_3),
+        ):
+            if value:
+                country_keys[field][value.lower()] = c.alpha_2
+
+    subdivisions = []
+    subdivision_keys: Dict[str, Dict[str, str]] = {}
+    for sub in sorted(pycountry.subdivisions, key=lambda s: s.code):
+        subdivisions.append([sub.code, sub.name, sub.type])
+        keys = subdivision_keys.setdefault(sub.country_code, {})
+        keys.setdefault(sub.name.lower(), sub.code)
+        keys[sub.code.lower()] = sub.code
+
+    return {
+        "pycountry_version": getattr(pycountry, "__version__", ""),
+        "countries": countries,
+        "country_keys": country_keys,
+        "subdivisions": subdivisions,
+        "subdivision_keys": subdivision_keys,
+    }
+
+
+def _load():
+    """Carga el índice una sola vez (del artefacto, o de pycountry si no existe)."""
+    global _countries
+    if _countries is not None:
+        return
+
+    with _lock:
+        if _countries is not None:
+            return
+
+        try:
+            with open(INDEX_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Geo index not available ({e}), building it from pycountry")
+            data = build_index()
+
+        countries = {}
+        for alpha_2, alpha_3, name, official_name in data["countries"]:
+            countries[alpha_2] = Country(alpha_2, alpha_3, name, official_name)
+
+        for code, name, sub_type in data["subdivisions"]:
+            country_code = code.split("-")[0]
+            sub = Subdivision(code, name, sub_type, country_code)
+            _subdivisions[code] = sub
+            _subdivisions_by_country.setdefault(country_code, []).append(sub)
+
+        _country_keys.update(data["country_keys"])
+        _subdivision_keys.update(data["subdivision_keys"])
+        _countries = countries
+
+
+def get_country(
+    *,
+    name: Optional[str] = None,
+    official_name: Optional[str] = None,
+    alpha_2: Optional[str] = None,
+    alpha_3: Optional[str] = None,
+) -> Optional[Country]:
+    """
+    Busca un país por un solo criterio (equivalente a `pycountry.countries.get`).
+
+    Returns:
+        Country o None si no existe
+    """
+    _load()
+    if alpha_2 is not None:
+        return _countries.get(alpha_2.upper())
+
+    for field, value in (
+        ("name", name),
+        ("official_name", official_name),
+        ("alpha_3", alpha_3),
+    ):
+        if value is not None:
+            code = _country_keys[field].get(value.lower())
+            return _countries.get(code) if code else None
+    return None
+
+
+def get_subdivision(code: str) -> Optional[Subdivision]:
+    """Busca una subdivisión por su código ISO completo (ej: "MX-JAL")."""
+    _load()
+    return _subdivisions.get(code.upper()) if code else None
+
+
+def find_subdivision(country_code: str, value: str) -> Optional[Subdivision]:
+    """
+    Busca una subdivisión de un país por nombre o código completo (case-insensitive).
+    """
+    _load()
+    if not country_code or not value:
+        return None
+    code = _subdivision_keys.get(country_code.upper(), {}).get(value.lower().strip())
+    return _subdivisions.get(code) if code else None
+
+
+def subdivisions_for(country_code: str) -> List[Subdivision]:
+    """Devuelve todas las subdivisiones de un país."""
+    _load()
+    return list(_subdivisions_by_country.get(country_code.upper(), []))
@@ -0,0 +1,257 @@
+"""
+Geocoding - Motor de geocodificación con límite de tasa por proveedor.
+
+GeocodingEngine resuelve las consultas de geocodificación de los eventos
+(EventNormalized.geocoding_queries) contra el cache (por llave canónica, ver
+geocoding_cache.py) y, si no están, contra el proveedor: GoogleV3 si hay
+`GOOGLE_MAPS_API_KEY`, si no Nominatim. Cada proveedor tiene su token bucket
+(PROVIDER_RATES): Nominatim se queda en una petición cada 1.1 s (su política de
+uso admite una por segundo) y Google usa la tasa que permite su API. Las
+consultas se resuelven en un pool de hilos acotado, así que con Google corren
+en paralelo en vez de una por una.
+
+Las entradas vencidas del cache (y las búsquedas sin resultado, con backoff)
+se vuelven a consultar; si el proveedor falla, se sigue usando la respuesta
+vencida. report() registra la tasa de aciertos de la corrida.
+
+geocode_events primero intenta el gazetteer offline con cada evento
+(EventNormalized.apply_gazetteer, ver gazetteer.py). Los demás se resuelven por
+niveles: primero las consultas principales únicas de todos los eventos (varios
+eventos suelen compartir la misma ubicación), luego los fallbacks únicos de los
+eventos que quedaron sin resultado, y se reparten las respuestas a los eventos. Cada consulta se resuelve una sola vez por
+corrida y un fallback solo se consulta si hace falta, igual que antes.
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from geopy.exc import GeopyError
+from geopy.geocoders import GoogleV3, Nominatim
+
+from .geocoding_cache import CacheEntry, GeocodingCache, is_fresh
+from .rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Fallos del proveedor que se toleran (se usa el cache vencido o se omite la
+# consulta). geopy envuelve casi todo en GeopyError, pero un timeout del socket
+# o un error de requests pueden llegar sin envolver; un error de programación
+# (TypeError, KeyError, ...) sí debe propagarse.
+GEOCODING_ERRORS = (GeopyError, requests.RequestException, TimeoutError)
+
+# Proveedor -> (peticiones por segundo, ráfaga)
+PROVIDER_RATES: Dict[str, Tuple[float, int]] = {
+    "nominatim": (1 / 1.1, 1),
+    "google": (25.0, 5),
+}
+
+DEFAULT_WORKERS = 4
+
+
+def default_geolocator():
+    """Proveedor según el entorno: (nombre, geolocalizador de geopy)."""
+    api_key = os.getenv("GOOGLE_MAPS_API_KEY")
+    if api_key:
+        return "google", GoogleV3(api_key=api_key)
+    return "nominatim", Nominatim(user_agent="cron-quiles-aggregator")
+
+
+class GeocodingEngine:
+    """
+    Geocodificación con cache compartido, token bucket por proveedor y pool de
+    hilos.
+
+    Args:
+        cache: Cache {consulta: raw} (se modifica en el lugar; {} = sin resultado)
+            o un cache con get/set (GeocodingCache, SQLiteGeocodingCache)
+        workers: Hilos para geocodificar eventos en paralelo
+        provider: Nombre del proveedor (con `geolocator`; por defecto según el entorno)
+        geolocator: Geolocalizador de geopy
+    """
+
+    def __init__(
+        self,
+        cache: Optional[Dict] = None,
+        workers: int = DEFAULT_WORKERS,
+        provider: Optional[str] = None,
+        geolocator=None,
+    ):
+        if cache is None or isinstance(cache, dict):
+            cache = GeocodingCache(cache)
+        self.cache = cache
+        if geolocator is None:
+            provider, geolocator = default_geolocator()
+        self.provider = provider or geolocator.__class__.__name__.lower()
+        self.geolocator = geolocator
+        rate, burst = PROVIDER_RATES.get(self.provider, PROVIDER_RATES["nominatim"])
+        self.bucket = TokenBucket(rate, burst)
+        self.workers = max(1, workers)
+        self.api_calls = 0
+        # Consultas resueltas con el cache / sin entrada / con entrada vencida
+        self.stats = {"hits": 0, "misses": 0, "expired": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _cached(self, query: str) -> Tuple[Optional[CacheEntry], bool]:
+        """Entrada del cache para la consulta y si sigue vigente."""
+        entry = self.cache.get_entry(query)
+        if entry is None:
+            self._count("misses")
+            return None, False
+        if not is_fresh(entry):
+            self._count("expired")
+            return entry, False
+        self._count("hits")
+        logger.debug(f"Geocoding cache hit for: {query}")
+        return entry, True
+
+    def lookup(self, query: str) -> Tuple[Dict, bool]:
+        """
+        Resuelve una consulta (cache o API).
+
+        Returns:
+            Tupla (raw, usó_api): raw vacío si el proveedor no encontró nada.
+        """
+        entry, fresh = self._cached(query)
+        if fresh:
+            return entry.raw, False
+        return self._fetch(query, entry), True
+
+    def _fetch(self, query: str, entry: Optional[CacheEntry]) -> Dict:
+        """
+        Consulta al proveedor y guarda la respuesta. Si la consulta falla y la
+        entrada vencida tenía resultado, se sigue usando.
+        """
+        try:
+            raw = self._geocode(query)
+        except GEOCODING_ERRORS:
+            if entry is not None and entry.raw:
+                return entry.raw
+            raise
+        # Sin resultado: un fallo más para el backoff de la entrada
+        if raw:
+            misses = 0
+        else:
+            misses = entry.misses + 1 if entry is not None and not entry.raw else 1
+        self.cache.set(query, raw, misses=misses)
+        return raw
+
+    def _geocode(self, query: str) -> Dict:
+        self.bucket.acquire()
+        logger.debug(f"Geocoding query ({self.geolocator.__class__.__name__}): {query}")
+        # GoogleV3 no usa 'addressdetails'
+        if isinstance(self.geolocator, GoogleV3):
+            location = self.geolocator.geocode(query, language="es", timeout=10)
+        else:
+            location = self.geolocator.geocode(
+                query, addressdetails=True, language="es", timeout=10
+            )
+        with self._lock:
+            self.api_calls += 1
+        return location.raw if location else {}
+
+    def _try_fetch(self, query: str, entry: Optional[CacheEntry]) -> Optional[Dict]:
+        try:
+            return self._fetch(query, entry)
+        except GEOCODING_ERRORS as e:
+            logger.debug(f"Geocoding error for '{query}': {e}")
+            return None
+
+    def resolve(self, queries: List[str]) -> Dict[str, Optional[Dict]]:
+        """
+        Resuelve cada consulta única una vez: las del cache directamente y las
+        demás en el pool de hilos.
+
+        Returns:
+            {consulta: raw} ({} si no hubo resultado, None si la API falló)
+        """
+        results: Dict[str, Optional[Dict]] = {}
+        pending = []
+        entries = []
+        for query in dict.fromkeys(queries):
+            entry, fresh = self._cached(query)
+            if fresh:
+                results[query] = entry.raw
+            else:
+                pending.append(query)
+                entries.append(entry)
+        if pending:
+            with ThreadPoolExecutor(
+                max_workers=min(self.workers, len(pending))
+            ) as executor:
+                results.update(
+                    zip(pending, executor.map(self._try_fetch, pending, entries))
+                )
+        return results
+
+    def report(self):
+        """Registra la tasa de aciertos del cache y las llamadas a la API."""
+        total = sum(self.stats.values())
+        if not total:
+            return
+        logger.info(
+            f"Geocoding cache: {self.stats['hits']} hits, {self.stats['misses']} misses, "
+            f"{self.stats['expired']} expired ({self.stats['hits'] / total:.0%} hit rate); "
+            f"{self.api_calls} API calls"
+        )
+
+    def geocode_events(self, events: List) -> List:
+        """
+        Geocodifica los eventos resolviendo sus consultas por niveles (ver
+        docstring del módulo).
+
+        Returns:
+            Los eventos a los que se les aplicó una ubicación, en el orden recibido
+        """
+        if not events:
+            return []
+        # (posición, evento, consultas): la consulta y sus fallbacks
+        pending = []
+        # Los que resuelve el gazetteer offline no llegan al proveedor
+        offline = []
+        for position, event in enumerate(events):
+            if event.apply_gazetteer():
+                offline.append((position, event))
+                continue
+            queries = event.geocoding_queries()
+            if queries:
+                pending.append((position, event, queries))
+
+        found = []
+        level = 0
+        unique = 0
+        calls_before = self.api_calls
+        while pending:
+            resolved = self.resolve([queries[level] for _, _, queries in pending])
+            unique += len(resolved)
+            next_pending = []
+            for position, event, queries in pending:
+                raw = resolved[queries[level]]
+                if raw:
+                    found.append((position, event, raw))
+                elif raw is not None and level + 1 < len(queries):
+                    # Sin resultado: pasar al siguiente fallback (si la API
+                    # falló, el evento se queda así, como en geocode_location)
+                    next_pending.append((position, event, queries))
+            pending = next_pending
+            level += 1
+
+        applied = offline + [
+            (position, event)
+            for position, event, raw in sorted(found, key=lambda item: item[0])
+            if event.apply_geocoding(raw, self.provider)
+        ]
+        geocoded = [event for _, event in sorted(applied, key=lambda item: item[0])]
+        logger.info(
+            f"Geocoded {len(geocoded)} of {len(events)} events "
+            f"({len(offline)} offline, {unique} unique queries, "
+            f"{self.api_calls - calls_before} API calls)"
+        )
+        return geocoded
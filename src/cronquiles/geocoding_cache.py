@@ -0,0 +1,302 @@
+"""
+Geocoding cache - Cache de geocodificación con llave canónica.
+
+Las consultas se buscan por su forma canónica (canonical_query: sin acentos,
+casefold, puntuación y espacios colapsados), así que "Zapopan, Jal., Mexico" y
+"zapopan, jal, México" comparten entrada y cuestan una sola llamada a la API.
+La consulta original se conserva como alias.
+
+GeocodingCache envuelve el dict de `data/geocoding_cache.json` (sus llaves
+siguen siendo las consultas originales). Con `--geocache-db` el cache vive en
+SQLite (SQLiteGeocodingCache): cada búsqueda es una consulta por llave, sin
+cargar el archivo completo, y al guardar solo se escriben las entradas nuevas.
+
+Cada entrada lleva la fecha en que se guardó y cuántas veces seguidas el
+proveedor no encontró nada (en el JSON, bajo la llave `_cache` de la respuesta).
+Las respuestas con resultado vencen a los POSITIVE_TTL; las vacías se
+reintentan con backoff: NEGATIVE_TTL tras el primer fallo, el doble tras cada
+fallo siguiente, hasta NEGATIVE_TTL_MAX. Las entradas sin fecha (anteriores a
+los sellos) cuentan como vigentes si tienen resultado y como vencidas si no.
+`tools/prune_geocoding_cache.py` borra las entradas vencidas.
+"""
+
+import logging
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+from dateutil import tz
+from unidecode import unidecode
+
+from .serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+GEOCACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocache (
+    key TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    raw TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS geocache_aliases (
+    query TEXT PRIMARY KEY,
+    key TEXT NOT NULL
+);
+"""
+
+POSITIVE_TTL = timedelta(days=365)
+NEGATIVE_TTL = timedelta(days=7)
+NEGATIVE_TTL_MAX = timedelta(days=180)
+
+# Metadatos de la entrada dentro de la respuesta guardada en el JSON
+META_KEY = "_cache"
+
+_NON_ALNUM_RE = re.compile(r"[^0-9a-z]+")
+
+
+class CacheEntry(NamedTuple):
+    """Respuesta guardada ({} = sin resultado), cuándo se guardó y fallos seguidos."""
+
+    raw: Dict
+    cached_at: Optional[datetime]
+    misses: int = 0
+
+
+def expires_at(entry: CacheEntry) -> Optional[datetime]:
+    """Cuándo vence la entrada (None = nunca)."""
+    if entry.raw:
+        return entry.cached_at + POSITIVE_TTL if entry.cached_at else None
+    if entry.cached_at is None:
+        return datetime.min.replace(tzinfo=tz.UTC)
+    backoff = NEGATIVE_TTL * 2 ** min(max(entry.misses - 1, 0), 10)
+    return entry.cached_at + min(backoff, NEGATIVE_TTL_MAX)
+
+
+def is_fresh(entry: CacheEntry, now: Optional[datetime] = None) -> bool:
+    expiry = expires_at(entry)
+    return expiry is None or expiry > (now or datetime.now(tz.UTC))
+
+
+def _timestamp(when: Optional[datetime] = None) -> str:
+    return (when or datetime.now(tz.UTC)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=tz.UTC)
+
+
+def _has_result(stored: Optional[Dict]) -> bool:
+    return any(key != META_KEY for key in stored or {})
+
+
+def canonical_query(query: str) -> str:
+    """Forma canónica de una consulta: "Zapopan, Jal., México" -> "zapopan jal mexico"."""
+    return _NON_ALNUM_RE.sub(" ", unidecode(query).casefold()).strip()
+
+
+class GeocodingCache:
+    """
+    Cache en memoria sobre el dict {consulta: raw} del JSON, con índice por
+    llave canónica. Las entradas nuevas se guardan en el dict con la consulta
+    original.
+    """
+
+    def __init__(self, data: Optional[Dict] = None):
+        self.data = data if data is not None else {}
+        self._lock = threading.Lock()
+        self._build_index()
+
+    def _build_index(self):
+        # Variantes de una misma llave: gana una con resultado
+        self._canonical = {
+            canonical_query(query): query
+            for query, stored in sorted(
+                self.data.items(), key=lambda item: _has_result(item[1])
+            )
+        }
+
+    @staticmethod
+    def _entry(stored: Optional[Dict]) -> CacheEntry:
+        stored = stored or {}
+        if META_KEY not in stored:
+            return CacheEntry(stored, None)
+        meta = stored[META_KEY]
+        raw = {k: v for k, v in stored.items() if k != META_KEY}
+        return CacheEntry(raw, _parse_timestamp(meta.get("at")), meta.get("misses", 0))
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def get_entry(self, query: str) -> Optional[CacheEntry]:
+        """Entrada guardada o None si la consulta no está."""
+        if query not in self.data:
+            query = self._canonical.get(canonical_query(query))
+            if query is None:
+                return None
+        return self._entry(self.data[query])
+
+    def get(self, query: str) -> Optional[Dict]:
+        """Respuesta guardada ({} = sin resultado) o None si la consulta no está."""
+        entry = self.get_entry(query)
+        return entry.raw if entry is not None else None
+
+    def set(
+        self,
+        query: str,
+        raw: Dict,
+        misses: int = 0,
+        cached_at: Optional[datetime] = None,
+    ):
+        meta = {"at": _timestamp(cached_at), "misses": misses}
+        stored = {**(raw or {}), META_KEY: meta}
+        with self._lock:
+            self.data[query] = stored
+            key = canonical_query(query)
+            if raw or key not in self._canonical:
+                self._canonical[key] = query
+
+    def prune(self, now: Optional[datetime] = None) -> int:
+        """Borra las entradas vencidas. Retorna cuántas borró."""
+        with self._lock:
+            stale = [
+                query
+                for query, stored in self.data.items()
+                if not is_fresh(self._entry(stored), now)
+            ]
+            for query in stale:
+                del self.data[query]
+            self._build_index()
+        return len(stale)
+
+
+class SQLiteGeocodingCache:
+    """
+    Cache de geocodificación en SQLite: una fila por llave canónica (tabla
+    `geocache`) y las consultas originales como alias (`geocache_aliases`).
+
+    Las entradas nuevas quedan pendientes en memoria y se escriben en una
+    transacción con save().
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Compartida por los hilos de GeocodingEngine (con el lock)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript(GEOCACHE_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(geocache)")}
+        if "misses" not in columns:
+            # Bases creadas antes de los reintentos con backoff
+            with self._conn:
+                self._conn.execute(
+                    "ALTER TABLE geocache ADD COLUMN misses INTEGER NOT NULL DEFAULT 0"
+                )
+        self._lock = threading.Lock()
+        # llave -> (consulta, raw, updated_at, misses)
+        self._pending: Dict[str, tuple] = {}
+        self._pending_aliases: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM geocache").fetchone()[0]
+        return count + len(self._pending)
+
+    def get_entry(self, query: str) -> Optional[CacheEntry]:
+        """Entrada guardada o None si la consulta no está."""
+        key = canonical_query(query)
+        with self._lock:
+            if key in self._pending:
+                row = self._pending[key][1:]
+            else:
+                row = self._conn.execute(
+                    "SELECT raw, updated_at, misses FROM geocache WHERE key = ?", (key,)
+                ).fetchone()
+        if row is None:
+            return None
+        raw, updated_at, misses = row
+        return CacheEntry(loads(raw) or {}, _parse_timestamp(updated_at), misses)
+
+    def get(self, query: str) -> Optional[Dict]:
+        """Respuesta guardada ({} = sin resultado) o None si la consulta no está."""
+        entry = self.get_entry(query)
+        return entry.raw if entry is not None else None
+
+    def set(
+        self,
+        query: str,
+        raw: Dict,
+        misses: int = 0,
+        cached_at: Optional[datetime] = None,
+    ):
+        key = canonical_query(query)
+        row = (query, dumps(raw or {}, indent=None), _timestamp(cached_at), misses)
+        with self._lock:
+            self._pending[key] = row
+            self._pending_aliases[query] = key
+
+    def import_dict(self, data: Dict) -> int:
+        """
+        Importa el cache JSON ({consulta: raw}). Retorna cuántas entradas
+        importó. Las entradas sin fecha quedan con la fecha de la importación.
+        """
+        # Variantes de una misma llave: las que tienen resultado van al final y ganan
+        for query, stored in sorted(
+            data.items(), key=lambda item: _has_result(item[1])
+        ):
+            entry = GeocodingCache._entry(stored)
+            self.set(query, entry.raw, entry.misses, entry.cached_at)
+        count = len(self._pending)
+        self.save()
+        return count
+
+    def save(self) -> int:
+        """Escribe las entradas nuevas. Retorna cuántas escribió."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            aliases, self._pending_aliases = self._pending_aliases, {}
+            if not pending:
+                return 0
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO geocache (key, query, raw, updated_at, misses) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(key, *row) for key, row in pending.items()],
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO geocache_aliases (query, key) VALUES (?, ?)",
+                    list(aliases.items()),
+                )
+        logger.debug(f"Saved {len(pending)} geocoding entries to {self.path}")
+        return len(pending)
+
+    def prune(self, now: Optional[datetime] = None, dry_run: bool = False) -> int:
+        """Borra las entradas vencidas (y sus alias). Retorna cuántas son."""
+        self.save()
+        with self._lock:
+            stale = [
+                (key,)
+                for key, raw, updated_at, misses in self._conn.execute(
+                    "SELECT key, raw, updated_at, misses FROM geocache"
+                )
+                if not is_fresh(
+                    CacheEntry(loads(raw), _parse_timestamp(updated_at), misses), now
+                )
+            ]
+            if dry_run:
+                return len(stale)
+            with self._conn:
+                self._conn.executemany("DELETE FROM geocache WHERE key = ?", stale)
+                self._conn.executemany(
+                    "DELETE FROM geocache_aliases WHERE key = ?", stale
+                )
+        return len(stale)
+
+    def close(self):
+        self.save()
+        self._conn.close()
@@ -0,0 +1,401 @@
+"""
+Heal - Re-normalización del historial completo en paralelo.
+
+`cron-quiles heal` (o `python -m cronquiles.heal`) vuelve a pasar todos los
+registros del historial por from_dict → to_dict con las reglas actuales (tags,
+mapeo de estados, heurísticas de ubicación) en un pool de procesos, por lotes,
+sin esperar a que las corridas normales los vayan sanando.
+
+Tras cada lote los cambios se guardan en el historial (HistoryManager, con el
+almacén que se elija: JSON, bitácora, SQLite o particiones) y el avance en un
+checkpoint (`data/heal.checkpoint.json`): si la corrida se interrumpe, la
+siguiente retoma desde el último lote guardado.
+
+Con `--geocode` también se geocodifican los eventos presenciales sin estado o
+ciudad, sin el tope de 100 de aggregate_feeds. El geocoding se hace en el
+proceso principal con GeocodingEngine: hilos con el límite de tasa del
+proveedor (Nominatim admite una petición por segundo).
+
+Con `--dry-run` no se escribe nada y se reportan los campos que cambiarían
+(`--diff archivo.json` guarda el detalle por evento).
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .geocoding import GeocodingEngine
+from .geocoding_cache import SQLiteGeocodingCache
+from .history_manager import HistoryManager
+from .ics_aggregator import _init_parse_worker
+from .models import NORMALIZER_VERSION, EventNormalized
+from .serialization import dumps
+from .storage import JSONFile, atomic_write_text
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_FILE = "data/heal.checkpoint.json"
+
+
+def _event_key(item: dict) -> str:
+    return item.get("hash_key") or f"{item['title']}_{item['dtstart']}"
+
+
+def heal_record(item: dict, full: bool = False) -> dict:
+    """
+    Re-normaliza un registro aunque tenga los sellos de versión vigentes.
+
+    Sin `full` se repite el healing de _restore_from_dict (ubicación, tags);
+    con `full` el registro pasa además por el pipeline completo de __init__.
+    """
+    stale = {"schema_version", "normalizer_version"} if full else {"schema_version"}
+    return EventNormalized.from_dict(
+        {k: v for k, v in item.items() if k not in stale}
+    ).to_dict()
+
+
+def _heal_batch(items: List[dict], full: bool) -> List[Optional[dict]]:
+    """Lote para el pool de procesos (None si un registro no se pudo sanar)."""
+    healed = []
+    for item in items:
+        try:
+            healed.append(heal_record(item, full))
+        except Exception as e:
+            logger.error(f"Error healing {_event_key(item)}: {e}")
+            healed.append(None)
+    return healed
+
+
+def record_diff(old: dict, new: dict) -> Dict[str, list]:
+    """Campos que cambian: {campo: [antes, después]}."""
+    return {
+        field: [old.get(field), new.get(field)]
+        for field in sorted(set(old) | set(new))
+        if old.get(field) != new.get(field)
+    }
+
+
+class HealRun:
+    """
+    Una corrida de `heal` sobre el historial de `history_manager`.
+
+    Args:
+        history_manager: Historial (se carga completo en run)
+        workers: Procesos del pool (0 = en el proceso principal)
+        batch_size: Registros por lote (y por checkpoint)
+        full: Re-normalizar también con el pipeline de __init__
+        geocode: Geocodificar eventos presenciales sin estado o ciudad
+        max_geocode_attempts: Tope de eventos que se intentan geocodificar
+            (None = sin tope)
+        dry_run: No escribir nada, solo reportar cambios
+        geocode_workers: Hilos para geocodificar (la tasa la limita el proveedor)
+        checkpoint_file: Archivo de avance para retomar corridas interrumpidas
+    """
+
+    def __init__(
+        self,
+        history_manager: HistoryManager,
+        workers: int = 0,
+        batch_size: int = 500,
+        full: bool = False,
+        geocode: bool = False,
+        max_geocode_attempts: Optional[int] = None,
+        dry_run: bool = False,
+        geocode_workers: int = 4,
+        checkpoint_file: str = CHECKPOINT_FILE,
+        geocoding_cache_file: str = "data/geocoding_cache.json",
+        geocache_db: Optional[str] = None,
+        location_cache_file: str = "data/location_cache.json",
+    ):
+        self.history_manager = history_manager
+        self.workers = max(0, workers)
+        self.batch_size = max(1, batch_size)
+        self.full = full
+        self.geocode = geocode
+        self.max_geocode_attempts = max_geocode_attempts
+        self.dry_run = dry_run
+        self.geocode_workers = geocode_workers
+        self.location_cache_file = Path(location_cache_file)
+        self._checkpoint = JSONFile(checkpoint_file)
+        self._geocoding_file = JSONFile(geocoding_cache_file)
+        self.geocache_db = geocache_db
+        self.geocoding_cache: Dict = {}
+        self._engine: Optional[GeocodingEngine] = None
+        # Eventos que se intentaron geocodificar / que sí se geocodificaron
+        self.geocode_attempts = 0
+        self.geocoded = 0
+        self.diffs: List[Dict] = []
+
+    def _options(self) -> Dict:
+        return {
+            "normalizer_version": NORMALIZER_VERSION,
+            "full": self.full,
+            "geocode": self.geocode,
+        }
+
+    def _load_checkpoint(self) -> set:
+        """Llaves ya procesadas por una corrida interrumpida con las mismas opciones."""
+        data = self._checkpoint.load() if self._checkpoint.exists() else None
+        if not data or data.get("options") != self._options():
+            return set()
+        done = set(data.get("done", []))
+        logger.info(f"Resuming heal: {len(done)} records already processed")
+        return done
+
+    def _save_checkpoint(self, done: set):
+        self._checkpoint.save({"options": self._options(), "done": sorted(done)})
+
+    def clear_checkpoint(self):
+        if self._checkpoint.exists():
+            self._checkpoint.path.unlink()
+
+    def _create_executor(self) -> Optional[ProcessPoolExecutor]:
+        if not self.workers:
+            return None
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_parse_worker,
+            initargs=(self.location_cache_file,),
+        )
+
+    def _save_geocoding_cache(self):
+        if self.geocache_db:
+            self.geocoding_cache.save()
+        else:
+            self._geocoding_file.save(self.geocoding_cache)
+
+    def _geocode(self, results: List[Optional[dict]]) -> Dict[int, EventNormalized]:
+        """
+        Geocodifica los eventos del lote a los que les falta estado o ciudad.
+
+        Returns:
+            {posición en el lote: evento geocodificado}
+        """
+        candidates: Dict[int, EventNormalized] = {}
+        for position, healed in enumerate(results):
+            if healed is None:
+                continue
+            if (
+                self.max_geocode_attempts is not None
+                and self.geocode_attempts >= self.max_geocode_attempts
+            ):
+                break
+            event = EventNormalized.from_dict(healed)
+            if event._is_online() or (event.state_code and event.city):
+                continue
+            candidates[position] = event
+            self.geocode_attempts += 1
+        geocoded = {
+            id(event)
+            for event in self._engine.geocode_events(list(candidates.values()))
+        }
+        self.geocoded += len(geocoded)
+        return {
+            position: event
+            for position, event in candidates.items()
+            if id(event) in geocoded
+        }
+
+    def _apply(self, batch: List[dict], results: List[Optional[dict]]) -> int:
+        """Lleva los registros sanados al historial. Retorna cuántos cambiaron."""
+        changed = 0
+        geocoded = self._geocode(results) if self.geocode else {}
+        for position, (old, healed) in enumerate(zip(batch, results)):
+            if healed is None:
+                continue
+            if self.history_manager.events.get(_event_key(old), old) != old:
+                # Otro registro del lote ya se fusionó con este (replace_event)
+                continue
+            event = geocoded.get(position)
+            if event is not None:
+                healed = event.to_dict()
+            if healed == old:
+                continue
+            changed += 1
+            self.diffs.append(
+                {
+                    "hash_key": _event_key(old),
+                    "new_hash_key": _event_key(healed),
+                    "changes": record_diff(old, healed),
+                }
+            )
+            if not self.dry_run:
+                self.history_manager.replace_event(
+                    _event_key(old), event or EventNormalized.from_dict(healed)
+                )
+        return changed
+
+    def run(self) -> int:
+        """Sana todo el historial. Retorna el número de registros que cambiaron."""
+        hm = self.history_manager
+        hm.load_history()
+        # Abre también las particiones frías
+        records = hm.get_all_events()
+        if self.geocode:
+            if self.geocache_db:
+                self.geocoding_cache = SQLiteGeocodingCache(self.geocache_db)
+            else:
+                self.geocoding_cache = self._geocoding_file.load() or {}
+            self._engine = GeocodingEngine(
+                self.geocoding_cache, workers=self.geocode_workers
+            )
+
+        done = set() if self.dry_run else self._load_checkpoint()
+        pending = [item for item in records if _event_key(item) not in done]
+        batches: List[List[dict]] = []
+        for item in pending:
+            if not batches or len(batches[-1]) >= self.batch_size:
+                batches.append([])
+            batches[-1].append(item)
+        logger.info(
+            f"Healing {len(pending)} of {len(records)} records in {len(batches)} "
+            f"batches ({self.workers or 'no'} worker processes)"
+        )
+
+        executor = self._create_executor()
+        try:
+            if executor is not None:
+                results_iter = executor.map(_heal_batch, batches, repeat(self.full))
+            else:
+                results_iter = map(_heal_batch, batches, repeat(self.full))
+
+            changed = 0
+            for number, (batch, results) in enumerate(zip(batches, results_iter), 1):
+                changed += self._apply(batch, results)
+                if not self.dry_run:
+                    hm.save_history()
+                    if self.geocode:
+                        self._save_geocoding_cache()
+                    done.update(_event_key(item) for item in batch)
+                    self._save_checkpoint(done)
+                logger.info(f"Batch {number}/{len(batches)}: {changed} changed so far")
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        if self._engine is not None:
+            self._engine.report()
+        if not self.dry_run:
+            if any(diff["new_hash_key"] != diff["hash_key"] for diff in self.diffs):
+                # Hay llaves nuevas: el índice de deduplicación se reconstruye
+                # a partir del historial sanado
+                hm.rebuild_dedup_index(
+                    [EventNormalized.from_dict(item) for item in hm.get_all_events()]
+                )
+                hm.save_history()
+            hm.export_history()
+            self.clear_checkpoint()
+        return changed
+
+    def summary(self) -> Dict[str, int]:
+        """Número de eventos que cambian por campo."""
+        fields: Dict[str, int] = {}
+        for diff in self.diffs:
+            for field in diff["changes"]:
+                fields[field] = fields.get(field, 0) + 1
+        return dict(sorted(fields.items(), key=lambda x: (-x[1], x[0])))
+
+
+def main(argv: Optional[List[str]] = None):
+    """CLI de `cron-quiles heal`."""
+    parser = argparse.ArgumentParser(
+        prog="cron-quiles heal",
+        description="Re-normaliza (y opcionalmente re-geocodifica) todo el historial en paralelo",
+    )
+    parser.add_argument("--history", default="data/history.json")
+    parser.add_argument("--history-db", default=None)
+    parser.add_argument("--history-changelog", action="store_true")
+    parser.add_argument("--history-partitions", action="store_true")
+    parser.add_argument("--history-warm-days", type=int, default=None)
+    parser.add_argument("--history-cold-days", type=int, default=None)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Procesos para re-normalizar (0 = en el proceso principal). Por defecto: núcleos disponibles",
+    )
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Pasar los registros también por el pipeline completo de normalización",
+    )
+    parser.add_argument(
+        "--geocode",
+        action="store_true",
+        help="Geocodificar los eventos presenciales sin estado o ciudad (sin tope)",
+    )
+    parser.add_argument(
+        "--max-geocode-attempts",
+        type=int,
+        default=None,
+        help="Tope de eventos que se intentan geocodificar (con o sin resultado)",
+    )
+    parser.add_argument("--geocode-workers", type=int, default=4)
+    parser.add_argument("--geocache-db", default=None)
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="No escribir nada; reportar los campos que cambiarían",
+    )
+    parser.add_argument(
+        "--diff", default=None, help="Guardar el detalle de cambios en este JSON"
+    )
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE)
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Ignorar el checkpoint de una corrida interrumpida",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    history_manager = HistoryManager(
+        args.history,
+        history_db=args.history_db,
+        changelog=args.history_changelog,
+        partitioned=args.history_partitions,
+        warm_days=args.history_warm_days,
+        cold_days=args.history_cold_days,
+    )
+    run = HealRun(
+        history_manager,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        full=args.full,
+        geocode=args.geocode,
+        max_geocode_attempts=args.max_geocode_attempts,
+        dry_run=args.dry_run,
+        geocode_workers=args.geocode_workers,
+        geocache_db=args.geocache_db,
+        checkpoint_file=args.checkpoint,
+    )
+    if args.restart:
+        run.clear_checkpoint()
+
+    changed = run.run()
+    logger.info(
+        f"{'Would change' if args.dry_run else 'Changed'} {changed} records"
+        + (
+            f" ({run.geocoded} geocoded of {run.geocode_attempts} attempts)"
+            if args.geocode
+            else ""
+        )
+    )
+    for field, count in run.summary().items():
+        logger.info(f"  {field}: {count}")
+    if args.diff:
+        atomic_write_text(args.diff, dumps(run.diffs))
+        logger.info(f"Diff: {args.diff}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,27 @@
-import json
 import logging
 import os
-from typing import Dict, List
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Set
 
-from .models import EventNormalized
+from dateutil import tz
+
+from .dedup import DedupIndex
+from .history_store import (
+    UNDATED_PARTITION,
+    ColdArchive,
+    HistoryBackend,
+    HistoryChangeLog,
+    HistoryChanges,
+    JSONHistoryBackend,
+    PartitionedHistoryBackend,
+    SQLiteHistoryBackend,
+    partition_for,
+    partition_order,
+    utc_sort_key,
+)
+from .models import EventNormalized, is_current_record
+from .storage import JSONFile
 
 logger = logging.getLogger(__name__)
 
@@ -12,11 +30,109 @@ class HistoryManager:
     """
     Gestor de persistencia de eventos históricos.
     Mantiene una base de datos JSON local para preservar eventos pasados.
+
+    El almacén es un backend (HistoryBackend, ver history_store):
+    - JSON (por defecto), con `changelog` save_history solo agrega los cambios
+      a `history.changes.jsonl` y el snapshot se reescribe al compactar.
+    - `history_db`: SQLite; solo se escriben los eventos agregados,
+      actualizados o borrados en la corrida.
+    - `partitioned`: un archivo por mes en `data/history/`; solo se reescriben
+      los meses que cambiaron.
+    Con SQLite y particiones el JSON se genera con export_history, y
+    load_history solo lee los meses de los últimos `hot_days` días y los
+    futuros; los meses anteriores ("fríos") se leen cuando un evento nuevo cae
+    cerca de ellos, cuando el índice de deduplicación apunta a uno de sus
+    eventos, cuando get_events pide su ventana o cuando se pide el historial
+    completo (get_all_events).
+
+    Retención por antigüedad (niveles, con cualquiera de los almacenes):
+    - caliente: los eventos de los últimos `warm_days` días, registro completo.
+    - tibio: los anteriores se guardan con la descripción recortada a
+      `warm_description_chars` caracteres.
+    - frío: los de hace más de `cold_days` días salen del historial a un
+      archivo comprimido por año (ColdArchive, `history.archive/`). Cada año
+      se abre solo cuando un evento nuevo cae cerca (±1 día) de sus fechas,
+      cuando el índice de deduplicación apunta a uno de sus eventos, cuando
+      get_events pide una ventana que llega a él o cuando se pide el historial
+      completo (get_all_events).
+    Con `warm_days` / `cold_days` en None ese nivel no se aplica.
+
+    Junto al historial se guarda un índice de deduplicación (DedupIndex,
+    `history.dedup_index.json`): los eventos nuevos se comparan contra él en
+    merge_events, de modo que el historial se mantiene deduplicado sin volver a
+    compararlo completo en cada corrida.
     """
 
-    def __init__(self, history_file: str = "data/history.json"):
+    def __init__(
+        self,
+        history_file: str = "data/history.json",
+        dedup_index_file: Optional[str] = None,
+        history_db: Optional[str] = None,
+        changelog: bool = False,
+        partitioned: bool = False,
+        hot_days: int = 90,
+        warm_days: Optional[int] = None,
+        cold_days: Optional[int] = None,
+        warm_description_chars: int = 280,
+    ):
         self.history_file = history_file
+        # Con SQLite o particiones: exportación (y origen de la primera importación)
+        self._json_file = JSONFile(history_file)
+        base = os.path.splitext(history_file)[0]
+        self.backend: HistoryBackend
+        if history_db:
+            self.backend = SQLiteHistoryBackend(history_db)
+        elif partitioned:
+            self.backend = PartitionedHistoryBackend(base)
+        else:
+            # La bitácora aplica al historial JSON (SQLite y las particiones ya
+            # guardan solo los cambios)
+            self.backend = JSONHistoryBackend(
+                history_file,
+                HistoryChangeLog(base + ".changes.jsonl") if changelog else None,
+            )
+        self.hot_days = hot_days
+        now = datetime.now(tz.UTC)
+        # Primer mes caliente de un backend lazy (los anteriores quedan en disco)
+        self._hot_month = (now - timedelta(days=hot_days)).strftime("%Y-%m")
+        self.warm_days = warm_days
+        self.warm_description_chars = warm_description_chars
+        self._warm_cutoff = (
+            (now - timedelta(days=warm_days)).strftime("%Y-%m-%dT%H:%M:%S")
+            if warm_days is not None
+            else None
+        )
+        self.cold_days = cold_days
+        self.archive = ColdArchive(base + ".archive") if cold_days is not None else None
+        self._cold_cutoff = now - timedelta(days=cold_days or 0)
+        self._cold_cutoff_key = self._cold_cutoff.strftime("%Y-%m-%dT%H:%M:%S")
+        self.dedup_index_file = Path(dedup_index_file or base + ".dedup_index.json")
         self.events: Dict[str, dict] = {}  # Key: hash_key, Value: Event dict
+        self.dedup_index = DedupIndex()
+        # True si no hay índice válido para el historial cargado: hay que
+        # deduplicarlo completo y reconstruir el índice (rebuild_dedup_index)
+        self.needs_full_dedup = False
+        # Fusiones por UID/URL, tiempo o similitud contra el historial (auditoría)
+        self.merge_trace: List[Dict] = []
+        # Registros de versiones anteriores de esquema/normalizador sanados al cargar
+        self.healed_count = 0
+        self._index_loaded = False
+        # Cambios desde la última carga/guardado (upserts por llave para SQLite
+        # y la bitácora; en modo JSON solo deciden si hay que reescribir el archivo)
+        self._upserts: Set[str] = set()
+        self._deletes: Set[str] = set()
+        self._replace_all = False
+        # Meses de un backend lazy que siguen sin leer / que cambiaron
+        self._unloaded: Set[str] = set()
+        self._dirty_units: Set[str] = set()
+        # Llaves de self.events que viven en el archivo frío / años del archivo
+        # que hay que reescribir al guardar
+        self._archived: Set[str] = set()
+        self._archive_years: Set[str] = set()  # años ya abiertos
+        self._archive_loaded = False  # todos los años abiertos
+        self._dirty_archive_years: Set[str] = set()
+        # El historial cambió en disco en esta corrida (export_history)
+        self._history_changed = False
         self._ensure_data_dir()
 
     def _ensure_data_dir(self):
@@ -25,123 +141,620 @@ class HistoryManager:
         if dirname and not os.path.exists(dirname):
             os.makedirs(dirname)
 
-    def load_history(self):
-        """Carga la historia desde el archivo JSON."""
-        if not os.path.exists(self.history_file):
+    def _read_history(self) -> Optional[List[dict]]:
+        """Lee los eventos guardados. None si no hay historial."""
+        if self.backend.exists():
+            if self.backend.lazy:
+                return self._read_hot_units()
+            return self.backend.read_all()
+        if not self.backend.lazy or not os.path.exists(self.history_file):
             logger.info(f"No existing history file found at {self.history_file}")
+            return None
+
+        # Primera corrida con SQLite o particiones: importar el JSON completo
+        logger.info(f"Importing {self.history_file} into {self.backend.location}")
+        self._replace_all = True
+        return self._json_file.load() or []
+
+    def _read_hot_units(self) -> List[dict]:
+        """Eventos de los meses calientes (últimos hot_days días, futuro y sin fecha)."""
+        data = []
+        for unit in partition_order(self.backend.units()):
+            if unit == UNDATED_PARTITION or unit >= self._hot_month:
+                data.extend(self.backend.read_unit(unit))
+            else:
+                self._unloaded.add(unit)
+        logger.info(
+            f"Loaded hot history months from {self.backend.location} "
+            f"({len(self._unloaded)} cold months left on disk)"
+        )
+        return data
+
+    def _load_unit(self, unit: str):
+        """Lee un mes frío: igual que load_history, pero solo ese mes."""
+        if unit not in self._unloaded:
             return
+        self._unloaded.discard(unit)
+        data = self.backend.read_unit(unit)
+        self._sync_dedup_index(self._heal(data))
+        logger.debug(f"Loaded {len(data)} events from cold month {unit}")
 
-        try:
-            with open(self.history_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
+    def _load_units_near(self, dtstart: Optional[datetime]):
+        """Lee los meses del día del evento y del anterior/siguiente."""
+        if not self._unloaded or dtstart is None:
+            return
+        for days in (-1, 0, 1):
+            self._load_unit(partition_for((dtstart + timedelta(days=days)).isoformat()))
 
-            loaded_count = 0
-            for item in data:
-                # Usar from_dict para disparar la lógica de healing/standardization
-                instance = EventNormalized.from_dict(item)
-                item_healed = instance.to_dict()
+    def _load_all_units(self):
+        for unit in partition_order(list(self._unloaded)):
+            self._load_unit(unit)
 
-                # Usar hash_key si existe, sino reconstruir como antes
-                key = (
-                    item_healed.get("hash_key")
-                    or f"{item_healed['title']}_{item_healed['dtstart']}"
-                )
-                self.events[key] = item_healed
-                loaded_count += 1
+    @staticmethod
+    def _entry_unit(entry: Dict) -> str:
+        """Mes de una entrada del índice de deduplicación (por su fecha de inicio)."""
+        if entry["start"] is None:
+            return UNDATED_PARTITION
+        return datetime.fromtimestamp(entry["start"], tz.UTC).strftime("%Y-%m")
+
+    def _is_loaded(self, entry: Dict) -> bool:
+        """False si la entrada del índice es de un mes o archivo que sigue en disco."""
+        if (
+            self.archive is not None
+            and not self._archive_loaded
+            and entry["start"] is not None
+            and entry["start"] < self._cold_cutoff.timestamp()
+            and self._entry_unit(entry)[:4] not in self._archive_years
+        ):
+            return False
+        return self._entry_unit(entry) not in self._unloaded
+
+    @property
+    def _partially_loaded(self) -> bool:
+        """Quedan meses fríos o archivo frío sin abrir."""
+        return bool(self._unloaded) or (
+            self.archive is not None and not self._archive_loaded
+        )
+
+    def _is_cold(self, event_dict: dict) -> bool:
+        when = utc_sort_key(event_dict.get("dtstart"))
+        return bool(self.archive is not None and when and when < self._cold_cutoff_key)
+
+    @staticmethod
+    def _archive_year(event_dict: dict) -> str:
+        return utc_sort_key(event_dict.get("dtstart"))[:4]
+
+    def _load_archive_year(self, year: str):
+        """Abre un año del archivo frío: sus eventos se agregan a self.events como archivados."""
+        if self.archive is None or self._archive_loaded or year in self._archive_years:
+            return
+        self._archive_years.add(year)
+        data = [
+            item
+            for item in self.archive.read(year)
+            if (item.get("hash_key") or f"{item['title']}_{item['dtstart']}")
+            not in self.events
+        ]
+        loaded = self._heal(data)
+        self._archived.update(loaded)
+        self._sync_dedup_index(loaded)
+        logger.debug(f"Loaded {len(data)} events from {self.archive.directory}/{year}")
+
+    def _load_archive(self):
+        """Abre todos los años del archivo frío."""
+        if self.archive is None or self._archive_loaded:
+            return
+        for year in self.archive.years():
+            self._load_archive_year(year)
+        self._archive_loaded = True
+
+    def _load_archive_near(self, dtstart: Optional[datetime]):
+        """Abre los años del archivo frío del día del evento y del anterior/siguiente."""
+        if self.archive is None or self._archive_loaded or dtstart is None:
+            return
+        for days in (-1, 0, 1):
+            when = dtstart.astimezone(tz.UTC) + timedelta(days=days)
+            if when < self._cold_cutoff:
+                self._load_archive_year(when.strftime("%Y"))
+
+    def load_history(self):
+        """Carga la historia desde el backend (con SQLite o particiones, solo los meses calientes)."""
+        try:
+            data = self._read_history()
+            if data is None:
+                return
+
+            self._index_loaded = self.dedup_index.load(self.dedup_index_file)
+            loaded = self._heal(data)
+            loaded_count = len(data)
 
             logger.info(
-                f"Loaded {loaded_count} historical events from {self.history_file}"
+                f"Loaded {loaded_count} historical events from {self.backend.location}"
             )
+            self._sync_dedup_index(loaded)
 
         except Exception as e:
             logger.error(f"Error loading history: {e}")
 
-    def save_history(self):
-        """Guarda el estado actual en el archivo JSON."""
-        try:
-            # Convertir a lista y ordenar por fecha (descendiente, mas recientes primero)
-            events_list = list(self.events.values())
-            events_list.sort(key=lambda x: x.get("dtstart") or "", reverse=True)
+    def _heal(self, data: List[dict]) -> Dict[str, dict]:
+        """
+        Agrega eventos guardados al historial. Los registros de versiones
+        anteriores (sin las versiones vigentes de esquema/normalizador) pasan por
+        from_dict → to_dict para sanarlos; los actuales se usan tal cual.
+        """
+        loaded: Dict[str, dict] = {}
+        healed = 0
+        for item in data:
+            if is_current_record(item):
+                item_healed = item
+            else:
+                # Usar from_dict para disparar la lógica de healing/standardization
+                item_healed = EventNormalized.from_dict(item).to_dict()
+                healed += 1
+
+            # Usar hash_key si existe, sino reconstruir como antes
+            key = (
+                item_healed.get("hash_key")
+                or f"{item_healed['title']}_{item_healed['dtstart']}"
+            )
+            self.events[key] = item_healed
+            loaded[key] = item_healed
+            if item_healed != item:
+                self._upserts.add(key)
+                self._touch_unit(item)
+                self._touch_unit(item_healed)
+        if healed:
+            self.healed_count += healed
+            logger.info(
+                f"Healed {healed} records from older schema/normalizer versions"
+            )
+        return loaded
+
+    def _sync_dedup_index(self, loaded: Dict[str, dict]):
+        """
+        Ajusta el índice de deduplicación al historial cargado.
+
+        Los eventos del historial que faltan en el índice se agregan (si su
+        hash_key era un alias, el id se renombra); los ids que ya no están en el
+        historial se descartan (con un backend lazy, solo entre los meses ya leídos).
+        Sin índice válido se pide una deduplicación completa.
+        """
+        if not self._index_loaded:
+            self.needs_full_dedup = self.needs_full_dedup or bool(loaded)
+            for key, item in loaded.items():
+                self.dedup_index.add(key, EventNormalized.from_dict(item))
+            return
+
+        added = 0
+        for key, item in loaded.items():
+            if key in self.dedup_index:
+                continue
+            alias_of = self.dedup_index.keys.get(f"hash:{key}")
+            if (
+                alias_of
+                and alias_of not in self.events
+                and self._is_loaded(self.dedup_index.entries[alias_of])
+            ):
+                self.dedup_index.rename(alias_of, key)
+            self.dedup_index.add(key, EventNormalized.from_dict(item))
+            added += 1
+        removed = self.dedup_index.retain(
+            self.events,
+            scope=self._is_loaded if self._partially_loaded else None,
+        )
+        if added or removed:
+            logger.debug(f"Dedup index synced: {added} added, {removed} removed")
+
+    def rebuild_dedup_index(self, events: List[EventNormalized]):
+        """Reconstruye el índice a partir de la lista completa ya deduplicada."""
+        self.dedup_index.clear()
+        for event in events:
+            self.dedup_index.add(event.hash_key, event)
+        self.needs_full_dedup = False
+
+    def _touch_unit(self, event_dict: dict):
+        if self.backend.lazy:
+            self._dirty_units.add(partition_for(event_dict.get("dtstart")))
+
+    def set_event(self, key: str, event_dict: dict):
+        """Agrega o reemplaza un evento del historial."""
+        if self.backend.lazy:
+            # El mes tiene que estar en memoria (una partición se reescribe completa)
+            self._load_unit(partition_for(event_dict.get("dtstart")))
+            self._touch_unit(event_dict)
+        if key in self._archived:
+            # Sale del archivo frío; _apply_retention lo vuelve a archivar
+            self._archived.discard(key)
+            self._dirty_archive_years.add(self._archive_year(self.events[key]))
+        self.events[key] = event_dict
+        self._upserts.add(key)
+
+    def replace_event(self, old_key: str, event: EventNormalized) -> str:
+        """
+        Reemplaza un evento del historial por su versión re-normalizada (su
+        hash_key puede cambiar). Retorna la llave con la que quedó.
+
+        Si la llave nueva ya es de otro evento del historial, los dos registros
+        se fusionan con las reglas de merge_events y la fusión queda en
+        merge_trace (motivo "rekey").
+        """
+        event_dict = event.to_dict()
+        key = (
+            event_dict.get("hash_key")
+            or f"{event_dict['title']}_{event_dict['dtstart']}"
+        )
+        if key != old_key:
+            if key in self.events:
+                event_dict = self._merge_record(
+                    old_key, event_dict, key, self.events[key], "rekey"
+                )
+                event = EventNormalized.from_dict(event_dict)
+            if old_key in self.events:
+                self._remove_event(old_key)
+            # Las llaves del evento (UID, URL, alias) pasan a la nueva; las del
+            # evento que ya tenía la llave se conservan
+            self.dedup_index.remove(key, keep_keys=True)
+            self.dedup_index.rename(old_key, key)
+        self.set_event(key, event_dict)
+        self.dedup_index.add(key, event)
+        return key
+
+    def replace_events(self, events: Dict[str, dict]):
+        """Reemplaza el historial completo (ej: tras deduplicarlo entero)."""
+        if self.archive is not None:
+            # Los años del archivo se reescriben a partir del historial nuevo
+            self._load_archive()
+            self._archived &= events.keys()
+            self._dirty_archive_years.update(self.archive.years())
+        self.events = events
+        self._unloaded.clear()
+        self._replace_all = True
+
+    def _remove_event(self, key: str) -> dict:
+        self._upserts.discard(key)
+        event_dict = self.events.pop(key)
+        if key in self._archived:
+            self._archived.discard(key)
+            self._dirty_archive_years.add(self._archive_year(event_dict))
+        else:
+            self._deletes.add(key)
+            self._touch_unit(event_dict)
+        return event_dict
+
+    def _stored_events(self) -> Dict[str, dict]:
+        """Eventos que van al historial (sin los del archivo frío)."""
+        if not self._archived:
+            return self.events
+        return {k: v for k, v in self.events.items() if k not in self._archived}
+
+    def _apply_retention(self):
+        """
+        Aplica los niveles de retención antes de guardar: recorta la descripción
+        de los eventos tibios y pasa al archivo frío los que ya son fríos (se
+        borran del historial y se reescriben solo los años que cambiaron).
+        """
+        if self._warm_cutoff is not None:
+            # Con la elipsis el recorte queda dentro del límite: no se recorta dos veces
+            limit = self.warm_description_chars
+            cut = max(limit - 1, 0)
+            for key, event in list(self.events.items()):
+                description = event.get("description") or ""
+                when = utc_sort_key(event.get("dtstart"))
+                if len(description) > limit and when and when < self._warm_cutoff:
+                    self.set_event(
+                        key,
+                        {**event, "description": description[:cut].rstrip() + "…"},
+                    )
+
+        if self.archive is None:
+            return
+        moved = [
+            key
+            for key, event in self.events.items()
+            if key not in self._archived and self._is_cold(event)
+        ]
+        if not (moved or self._dirty_archive_years or self._upserts & self._archived):
+            return
+        # Los años se reescriben completos: los que cambian tienen que estar en memoria
+        for key in moved:
+            self._load_archive_year(self._archive_year(self.events[key]))
+        for key in moved:
+            event = self.events[key]
+            self._archived.add(key)
+            self._deletes.add(key)
+            self._touch_unit(event)
+            self._dirty_archive_years.add(self._archive_year(event))
+        for key in self._upserts & self._archived:
+            # Eventos del archivo sanados al abrirlo
+            self._dirty_archive_years.add(self._archive_year(self.events[key]))
+        self._upserts -= self._archived
+
+        by_year: Dict[str, List[dict]] = {
+            year: [] for year in self._dirty_archive_years
+        }
+        for key in self._archived:
+            year = self._archive_year(self.events[key])
+            if year in by_year:
+                by_year[year].append(self.events[key])
+        written = sum(
+            self.archive.write(year, events) for year, events in sorted(by_year.items())
+        )
+        logger.info(
+            f"Archived {len(moved)} events to {self.archive.directory}: "
+            f"{written} of {len(by_year)} years rewritten"
+        )
+        self._dirty_archive_years.clear()
+
+    @property
+    def dirty(self) -> bool:
+        """Hay eventos agregados, actualizados o borrados sin guardar."""
+        return bool(self._upserts or self._deletes or self._replace_all)
 
-            with open(self.history_file, "w", encoding="utf-8") as f:
-                json.dump(events_list, f, ensure_ascii=False, indent=2)
+    def _clear_changes(self):
+        self._upserts.clear()
+        self._deletes.clear()
+        self._replace_all = False
+        self._dirty_units.clear()
+
+    def save_history(self, force: bool = False):
+        """
+        Guarda los cambios en el backend: el archivo JSON (o la bitácora), las
+        filas de SQLite o las particiones que cambiaron.
+
+        Si no hubo cambios desde la carga no se escribe nada (salvo `force`).
+        La escritura del JSON es atómica (temporal + rename).
+        """
+        try:
+            self._apply_retention()
+            if self._replace_all or force:
+                # Se reescribe todo: los meses sin leer tienen que estar en memoria
+                self._load_all_units()
+            stored = self._stored_events()
+            changes = HistoryChanges(
+                events=stored,
+                upserts=set(self._upserts),
+                deletes=self._deletes - stored.keys(),
+                replace_all=self._replace_all,
+                dirty_units=set(self._dirty_units),
+                force=force,
+            )
+            self.backend.save(changes)
+            self._history_changed = self._history_changed or changes.dirty or force
+            self._clear_changes()
 
-            logger.info(f"Saved {len(events_list)} events to history file")
+            self.dedup_index.save(self.dedup_index_file)
 
         except Exception as e:
             logger.error(f"Error saving history: {e}")
 
-    def merge_events(self, new_events: List[EventNormalized]):
+    def export_history(self):
+        """
+        Exporta el historial de SQLite o de las particiones a history_file
+        (mismo formato que save_history). Se lee directo del backend, sin
+        cargar los meses fríos en memoria, y solo si el historial cambió en esta
+        corrida (o si todavía no hay exportación).
+        """
+        if not self.backend.lazy:
+            return
+        if not self._history_changed and self._json_file.exists():
+            logger.info(f"History unchanged, {self.history_file} not exported")
+            return
+        try:
+            events = self.backend.read_all()
+            events.sort(key=lambda x: x.get("dtstart") or "", reverse=True)
+            if self._json_file.save(events):
+                logger.info(f"Exported {len(events)} events to {self.history_file}")
+        except Exception as e:
+            logger.error(f"Error exporting history: {e}")
+
+    @property
+    def live_start(self) -> Optional[str]:
+        """
+        Inicio (UTC) de la ventana de eventos vigentes: lo que load_history
+        dejó en memoria sin abrir meses fríos ni el archivo frío. None si no hay
+        nada en disco fuera de memoria (JSON sin archivo frío): todo el historial.
+        """
+        starts = []
+        if self.backend.lazy:
+            starts.append(f"{self._hot_month}-01T00:00:00")
+        if self.archive is not None:
+            starts.append(self._cold_cutoff_key)
+        return max(starts) if starts else None
+
+    def get_events(
+        self,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        state_code: Optional[str] = None,
+    ) -> List[dict]:
+        """
+        Eventos del historial en la ventana [start, end] (ISO) y/o de un estado,
+        más recientes primero. Con SQLite o particiones solo se leen los meses
+        de la ventana, y del archivo frío solo los años de la ventana.
+        """
+        start_key, end_key = utc_sort_key(start), utc_sort_key(end)
+        if self.archive is not None and (
+            not start_key or start_key < self._cold_cutoff_key
+        ):
+            for year in self.archive.years():
+                if (not start_key or year >= start_key[:4]) and (
+                    not end_key or year <= end_key[:4]
+                ):
+                    self._load_archive_year(year)
+        for unit in list(self._unloaded):
+            if (not start_key or unit >= start_key[:7]) and (
+                not end_key or unit <= end_key[:7]
+            ):
+                self._load_unit(unit)
+        candidates = sorted(
+            self.events.values(), key=lambda x: x.get("dtstart") or "", reverse=True
+        )
+
+        events = []
+        for event in candidates:
+            when = utc_sort_key(event.get("dtstart"))
+            if start_key and (not when or when < start_key):
+                continue
+            if end_key and (not when or when > end_key):
+                continue
+            if state_code and event.get("state_code") != state_code:
+                continue
+            events.append(event)
+        return events
+
+    def merge_events(self, new_events: List[EventNormalized], fuzzy: bool = True):
         """
         Fusiona nuevos eventos con la historia existente.
 
+        Cada evento se busca en el índice de deduplicación: mismo hash_key,
+        UID / URL canónica, mismo título a menos de 2 horas o (si `fuzzy`) título
+        casi igual (Jaccard) a menos de 2 horas. Solo se compara el delta.
+
         Args:
-            new_events: Lista de objetos EventNormalized recolectados recientemente.
+            new_events: Lista de objetos EventNormalized recolectados recientemente
+                (ya deduplicados entre sí).
+            fuzzy: Usar también la coincidencia difusa de títulos
         """
         new_count = 0
         update_count = 0
 
         for event in new_events:
+            # Con un backend lazy: leer los meses donde podría estar una copia
+            self._load_units_near(event.dtstart)
+            self._load_archive_near(event.dtstart)
             event_dict = event.to_dict()
             # Usar hash_key para merge consistente
             key = event_dict.get("hash_key")
             if not key:
                 key = f"{event_dict['title']}_{event_dict['dtstart']}"
 
-            if key not in self.events:
-                self.events[key] = event_dict
+            if key in self.events:
+                existing_key, reason = key, "hash"
+            else:
+                existing_key, reason = self.dedup_index.match(event, fuzzy=fuzzy)
+                if existing_key and existing_key not in self.events:
+                    # Copia en un mes o en el archivo frío que sigue en disco
+                    entry = self.dedup_index.entries[existing_key]
+                    self._load_unit(self._entry_unit(entry))
+                    if not self._is_loaded(entry):
+                        self._load_archive_year(self._entry_unit(entry)[:4])
+                if existing_key not in self.events:
+                    existing_key = ""
+
+            if not existing_key:
+                self.set_event(key, event_dict)
+                self.dedup_index.add(key, event)
                 new_count += 1
             else:
                 # Merge inteligente: Preservar datos de mayor calidad
-                existing_event = self.events[key]
-                merged_event = event_dict.copy()
-
-                # Regla 1: Preservar ubicación si es más detallada en historia
-                # (Asumimos que más largo = más detalle, ej: "Wizeline, Calle..." vs "Wizeline")
-                old_loc = existing_event.get("location", "")
-                new_loc = merged_event.get("location", "")
-                if old_loc and len(old_loc) > len(new_loc):
-                    merged_event["location"] = old_loc
-
-                # Regla 2: Preservar metadatos geográficos si el nuevo está vacío o es menos detallado
-                geo_fields = [
-                    "address",
-                    "city",
-                    "city_code",
-                    "state",
-                    "state_code",
-                    "country",
-                    "country_code",
-                ]
-                for field in geo_fields:
-                    old_val = existing_event.get(field, "")
-                    new_val = merged_event.get(field, "")
-                    if old_val and (
-                        not new_val or len(str(old_val)) > len(str(new_val))
-                    ):
-                        merged_event[field] = old_val
-
-                # Regla 3: Preservar título si es más detallado (ej. incluye ciudad)
-                old_title = existing_event.get("title", "")
-                new_title = merged_event.get("title", "")
-                if old_title and len(old_title) > len(new_title):
-                    merged_event["title"] = old_title
-
-                # Regla 4: Preservar descripción si la nueva está vacía
-                if not merged_event.get("description") and existing_event.get(
-                    "description"
-                ):
-                    merged_event["description"] = existing_event.get("description")
-
-                self.events[key] = merged_event
+                # (si se reconoció por el índice, el evento queda bajo su nuevo hash_key)
+                existing_event = self.events[existing_key]
+                if existing_key != key:
+                    self.dedup_index.rename(existing_key, key)
+                merged_event = self._merge_record(
+                    existing_key, existing_event, key, event_dict, reason
+                )
                 update_count += 1
+                if existing_key == key and merged_event == existing_event:
+                    # El registro guardado ya es el resultado del merge: sin cambios
+                    continue
+                self._remove_event(existing_key)
+                self.set_event(key, merged_event)
+                self.dedup_index.add(key, event)
 
         logger.info(
             f"Merged history: {new_count} new, {update_count} updated. Total: {len(self.events)}"
         )
 
+    def _merge_record(
+        self,
+        existing_key: str,
+        existing_event: dict,
+        key: str,
+        event_dict: dict,
+        reason: str,
+    ) -> dict:
+        """
+        Fusiona un registro del historial (`existing_event`) con otra versión
+        del mismo evento (`event_dict`, que queda bajo `key`): preserva los
+        datos de mayor calidad y, si las llaves difieren, las URLs de la copia
+        anterior y la fusión en merge_trace.
+        """
+        merged_event = event_dict.copy()
+
+        # Regla 1: Preservar ubicación si es más detallada en historia
+        # (Asumimos que más largo = más detalle, ej: "Wizeline, Calle..." vs "Wizeline")
+        old_loc = existing_event.get("location", "")
+        new_loc = merged_event.get("location", "")
+        if old_loc and len(old_loc) > len(new_loc):
+            merged_event["location"] = old_loc
+
+        # Regla 2: Preservar metadatos geográficos si el nuevo está vacío o es menos detallado
+        geo_fields = [
+            "address",
+            "city",
+            "city_code",
+            "state",
+            "state_code",
+            "country",
+            "country_code",
+        ]
+        for field in geo_fields:
+            old_val = existing_event.get(field, "")
+            new_val = merged_event.get(field, "")
+            if old_val and (not new_val or len(str(old_val)) > len(str(new_val))):
+                merged_event[field] = old_val
+
+        # Regla 3: Preservar título si es más detallado (ej. incluye ciudad)
+        old_title = existing_event.get("title", "")
+        new_title = merged_event.get("title", "")
+        if old_title and len(old_title) > len(new_title):
+            merged_event["title"] = old_title
+
+        # Regla 4: Preservar descripción si la nueva está vacía
+        if not merged_event.get("description") and existing_event.get("description"):
+            merged_event["description"] = existing_event.get("description")
+
+        # Regla 5: Copias del mismo evento con otro hash (otra plataforma,
+        # título cambiado): conservar sus URLs en sources
+        if existing_key != key:
+            urls = {s.get("url") for s in merged_event.get("sources", [])}
+            merged_event["sources"] = list(merged_event.get("sources", [])) + [
+                s
+                for s in existing_event.get("sources", [])
+                if s.get("url") and s.get("url") not in urls
+            ]
+            self.merge_trace.append(
+                {
+                    "kept": {
+                        "title": merged_event.get("title"),
+                        "dtstart": merged_event.get("dtstart"),
+                        "url": merged_event.get("url"),
+                        "hash_key": key,
+                    },
+                    "merged": [
+                        {
+                            "title": existing_event.get("title"),
+                            "dtstart": existing_event.get("dtstart"),
+                            "url": existing_event.get("url"),
+                            "hash_key": existing_key,
+                        }
+                    ],
+                    "match": reason,
+                }
+            )
+
+        # Si mezcla campos de los dos registros, se sana aquí (from_dict →
+        # to_dict) para guardarlo con los sellos vigentes
+        if merged_event != event_dict:
+            merged_event.pop("schema_version", None)
+            merged_event = EventNormalized.from_dict(merged_event).to_dict()
+        return merged_event
+
     def get_all_events(self) -> List[dict]:
-        """Retorna todos los eventos ordenados por fecha."""
+        """Retorna todos los eventos ordenados por fecha (abre meses y archivo fríos)."""
+        self._load_all_units()
+        self._load_archive()
         events = list(self.events.values())
         events.sort(key=lambda x: x.get("dtstart") or "", reverse=True)
         return events
@@ -0,0 +1,582 @@
+"""
+History Store - Almacenes del historial de eventos.
+
+HistoryManager guarda el historial a través de un backend (HistoryBackend):
+
+- JSONHistoryBackend (por defecto): `data/history.json`. Con
+  `--history-changelog` los cambios de cada corrida se agregan a una bitácora
+  JSON Lines (HistoryChangeLog) y el snapshot solo se reescribe al compactar.
+- SQLiteHistoryBackend (`--history-db`): una fila por evento (llave =
+  hash_key) en SQLite; los cambios de una corrida se guardan como upserts en
+  una sola transacción y los eventos se leen por mes con el índice de dtstart.
+- PartitionedHistoryBackend (`--history-partitions`): un archivo por mes
+  (PartitionedHistoryStore).
+
+Los backends SQLite y por particiones son "lazy": al cargar solo se leen los
+meses recientes y los futuros, y los demás se leen cuando algo los necesita.
+Con ellos `data/history.json` queda como exportación
+(HistoryManager.export_history).
+
+Con `--history-cold-days` los eventos más antiguos salen del historial a un
+archivo frío comprimido (ColdArchive, un JSON Lines con gzip por año).
+"""
+
+import gzip
+import logging
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+from dateutil import parser, tz
+
+from .serialization import dumps, loads
+from .storage import JSONFile, atomic_write_bytes
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    hash_key TEXT PRIMARY KEY,
+    dtstart TEXT,
+    state_code TEXT,
+    source TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_dtstart ON events (dtstart);
+"""
+
+UPSERT_SQL = """
+INSERT INTO events (hash_key, dtstart, state_code, source, data)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (hash_key) DO UPDATE SET
+    dtstart = excluded.dtstart,
+    state_code = excluded.state_code,
+    source = excluded.source,
+    data = excluded.data
+"""
+
+
+def utc_sort_key(dtstart: Optional[str]) -> Optional[str]:
+    """
+    dtstart ISO (con cualquier offset) -> "YYYY-MM-DDTHH:MM:SS" en UTC, que se
+    puede comparar como texto. Sin timezone se asume UTC, igual que EventNormalized.
+    """
+    if not dtstart:
+        return None
+    try:
+        value = parser.isoparse(dtstart)
+    except (ValueError, OverflowError):
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=tz.UTC)
+    return value.astimezone(tz.UTC).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+# Eventos sin fecha (siempre se cargan)
+UNDATED_PARTITION = "undated"
+
+
+def partition_for(dtstart: Optional[str]) -> str:
+    """Partición (mes UTC "YYYY-MM") de un dtstart ISO."""
+    key = utc_sort_key(dtstart)
+    return key[:7] if key else UNDATED_PARTITION
+
+
+def partition_order(partitions: Iterable[str]) -> List[str]:
+    """Particiones en el orden de history.json: más recientes primero, sin fecha al final."""
+    dated = sorted((p for p in partitions if p != UNDATED_PARTITION), reverse=True)
+    return dated + ([UNDATED_PARTITION] if UNDATED_PARTITION in partitions else [])
+
+
+def next_month(month: str) -> str:
+    """ "YYYY-MM" del mes siguiente."""
+    year, number = int(month[:4]), int(month[5:7])
+    return f"{year + number // 12:04d}-{number % 12 + 1:02d}"
+
+
+class SQLiteHistoryStore:
+    """Historial de eventos en SQLite (una fila por evento, JSON en `data`)."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.executescript(SCHEMA)
+        return conn
+
+    @staticmethod
+    def _row(key: str, event: dict) -> tuple:
+        return (
+            key,
+            utc_sort_key(event.get("dtstart")),
+            event.get("state_code") or None,
+            event.get("source") or None,
+            dumps(event, indent=None),
+        )
+
+    def count(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    def load_all(self) -> List[dict]:
+        """Todos los eventos, en el mismo orden que history.json."""
+        with closing(self._connect()) as conn:
+            events = [
+                loads(data)
+                for (data,) in conn.execute("SELECT data FROM events ORDER BY rowid")
+            ]
+        # Mismo orden estable que save_history (orden de inserción como desempate)
+        events.sort(key=lambda x: x.get("dtstart") or "", reverse=True)
+        return events
+
+    def upsert(self, events: Dict[str, dict]):
+        """Inserta o actualiza eventos (llave -> dict) en una transacción."""
+        if not events:
+            return
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                UPSERT_SQL, [self._row(key, event) for key, event in events.items()]
+            )
+
+    def delete(self, keys: Iterable[str]):
+        keys = [(key,) for key in keys]
+        if not keys:
+            return
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("DELETE FROM events WHERE hash_key = ?", keys)
+
+    def replace_all(self, events: Dict[str, dict]):
+        """Reemplaza el contenido completo (ej: tras deduplicar todo el historial)."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM events")
+            conn.executemany(
+                UPSERT_SQL, [self._row(key, event) for key, event in events.items()]
+            )
+
+    def months(self) -> List[str]:
+        """Meses (UTC "YYYY-MM") con eventos, sin leerlos (índice de dtstart)."""
+        with closing(self._connect()) as conn:
+            return [
+                month or UNDATED_PARTITION
+                for (month,) in conn.execute(
+                    "SELECT DISTINCT substr(dtstart, 1, 7) FROM events"
+                )
+            ]
+
+    def read_month(self, month: str) -> List[dict]:
+        """Eventos de un mes (o los sin fecha), por rango del índice de dtstart."""
+        if month == UNDATED_PARTITION:
+            sql, params = "SELECT data FROM events WHERE dtstart IS NULL", ()
+        else:
+            sql = "SELECT data FROM events WHERE dtstart >= ? AND dtstart < ?"
+            params = (month, next_month(month))
+        with closing(self._connect()) as conn:
+            return [
+                loads(data) for (data,) in conn.execute(sql + " ORDER BY rowid", params)
+            ]
+
+
+class HistoryChangeLog:
+    """
+    Bitácora append-only (JSON Lines) de cambios al historial JSON.
+
+    Cada línea es un upsert o delete por hash_key:
+        {"ts": "...", "op": "upsert", "key": "...", "event": {...}}
+        {"ts": "...", "op": "delete", "key": "..."}
+
+    Al cargar se aplica sobre el snapshot (history.json). Cuando la bitácora
+    supera `max_bytes` o su primera entrada tiene más de `max_age_days`, el
+    historial se compacta: se reescribe el snapshot y la bitácora se rota a
+    `<nombre>.prev.jsonl` (la última queda como registro de lo que cambió).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 1_000_000,
+        max_age_days: int = 7,
+    ):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+
+    @property
+    def previous_path(self) -> Path:
+        return self.path.with_name(self.path.stem + ".prev" + self.path.suffix)
+
+    def read(self) -> List[dict]:
+        """Entradas de la bitácora (una línea final incompleta se descarta)."""
+        if not self.path.exists():
+            return []
+        records = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    records.append(loads(line))
+                except ValueError:
+                    logger.warning(
+                        f"Ignoring malformed line {line_number} in {self.path}"
+                    )
+        return records
+
+    @staticmethod
+    def replay(events: List[dict], records: List[dict]) -> List[dict]:
+        """Aplica las entradas sobre el snapshot; mismo orden que history.json."""
+        by_key = {
+            event.get("hash_key")
+            or f"{event.get('title')}_{event.get('dtstart')}": event
+            for event in events
+        }
+        for record in records:
+            if record.get("op") == "upsert" and isinstance(record.get("event"), dict):
+                by_key[record["key"]] = record["event"]
+            elif record.get("op") == "delete":
+                by_key.pop(record.get("key"), None)
+        result = list(by_key.values())
+        result.sort(key=lambda x: x.get("dtstart") or "", reverse=True)
+        return result
+
+    def append(self, upserts: Dict[str, dict], deletes: Iterable[str]) -> int:
+        """Agrega los cambios de una corrida. Retorna el número de entradas escritas."""
+        ts = datetime.now(tz.UTC).isoformat(timespec="seconds")
+        lines = [
+            dumps({"ts": ts, "op": "delete", "key": key}, indent=None)
+            for key in sorted(deletes)
+        ] + [
+            dumps({"ts": ts, "op": "upsert", "key": key, "event": event}, indent=None)
+            for key, event in upserts.items()
+        ]
+        if not lines:
+            return 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        return len(lines)
+
+    def should_compact(self, now: Optional[datetime] = None) -> bool:
+        """True si la bitácora superó el tamaño o la antigüedad máximos."""
+        if not self.path.exists():
+            return False
+        if self.path.stat().st_size > self.max_bytes:
+            return True
+        with open(self.path, "r", encoding="utf-8") as f:
+            first = f.readline()
+        try:
+            oldest = parser.isoparse(loads(first)["ts"])
+        except (ValueError, KeyError, TypeError):
+            return True
+        now = now or datetime.now(tz.UTC)
+        return now - oldest > timedelta(days=self.max_age_days)
+
+    def rotate(self):
+        """Después de compactar: la bitácora pasa a `.prev` y se empieza una nueva."""
+        if self.path.exists():
+            os.replace(self.path, self.previous_path)
+
+
+class PartitionedHistoryStore:
+    """
+    Historial particionado por mes (UTC) de dtstart.
+
+    Cada mes es un archivo `<directorio>/YYYY-MM.json` (mismo formato que
+    history.json) y `manifest.json` lista las particiones con su número de
+    eventos, de modo que se puede decidir qué cargar sin abrir los archivos.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self._manifest_file = JSONFile(self.directory / "manifest.json")
+        self._manifest: Optional[Dict[str, dict]] = None
+        self._files: Dict[str, JSONFile] = {}
+
+    def _file(self, partition: str) -> JSONFile:
+        if partition not in self._files:
+            self._files[partition] = JSONFile(self.directory / f"{partition}.json")
+        return self._files[partition]
+
+    def exists(self) -> bool:
+        return self._manifest_file.exists()
+
+    def partitions(self) -> Dict[str, dict]:
+        """Particiones del manifest: {"YYYY-MM": {"events": n}}."""
+        if self._manifest is None:
+            data = self._manifest_file.load() if self.exists() else None
+            self._manifest = dict((data or {}).get("partitions", {}))
+        return self._manifest
+
+    def read(self, partition: str) -> List[dict]:
+        return self._file(partition).load() or []
+
+    def write(self, partition: str, events: List[dict]) -> bool:
+        """Escribe una partición (o la borra si quedó vacía). True si cambió algo."""
+        manifest = self.partitions()
+        if not events:
+            path = self._file(partition).path
+            if path.exists():
+                path.unlink()
+            return manifest.pop(partition, None) is not None
+
+        events = sorted(events, key=lambda x: x.get("dtstart") or "", reverse=True)
+        manifest[partition] = {"events": len(events)}
+        return self._file(partition).save(events)
+
+    def save_manifest(self):
+        self._manifest_file.save(
+            {
+                "version": 1,
+                "partitions": {
+                    p: self.partitions()[p] for p in partition_order(self.partitions())
+                },
+            }
+        )
+
+
+class ColdArchive:
+    """
+    Archivo frío del historial: un `YYYY.jsonl.gz` por año (UTC) de dtstart,
+    un evento por línea, más recientes primero.
+
+    gzip se escribe con mtime=0, así que el mismo contenido genera siempre los
+    mismos bytes y un año que no cambió no se reescribe.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+
+    def _path(self, year: str) -> Path:
+        return self.directory / f"{year}.jsonl.gz"
+
+    def years(self) -> List[str]:
+        if not self.directory.exists():
+            return []
+        return sorted(
+            path.name[: -len(".jsonl.gz")] for path in self.directory.glob("*.jsonl.gz")
+        )
+
+    def read(self, year: str) -> List[dict]:
+        path = self._path(year)
+        if not path.exists():
+            return []
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return [loads(line) for line in f if line.strip()]
+
+    def write(self, year: str, events: List[dict]) -> bool:
+        """Escribe un año (o lo borra si quedó vacío). True si cambió el archivo."""
+        path = self._path(year)
+        if not events:
+            if path.exists():
+                path.unlink()
+                return True
+            return False
+
+        events = sorted(events, key=lambda x: x.get("dtstart") or "", reverse=True)
+        text = "".join(dumps(event, indent=None) + "\n" for event in events)
+        data = gzip.compress(text.encode("utf-8"), mtime=0)
+        if path.exists() and path.read_bytes() == data:
+            return False
+        atomic_write_bytes(path, data)
+        return True
+
+
+class HistoryChanges(NamedTuple):
+    """Cambios de una corrida que HistoryManager pasa al backend para guardarlos."""
+
+    events: Dict[str, dict]  # historial a guardar (sin los eventos del archivo frío)
+    upserts: Set[str]  # llaves agregadas o actualizadas
+    deletes: Set[str]  # llaves borradas
+    replace_all: bool  # reescribir todo (ej: tras deduplicar el historial completo)
+    dirty_units: Set[str]  # unidades (meses) con cambios
+    force: bool  # reescribir aunque no haya cambios
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self.upserts or self.deletes or self.replace_all)
+
+
+class HistoryBackend:
+    """
+    Interfaz de los almacenes del historial para HistoryManager.
+
+    Un backend `lazy` se lee por unidades (meses UTC de dtstart, ver
+    partition_for): HistoryManager carga al inicio solo las recientes y abre las
+    demás cuando las necesita. Uno no lazy se lee completo con read_all.
+    """
+
+    lazy = False
+
+    def __init__(self, location):
+        self.location = location
+
+    def exists(self) -> bool:
+        raise NotImplementedError
+
+    def read_all(self) -> List[dict]:
+        """Todos los eventos guardados, en el mismo orden que history.json."""
+        raise NotImplementedError
+
+    def units(self) -> List[str]:
+        """Unidades guardadas (solo backends lazy)."""
+        return []
+
+    def read_unit(self, unit: str) -> List[dict]:
+        raise NotImplementedError
+
+    def save(self, changes: HistoryChanges):
+        raise NotImplementedError
+
+
+class JSONHistoryBackend(HistoryBackend):
+    """
+    Historial en `data/history.json`, opcionalmente con bitácora de cambios
+    (HistoryChangeLog): solo se agregan los cambios y el snapshot se reescribe
+    al compactar.
+    """
+
+    def __init__(self, history_file: str, changelog: Optional[HistoryChangeLog] = None):
+        super().__init__(history_file)
+        self.file = JSONFile(history_file)
+        self.changelog = changelog
+
+    def exists(self) -> bool:
+        return self.file.exists() or bool(
+            self.changelog is not None and self.changelog.path.exists()
+        )
+
+    def read_all(self) -> List[dict]:
+        records = self.changelog.read() if self.changelog is not None else []
+        data = self.file.load() or []
+        if records:
+            data = HistoryChangeLog.replay(data, records)
+            logger.info(f"Replayed {len(records)} changes from {self.changelog.path}")
+        return data
+
+    def _should_compact(self, changes: HistoryChanges) -> bool:
+        """Compactar si la bitácora creció demasiado o si el cambio es masivo."""
+        # Cambiar más de la mitad del historial: el snapshot es más chico que la bitácora
+        return (
+            changes.force
+            or changes.replace_all
+            or self.changelog.should_compact()
+            or len(changes.upserts) * 2 > len(changes.events)
+        )
+
+    def save(self, changes: HistoryChanges):
+        if not (changes.dirty or changes.force):
+            logger.info("History unchanged, not rewritten")
+            return
+        if self.changelog is not None and not self._should_compact(changes):
+            written = self.changelog.append(
+                {key: changes.events[key] for key in changes.upserts},
+                changes.deletes,
+            )
+            logger.info(f"Appended {written} changes to {self.changelog.path}")
+            return
+
+        # Convertir a lista y ordenar por fecha (descendiente, mas recientes primero)
+        events_list = list(changes.events.values())
+        events_list.sort(key=lambda x: x.get("dtstart") or "", reverse=True)
+        if self.file.save(events_list):
+            logger.info(f"Saved {len(events_list)} events to history file")
+        else:
+            logger.info("History unchanged, not rewritten")
+        if self.changelog is not None:
+            # Compactación: el snapshot ya incluye todo lo de la bitácora
+            self.changelog.rotate()
+
+
+class SQLiteHistoryBackend(HistoryBackend):
+    """Historial en SQLite, leído por mes con el índice de dtstart."""
+
+    lazy = True
+
+    def __init__(self, path: str):
+        self.store = SQLiteHistoryStore(path)
+        super().__init__(self.store.path)
+
+    def exists(self) -> bool:
+        return self.store.path.exists() and bool(self.store.count())
+
+    def read_all(self) -> List[dict]:
+        return self.store.load_all()
+
+    def units(self) -> List[str]:
+        return self.store.months()
+
+    def read_unit(self, unit: str) -> List[dict]:
+        return self.store.read_month(unit)
+
+    def save(self, changes: HistoryChanges):
+        if not changes.dirty:
+            logger.info(f"History unchanged, {self.location} not modified")
+            return
+        if changes.replace_all:
+            self.store.replace_all(changes.events)
+            logger.info(f"Saved {len(changes.events)} events to {self.location}")
+            return
+        self.store.delete(changes.deletes)
+        self.store.upsert({key: changes.events[key] for key in changes.upserts})
+        logger.info(
+            f"Saved history to {self.location}: {len(changes.upserts)} upserted, "
+            f"{len(changes.deletes)} deleted"
+        )
+
+
+class PartitionedHistoryBackend(HistoryBackend):
+    """Historial en un archivo por mes (PartitionedHistoryStore)."""
+
+    lazy = True
+
+    def __init__(self, directory: str):
+        self.store = PartitionedHistoryStore(directory)
+        super().__init__(self.store.directory)
+
+    def exists(self) -> bool:
+        return self.store.exists()
+
+    def read_all(self) -> List[dict]:
+        return [
+            event
+            for partition in partition_order(self.store.partitions())
+            for event in self.store.read(partition)
+        ]
+
+    def units(self) -> List[str]:
+        return list(self.store.partitions())
+
+    def read_unit(self, unit: str) -> List[dict]:
+        return self.store.read(unit)
+
+    def save(self, changes: HistoryChanges):
+        if changes.replace_all or changes.force:
+            # HistoryManager ya abrió todas las particiones
+            targets = set(self.store.partitions()) | {
+                partition_for(event.get("dtstart")) for event in changes.events.values()
+            }
+        else:
+            targets = set(changes.dirty_units)
+        if not targets:
+            logger.info(f"History unchanged, {self.location} not modified")
+            return
+
+        grouped: Dict[str, List[dict]] = {partition: [] for partition in targets}
+        for event in changes.events.values():
+            partition = partition_for(event.get("dtstart"))
+            if partition in grouped:
+                grouped[partition].append(event)
+        written = 0
+        for partition in partition_order(targets):
+            written += self.store.write(partition, grouped[partition])
+        self.store.save_manifest()
+        logger.info(
+            f"Saved history to {self.location}: "
+            f"{written} of {len(targets)} changed partitions rewritten"
+        )
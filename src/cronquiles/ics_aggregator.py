@@ -6,9 +6,13 @@ y genera un calendario unificado.
 """
 
 import logging
-import json
-import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import multiprocessing
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+)
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional
@@ -19,8 +23,15 @@ from urllib.parse import urlparse, parse_qs
 import re
 
 # Import models & history
+from .dedup import FuzzyDeduplicator, group_duplicates, merge_group
+from .geocoding import GeocodingEngine
+from .geocoding_cache import SQLiteGeocodingCache
 from .models import EventNormalized
 from .history_manager import HistoryManager
+from .history_store import utc_sort_key
+from .serialization import dumps
+from .storage import JSONFile, atomic_write_text
+from .time_window import TimeWindow
 
 # Import Aggregators
 from .aggregators.eventbrite import EventbriteAggregator
@@ -169,27 +180,48 @@ def _extract_one_feed(
     timeout: int = 30,
     max_retries: int = 2,
     skip_enrich: bool = False,
+    parse_executor: Optional[Executor] = None,
+    time_window: Optional[TimeWindow] = None,
 ) -> List[EventNormalized]:
     """
     Extrae eventos de un solo feed (para ejecución en paralelo).
     Crea su propia sesión HTTP para ser thread-safe.
+
+    Con `parse_executor`, los feeds ICS (genéricos, Luma y Meetup) se parsean y
+    normalizan en el pool de procesos; el enriquecimiento (HTTP) sigue en este hilo.
+    Con `time_window`, los eventos fuera de la ventana se descartan al parsear.
     """
     session = requests.Session()
     session.headers.update({"User-Agent": "Cron-Quiles-ICS-Aggregator/1.0"})
     if agg_key == "eventbrite":
-        agg = EventbriteAggregator(session)
+        agg = EventbriteAggregator(session, time_window=time_window)
     elif agg_key == "luma":
         agg = LumaAggregator(
-            session, timeout, max_retries, luma_url_cache, skip_enrich=skip_enrich
+            session,
+            timeout,
+            max_retries,
+            luma_url_cache,
+            skip_enrich=skip_enrich,
+            parse_executor=parse_executor,
+            time_window=time_window,
         )
     elif agg_key == "meetup":
-        agg = MeetupAggregator(session, timeout, max_retries, skip_enrich=skip_enrich)
+        agg = MeetupAggregator(
+            session,
+            timeout,
+            max_retries,
+            skip_enrich=skip_enrich,
+            parse_executor=parse_executor,
+            time_window=time_window,
+        )
     elif agg_key == "hievents":
-        agg = HiEventsAggregator(session)
+        agg = HiEventsAggregator(session, time_window)
     elif agg_key == "gdgcommunitydev":
-        agg = GdgCommunityDev(session)
+        agg = GdgCommunityDev(session, time_window)
     else:
-        agg = GenericICSAggregator(session, timeout, max_retries)
+        agg = GenericICSAggregator(
+            session, timeout, max_retries, parse_executor, time_window
+        )
     try:
         return agg.extract(feed, name)
     except Exception as e:
@@ -198,6 +230,16 @@ def _extract_one_feed(
         return []
 
 
+def _init_parse_worker(location_cache_file: Path):
+    """Inicializa un proceso del pool de parseo (logging y cache de ubicaciones)."""
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    # Cada proceso tiene su propio cache; se precarga con el persistido para que
+    # los venues conocidos no se vuelvan a resolver.
+    EventNormalized._location_cache.load(location_cache_file)
+
+
 class ICSAggregator:
     """
     Orchestrator for event aggregation.
@@ -211,24 +253,77 @@ class ICSAggregator:
         max_retries: int = 2,
         feed_workers: int = 10,
         fast_mode: bool = False,
+        parse_workers: int = 0,
+        time_window: Optional[TimeWindow] = None,
+        fuzzy_dedup: bool = True,
+        full_dedup: bool = False,
+        history_db: Optional[str] = None,
+        history_changelog: bool = False,
+        history_partitions: bool = False,
+        history_hot_days: int = 90,
+        history_warm_days: Optional[int] = None,
+        history_cold_days: Optional[int] = None,
+        pretty_json: bool = False,
+        geocode_workers: int = 4,
+        geocache_db: Optional[str] = None,
     ):
         self.timeout = timeout
         self.max_retries = max_retries
         self.feed_workers = max(1, min(feed_workers, 20))
         self.fast_mode = fast_mode
+        # Procesos para parsear/normalizar feeds ICS (0 = en los hilos de descarga)
+        self.parse_workers = max(0, parse_workers)
+        # Horizonte de fechas para los feeds (None = sin filtro). Los eventos
+        # manuales no se filtran.
+        self.time_window = time_window
+        # Segunda etapa de deduplicación (títulos casi iguales a menos de 2 horas)
+        self.fuzzy_dedup = fuzzy_dedup
+        # Volver a deduplicar todo el historial aunque su índice sea válido
+        self.full_dedup = full_dedup
+        self.dedup_trace: List[Dict] = []
+        # Los JSON publicados (cronquiles-*.json) van compactos salvo pretty_json
+        self.pretty_json = pretty_json
+        # Hilos para geocodificar (el ritmo real lo pone el token bucket del proveedor)
+        self.geocode_workers = max(1, geocode_workers)
         self.session = requests.Session()
         self.session.headers.update({"User-Agent": "Cron-Quiles-ICS-Aggregator/1.0"})
 
         self.geocoding_cache = {}
         self.cache_file = Path("data/geocoding_cache.json")
+        # Escritura atómica y solo si el contenido cambió (ver storage.py)
+        self._geocoding_file = JSONFile(self.cache_file)
+        # Con geocache_db el cache vive en SQLite (búsquedas por llave canónica
+        # sin cargarlo completo); en la primera corrida se importa el JSON
+        self.geocache_db = geocache_db
         self.load_geocoding_cache()
 
         # Cache de URLs de Luma (conversiones y vanity URLs)
         self.luma_url_cache_file = Path("data/luma_url_cache.json")
         self.luma_url_cache = {"url_conversions": {}, "vanity_urls": {}}
+        self._luma_url_file = JSONFile(self.luma_url_cache_file)
         self.load_luma_url_cache()
 
-        self.history_manager = HistoryManager()
+        # Cache de resolución de ubicaciones (string de ubicación -> país/estado/ciudad)
+        self.location_cache_file = Path("data/location_cache.json")
+        self.load_location_cache()
+
+        # Con history_db el historial se guarda en SQLite y history.json se exporta
+        # Con history_changelog los cambios van a una bitácora JSONL y el
+        # snapshot history.json solo se reescribe al compactar
+        # Con history_partitions el historial se guarda por mes en data/history/
+        # y history.json se exporta
+        # Con SQLite o particiones solo se cargan (y se publican) los meses de
+        # los últimos history_hot_days días y los futuros
+        # Con history_warm_days / history_cold_days los eventos antiguos se
+        # guardan sin descripción larga / en el archivo frío data/history.archive/
+        self.history_manager = HistoryManager(
+            history_db=history_db,
+            changelog=history_changelog,
+            partitioned=history_partitions,
+            hot_days=history_hot_days,
+            warm_days=history_warm_days,
+            cold_days=history_cold_days,
+        )
 
         # Initialize specific aggregators
         self.aggregators = {
@@ -242,11 +337,34 @@ class ICSAggregator:
             "hievents": HiEventsAggregator(self.session),
         }
 
+    def _create_parse_executor(self) -> Optional[ProcessPoolExecutor]:
+        """Crea el pool de procesos de parseo si está habilitado (parse_workers > 0)."""
+        if not self.parse_workers:
+            return None
+        logger.info("Parsing ICS feeds with %d processes...", self.parse_workers)
+        # "spawn": los hilos de descarga ya están corriendo cuando se crean los
+        # procesos, y hacer fork de un proceso multi-hilo no es seguro.
+        return ProcessPoolExecutor(
+            max_workers=self.parse_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_parse_worker,
+            initargs=(self.location_cache_file,),
+        )
+
     def load_geocoding_cache(self):
+        if self.geocache_db:
+            self.geocoding_cache = SQLiteGeocodingCache(self.geocache_db)
+            if not len(self.geocoding_cache) and self.cache_file.exists():
+                imported = self.geocoding_cache.import_dict(
+                    self._geocoding_file.load() or {}
+                )
+                logger.info(
+                    f"Imported {imported} geocoding entries into {self.geocache_db}"
+                )
+            return
         if self.cache_file.exists():
             try:
-                with open(self.cache_file, "r", encoding="utf-8") as f:
-                    self.geocoding_cache = json.load(f)
+                self.geocoding_cache = self._geocoding_file.load()
                 logger.info(
                     f"Loaded {len(self.geocoding_cache)} entries from geocoding cache."
                 )
@@ -256,12 +374,15 @@ class ICSAggregator:
 
     def save_geocoding_cache(self):
         try:
-            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.cache_file, "w", encoding="utf-8") as f:
-                json.dump(self.geocoding_cache, f, ensure_ascii=False, indent=2)
-            logger.info(
-                f"Saved {len(self.geocoding_cache)} entries to geocoding cache."
-            )
+            if self.geocache_db:
+                saved = self.geocoding_cache.save()
+                if saved:
+                    logger.info(f"Saved {saved} new entries to {self.geocache_db}")
+                return
+            if self._geocoding_file.save(self.geocoding_cache):
+                logger.info(
+                    f"Saved {len(self.geocoding_cache)} entries to geocoding cache."
+                )
         except Exception as e:
             logger.warning(f"Could not save geocoding cache: {e}")
 
@@ -269,19 +390,18 @@ class ICSAggregator:
         """Carga el cache de URLs de Luma desde disco."""
         if self.luma_url_cache_file.exists():
             try:
-                with open(self.luma_url_cache_file, "r", encoding="utf-8") as f:
-                    loaded = json.load(f)
-                    if isinstance(loaded, dict):
-                        self.luma_url_cache = {
-                            "url_conversions": loaded.get("url_conversions", {}),
-                            "vanity_urls": loaded.get("vanity_urls", {}),
-                        }
-                        conv_count = len(self.luma_url_cache["url_conversions"])
-                        vanity_count = len(self.luma_url_cache["vanity_urls"])
-                        logger.info(
-                            f"Loaded {conv_count} URL conversions and "
-                            f"{vanity_count} vanity URLs from Luma cache."
-                        )
+                loaded = self._luma_url_file.load()
+                if isinstance(loaded, dict):
+                    self.luma_url_cache = {
+                        "url_conversions": loaded.get("url_conversions", {}),
+                        "vanity_urls": loaded.get("vanity_urls", {}),
+                    }
+                    conv_count = len(self.luma_url_cache["url_conversions"])
+                    vanity_count = len(self.luma_url_cache["vanity_urls"])
+                    logger.info(
+                        f"Loaded {conv_count} URL conversions and "
+                        f"{vanity_count} vanity URLs from Luma cache."
+                    )
             except Exception as e:
                 logger.warning(f"Could not load Luma URL cache: {e}")
                 self.luma_url_cache = {"url_conversions": {}, "vanity_urls": {}}
@@ -289,57 +409,57 @@ class ICSAggregator:
     def save_luma_url_cache(self):
         """Guarda el cache de URLs de Luma a disco."""
         try:
-            self.luma_url_cache_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.luma_url_cache_file, "w", encoding="utf-8") as f:
-                json.dump(self.luma_url_cache, f, ensure_ascii=False, indent=2)
-            conv_count = len(self.luma_url_cache["url_conversions"])
-            vanity_count = len(self.luma_url_cache["vanity_urls"])
-            logger.info(
-                f"Saved {conv_count} URL conversions and "
-                f"{vanity_count} vanity URLs to Luma cache."
-            )
+            if self._luma_url_file.save(self.luma_url_cache):
+                conv_count = len(self.luma_url_cache["url_conversions"])
+                vanity_count = len(self.luma_url_cache["vanity_urls"])
+                logger.info(
+                    f"Saved {conv_count} URL conversions and "
+                    f"{vanity_count} vanity URLs to Luma cache."
+                )
         except Exception as e:
             logger.warning(f"Could not save Luma URL cache: {e}")
 
+    def load_location_cache(self):
+        """Carga el cache de resolución de ubicaciones compartido por EventNormalized."""
+        loaded = EventNormalized._location_cache.load(self.location_cache_file)
+        if loaded:
+            logger.info(f"Loaded {loaded} entries from location cache.")
+
+    def save_location_cache(self):
+        """Guarda el cache de resolución de ubicaciones a disco."""
+        cache = EventNormalized._location_cache
+        try:
+            if cache.save(self.location_cache_file):
+                logger.info(
+                    f"Saved {len(cache)} entries to location cache "
+                    f"(hits: {cache.hits}, misses: {cache.misses})."
+                )
+        except Exception as e:
+            logger.warning(f"Could not save location cache: {e}")
+
     def deduplicate_events(
         self, events: List[EventNormalized], time_tolerance_hours: int = 2
     ) -> List[EventNormalized]:
         """
-        Deduplica eventos agrupándolos por hash_key (título + bloque de tiempo).
+        Deduplica eventos agrupándolos por UID / URL canónica del evento y por
+        hash_key (título + bloque de tiempo).
         Combina las URLs de eventos duplicados en el campo sources.
-        """
-        events_by_hash: Dict[str, List[EventNormalized]] = {}
 
-        for event in events:
-            hash_key = event.hash_key
-            if hash_key not in events_by_hash:
-                events_by_hash[hash_key] = []
-            events_by_hash[hash_key].append(event)
+        Los grupos con el mismo prefijo de título a menos de
+        `time_tolerance_hours` también se unen aunque hayan caído en bloques de
+        2 horas distintos (ej: 17:59Z y 18:00Z).
 
+        Si la deduplicación difusa está activa, después une las copias con
+        escritos distinto a menos de 2 horas (ver dedup.py) y agrega
+        las fusiones a self.dedup_trace.
+        """
         deduplicated = []
 
-        for hash_key, group in events_by_hash.items():
+        for group in group_duplicates(events, time_tolerance_hours):
             if len(group) == 1:
                 deduplicated.append(group[0])
             else:
-                group.sort(
-                    key=lambda e: (
-                        bool(e.url and e.url.startswith("http")),
-                        len(e.description),
-                    ),
-                    reverse=True,
-                )
-                selected = group[0]
-
-                # Combinar URLs alternativas en el campo sources
-                for duplicate in group[1:]:
-                    for dup_url in duplicate.sources:
-                        if (
-                            dup_url
-                            and dup_url.startswith("http")
-                            and dup_url not in selected.sources
-                        ):
-                            selected.sources.append(dup_url)
+                selected = merge_group(group)
 
                 logger.info(
                     f"Deduplicado: conservado '{selected.original_event.get('summary', '')}' "
@@ -347,11 +467,48 @@ class ICSAggregator:
                 )
                 deduplicated.append(selected)
 
+        if self.fuzzy_dedup:
+            deduplicator = FuzzyDeduplicator(time_tolerance_hours=time_tolerance_hours)
+            deduplicated, trace = deduplicator.deduplicate(deduplicated)
+            self.dedup_trace.extend(trace)
+
         logger.info(f"Deduplicación: {len(events)} -> {len(deduplicated)} eventos")
         return deduplicated
 
+    def save_dedup_trace(self, output_file: str):
+        """Guarda la traza de fusiones de la deduplicación difusa (para auditoría)."""
+        path = Path(output_file)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(dumps(self.dedup_trace))
+        logger.info(
+            f"Traza de deduplicación ({len(self.dedup_trace)} fusiones): {path}"
+        )
+
+    def save_state(self):
+        """
+        Guarda historial y caches. Cada almacén se escribe a lo más una vez y
+        solo si cambió (escritura atómica, ver storage.py).
+        """
+        self.history_manager.save_history()
+        # Con SQLite o particiones, history.json es solo una exportación
+        self.history_manager.export_history()
+        self.save_geocoding_cache()
+        self.save_luma_url_cache()
+        self.save_location_cache()
+
     def aggregate_feeds(
         self, feed_urls: List[str], manual_data: Optional[List[Dict]] = None
+    ) -> List[EventNormalized]:
+        try:
+            return self._aggregate_feeds(feed_urls, manual_data)
+        finally:
+            # Una sola escritura por almacén al final de la corrida; si un paso
+            # falla se conserva lo ya geocodificado y fusionado
+            self.save_state()
+
+    def _aggregate_feeds(
+        self, feed_urls: List[str], manual_data: Optional[List[Dict]]
     ) -> List[EventNormalized]:
         all_events = []
 
@@ -371,28 +528,35 @@ class ICSAggregator:
                 len(feed_tasks),
                 self.feed_workers,
             )
-            with ThreadPoolExecutor(max_workers=self.feed_workers) as executor:
-                futures = {
-                    executor.submit(
-                        _extract_one_feed,
-                        feed,
-                        name,
-                        agg_key,
-                        self.luma_url_cache,
-                        self.timeout,
-                        self.max_retries,
-                        self.fast_mode,
-                    ): (feed, name)
-                    for feed, name, agg_key in feed_tasks
-                }
-                for future in as_completed(futures):
-                    try:
-                        events = future.result()
-                        all_events.extend(events)
-                    except Exception as e:
-                        feed, name = futures[future]
-                        url = feed if isinstance(feed, str) else feed.get("url")
-                        logger.error("Error extracting from %s: %s", url, e)
+            parse_executor = self._create_parse_executor()
+            try:
+                with ThreadPoolExecutor(max_workers=self.feed_workers) as executor:
+                    futures = {
+                        executor.submit(
+                            _extract_one_feed,
+                            feed,
+                            name,
+                            agg_key,
+                            self.luma_url_cache,
+                            self.timeout,
+                            self.max_retries,
+                            self.fast_mode,
+                            parse_executor,
+                            self.time_window,
+                        ): (feed, name)
+                        for feed, name, agg_key in feed_tasks
+                    }
+                    for future in as_completed(futures):
+                        try:
+                            events = future.result()
+                            all_events.extend(events)
+                        except Exception as e:
+                            feed, name = futures[future]
+                            url = feed if isinstance(feed, str) else feed.get("url")
+                            logger.error("Error extracting from %s: %s", url, e)
+            finally:
+                if parse_executor is not None:
+                    parse_executor.shutdown()
 
         # 2. Process manual events
         if manual_data:
@@ -401,13 +565,17 @@ class ICSAggregator:
 
         # 2.5 Filter events by country (Only Mexico or Online)
         before_filter_count = len(all_events)
-        all_events = [e for e in all_events if e.country_code == "MX" or e._is_online()]
+        all_events = [e for e in all_events if e.is_mexico_or_online()]
         if len(all_events) < before_filter_count:
             logger.info(
                 f"Filtered out {before_filter_count - len(all_events)} non-Mexico / non-Online events."
             )
 
         # 3. Geocoding (Healing) Phase 1 - Live Events
+        # Token bucket por proveedor (Nominatim: 1 req/s) y pool de hilos acotado
+        geocoding_engine = GeocodingEngine(
+            self.geocoding_cache, workers=self.geocode_workers
+        )
         to_geocode = [
             e
             for e in all_events
@@ -415,21 +583,23 @@ class ICSAggregator:
         ]
         if to_geocode:
             logger.info(f"Geocoding {len(to_geocode)} new events...")
-            for event in to_geocode:
-                _, used_api = event.geocode_location(self.geocoding_cache)
-                if used_api:
-                    time.sleep(1.1)
-            self.save_geocoding_cache()
-            self.save_luma_url_cache()
+            geocoding_engine.geocode_events(to_geocode)
 
         # 4. Integrate with History
         deduplicated_new = self.deduplicate_events(all_events)
         self.history_manager.load_history()
-        self.history_manager.merge_events(deduplicated_new)
-        self.history_manager.save_history()
-
-        # 5. Get Complete List
-        all_dicts = self.history_manager.get_all_events()
+        self.history_manager.merge_events(deduplicated_new, fuzzy=self.fuzzy_dedup)
+        self.dedup_trace.extend(self.history_manager.merge_trace)
+
+        # 5. Eventos vigentes del historial: con SQLite, particiones o archivo
+        # frío solo la ventana que ya está en memoria (live_start); el historial
+        # completo solo se abre para deduplicarlo entero
+        full_dedup = self.full_dedup or self.history_manager.needs_full_dedup
+        live_start = self.history_manager.live_start
+        if full_dedup:
+            all_dicts = self.history_manager.get_all_events()
+        else:
+            all_dicts = self.history_manager.get_events(start=live_start)
         final_events = []
         for d in all_dicts:
             try:
@@ -449,36 +619,41 @@ class ICSAggregator:
             to_process = to_geocode_final[:max_to_geocode]
             logger.info(f"Healing location data: Geocoding {len(to_process)} events...")
 
-            for event in to_process:
-                success, used_api = event.geocode_location(self.geocoding_cache)
-                if used_api:
-                    time.sleep(1.1)
-                if success:
-                    # Update history immediately for persistence
-                    key = event.hash_key
-                    self.history_manager.events[key] = event.to_dict()
-
-            self.history_manager.save_history()
-            self.save_geocoding_cache()
-            self.save_luma_url_cache()
+            for event in geocoding_engine.geocode_events(to_process):
+                key = event.hash_key
+                self.history_manager.set_event(key, event.to_dict())
+        geocoding_engine.report()
 
         # 7. Final Sort and Deduplication
+        # merge_events ya comparó los eventos nuevos contra el índice de
+        # deduplicación del historial; el historial completo solo se vuelve a
+        # deduplicar si no hay índice válido (primera corrida, otra versión) o
+        # con --full-dedup.
         final_events.sort(
             key=lambda e: e.dtstart or datetime.max.replace(tzinfo=tz.UTC)
         )
-        if final_events:
+        if final_events and full_dedup:
+            logger.info("Deduplicating full history and rebuilding dedup index...")
             final_events = self.deduplicate_events(final_events)
 
             # Sync back to history manager to ensure consistency with latest deduplication logic
-            self.history_manager.events = {}
+            events_by_key = {}
             for event in final_events:
                 dict_val = event.to_dict()
                 key = (
                     dict_val.get("hash_key")
                     or f"{dict_val['title']}_{dict_val['dtstart']}"
                 )
-                self.history_manager.events[key] = dict_val
-            self.history_manager.save_history()
+                events_by_key[key] = dict_val
+            self.history_manager.replace_events(events_by_key)
+            self.history_manager.rebuild_dedup_index(final_events)
+            if live_start:
+                # Las salidas son las mismas que en una corrida normal
+                final_events = [
+                    e
+                    for e in final_events
+                    if e.dtstart and utc_sort_key(e.dtstart.isoformat()) >= live_start
+                ]
 
         logger.info(f"Final aggregated count (History + Live): {len(final_events)}")
         return final_events
@@ -599,8 +774,9 @@ class ICSAggregator:
             "events": [event.to_dict() for event in events],
         }
 
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(events_data, f, indent=2, ensure_ascii=False)
+        atomic_write_text(
+            output_file, dumps(events_data, indent=2 if self.pretty_json else None)
+        )
 
         logger.info(f"Generated JSON file: {output_file} with {len(events)} events")
         return output_file
@@ -0,0 +1,121 @@
+"""
+Location Cache - Cache LRU para la resolución de strings de ubicación.
+
+Cientos de eventos comparten los mismos venues, así que la resolución de
+país/estado/ciudad de un string de ubicación se calcula una sola vez por
+ejecución (y se persiste entre ejecuciones).
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+from .serialization import dumps, loads
+from .storage import atomic_write_text
+
+logger = logging.getLogger(__name__)
+
+# Incrementar cuando cambie la lógica de _extract_location_details para
+# invalidar las entradas persistidas con la lógica anterior.
+LOCATION_RESOLVER_VERSION = 3
+
+
+class LocationCache:
+    """
+    Cache LRU acotado y thread-safe: string de ubicación limpio -> detalles resueltos.
+
+    Los feeds se extraen en paralelo, por lo que el acceso está protegido con un lock.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Entradas nuevas desde la última carga/guardado (reordenar por LRU no cuenta)
+        self.dirty = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Dict[str, str]]:
+        """Devuelve una copia de los detalles cacheados o None si no existe."""
+        with self._lock:
+            details = self._entries.get(key)
+            if details is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(details)
+
+    def put(self, key: str, details: Dict[str, str]):
+        """Guarda los detalles resueltos, expulsando la entrada menos usada si se llena."""
+        with self._lock:
+            self._entries[key] = dict(details)
+            self._entries.move_to_end(key)
+            self.dirty = True
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.dirty = False
+
+    def load(self, path: Path) -> int:
+        """
+        Carga entradas persistidas. Descarta el archivo si fue generado con otra
+        versión del resolvedor.
+
+        Returns:
+            Número de entradas cargadas
+        """
+        if not path.exists():
+            return 0
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = loads(f.read())
+        except Exception as e:
+            logger.warning(f"Could not load location cache: {e}")
+            return 0
+
+        if (
+            not isinstance(data, dict)
+            or data.get("version") != LOCATION_RESOLVER_VERSION
+        ):
+            logger.info(
+                "Location cache is from an older resolver version, ignoring it."
+            )
+            return 0
+
+        entries = data.get("entries", {})
+        for key, details in entries.items():
+            if isinstance(details, dict):
+                self.put(key, details)
+        self.dirty = False
+        return len(entries)
+
+    def save(self, path: Path) -> bool:
+        """
+        Persiste el cache (orden de inserción = orden LRU, más reciente al final)
+        si hubo entradas nuevas.
+
+        Returns:
+            True si se escribió el archivo
+        """
+        with self._lock:
+            if not self.dirty and path.exists():
+                return False
+            entries = dict(self._entries)
+            self.dirty = False
+        atomic_write_text(
+            path,
+            dumps({"version": LOCATION_RESOLVER_VERSION, "entries": entries}),
+        )
+        return True
@@ -22,7 +22,11 @@ import os
 import yaml
 import json
 from dotenv import load_dotenv
+from . import geo_index
 from .ics_aggregator import ICSAggregator, EventNormalized, logger
+from .serialization import BACKENDS, dumps, set_backend
+from .storage import atomic_write_text
+from .time_window import TimeWindow
 
 # Cargar variables de entorno desde .env si existe
 load_dotenv()
@@ -214,13 +218,14 @@ def get_feeds_for_city(city_config: Dict) -> List[str]:
 
 
 def generate_states_metadata(
-    grouped_events: Dict[str, List[EventNormalized]], output_file: str
+    grouped_events: Dict[str, List[EventNormalized]],
+    output_file: str,
+    pretty: bool = False,
 ):
     """
-    Genera un archivo JSON con los metadatos de los estados que tienen eventos.
+    Genera un archivo JSON con los metadatos de los estados que tienen eventos
+    (compacto salvo `pretty`).
     """
-    import json
-    import pycountry
     from datetime import datetime, timezone
 
     metadata = []
@@ -280,7 +285,7 @@ def generate_states_metadata(
 
         if code.startswith("MX-"):
             try:
-                sub = pycountry.subdivisions.get(code=code)
+                sub = geo_index.get_subdivision(code)
                 if sub:
                     name = sub.name
                     # Emojis personalizados para estados populares
@@ -313,8 +318,7 @@ def generate_states_metadata(
     # Ordenar: México primero, luego por nombre
     metadata.sort(key=lambda x: (x["code"] != "mexico", x["name"]))
 
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(metadata, f, indent=2, ensure_ascii=False)
+    atomic_write_text(output_file, dumps(metadata, indent=2 if pretty else None))
 
     logger.info(
         f"✓ Metadatos de estados generados: {output_file} ({len(metadata)} estados)"
@@ -323,6 +327,12 @@ def generate_states_metadata(
 
 def main():
     """Función principal del CLI."""
+    # Subcomando: cron-quiles heal [opciones] (ver heal.py)
+    if len(sys.argv) > 1 and sys.argv[1] == "heal":
+        from .heal import main as heal_main
+
+        return heal_main(sys.argv[2:])
+
     parser = argparse.ArgumentParser(
         description="Cron-Quiles - Agregador de calendarios tech (Meetup, Luma, ICS)",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -349,6 +359,19 @@ def main():
         help="Generar también archivos JSON (activado por defecto)",
     )
 
+    parser.add_argument(
+        "--pretty-json",
+        action="store_true",
+        help="Generar los JSON publicados (cronquiles-*.json, states_metadata.json) indentados en lugar de compactos",
+    )
+
+    parser.add_argument(
+        "--json-backend",
+        choices=BACKENDS,
+        default=None,
+        help="Backend para leer/escribir JSON: json (librería estándar, por defecto) u orjson (más rápido, requiere orjson)",
+    )
+
     parser.add_argument(
         "--timeout",
         type=int,
@@ -372,6 +395,109 @@ def main():
         ),
     )
 
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        default=0,
+        help=(
+            "Procesos para parsear y normalizar los feeds ICS en paralelo (escala con núcleos). "
+            "Por defecto: 0 (en los mismos hilos de descarga)"
+        ),
+    )
+
+    parser.add_argument(
+        "--geocode-workers",
+        type=int,
+        default=4,
+        help=(
+            "Hilos para geocodificar en paralelo; la tasa la limita el proveedor "
+            "(Nominatim: 1 req/s, Google: 25 req/s). Por defecto: 4"
+        ),
+    )
+
+    parser.add_argument(
+        "--geocache-db",
+        type=str,
+        default=None,
+        help=(
+            "Guardar el cache de geocoding en SQLite (ej: data/geocoding_cache.sqlite) "
+            "en vez de data/geocoding_cache.json; la primera vez importa el JSON"
+        ),
+    )
+
+    parser.add_argument(
+        "--window-past-days",
+        type=int,
+        default=None,
+        help=(
+            "Descartar al parsear los eventos de feeds que empezaron hace más de N días "
+            "(antes de normalizar/enriquecer). Por defecto: sin límite"
+        ),
+    )
+
+    parser.add_argument(
+        "--window-future-days",
+        type=int,
+        default=None,
+        help="Descartar al parsear los eventos de feeds a más de N días en el futuro. Por defecto: sin límite",
+    )
+
+    parser.add_argument(
+        "--no-fuzzy-dedup",
+        action="store_true",
+        help="Deduplicar solo por hash_key exacto (sin unir títulos casi iguales a menos de 2 horas)",
+    )
+
+    parser.add_argument(
+        "--full-dedup",
+        action="store_true",
+        help="Volver a deduplicar todo el historial y reconstruir su índice de deduplicación",
+    )
+
+    parser.add_argument(
+        "--history-db",
+        type=str,
+        default=None,
+        help="Guardar el historial en esta base SQLite (data/history.json se exporta al final de cada corrida)",
+    )
+
+    parser.add_argument(
+        "--history-changelog",
+        action="store_true",
+        help="Guardar los cambios del historial en data/history.changes.jsonl; history.json solo se reescribe al compactar",
+    )
+
+    parser.add_argument(
+        "--history-partitions",
+        action="store_true",
+        help="Guardar el historial por mes en data/history/ (los meses antiguos se cargan solo si se necesitan)",
+    )
+    parser.add_argument(
+        "--history-hot-days",
+        type=int,
+        default=90,
+        help="Con --history-db o --history-partitions: cargar y publicar los últimos N días y el futuro (por defecto: 90)",
+    )
+    parser.add_argument(
+        "--history-warm-days",
+        type=int,
+        default=None,
+        help="Recortar la descripción de los eventos de hace más de N días en el historial",
+    )
+    parser.add_argument(
+        "--history-cold-days",
+        type=int,
+        default=None,
+        help="Mover los eventos de hace más de N días al archivo comprimido data/history.archive/",
+    )
+
+    parser.add_argument(
+        "--dedup-trace",
+        type=str,
+        default=None,
+        help="Guardar en este archivo JSON la traza de fusiones de la deduplicación difusa",
+    )
+
     parser.add_argument(
         "--verbose", action="store_true", help="Modo verbose (más logging)"
     )
@@ -411,16 +537,40 @@ def main():
         )
 
     # 2. Inicializar agregador
+    if args.json_backend:
+        logger.info(f"Backend de JSON: {set_backend(args.json_backend)}")
+
+    time_window = None
+    if args.window_past_days is not None or args.window_future_days is not None:
+        time_window = TimeWindow(args.window_past_days, args.window_future_days)
+        logger.info(f"Ventana de eventos: {time_window}")
+
     aggregator = ICSAggregator(
         timeout=args.timeout,
         max_retries=args.retries,
         fast_mode=args.fast,
+        parse_workers=args.parse_workers,
+        geocode_workers=args.geocode_workers,
+        geocache_db=args.geocache_db,
+        time_window=time_window,
+        fuzzy_dedup=not args.no_fuzzy_dedup,
+        full_dedup=args.full_dedup,
+        history_db=args.history_db,
+        history_changelog=args.history_changelog,
+        history_partitions=args.history_partitions,
+        history_hot_days=args.history_hot_days,
+        history_warm_days=args.history_warm_days,
+        history_cold_days=args.history_cold_days,
+        pretty_json=args.pretty_json,
     )
 
     # 3. Agregar y unificar eventos
     logger.info("Iniciando agregación de feeds...")
     all_events = aggregator.aggregate_feeds(feed_config, manual_data=manual_data)
 
+    if args.dedup_trace:
+        aggregator.save_dedup_trace(args.dedup_trace)
+
     if not all_events:
         logger.warning("No se encontraron eventos en los feeds.")
         sys.exit(0)
@@ -456,9 +606,7 @@ def main():
         state_name = state_code
         if state_code.startswith("MX-"):
             try:
-                import pycountry
-
-                sub = pycountry.subdivisions.get(code=state_code)
+                sub = geo_index.get_subdivision(state_code)
                 if sub:
                     state_name = sub.name
             except Exception:
@@ -502,7 +650,11 @@ def main():
         )
 
     # 7. Generar metadatos para el frontend
-    generate_states_metadata(grouped_events, str(output_path / "states_metadata.json"))
+    generate_states_metadata(
+        grouped_events,
+        str(output_path / "states_metadata.json"),
+        pretty=args.pretty_json,
+    )
 
     # 8. Actualizar estatus de comunidades en docs/COMMUNITIES.md
     try:
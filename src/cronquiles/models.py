@@ -3,24 +3,34 @@ EventNormalized Model - Modelo de datos para eventos normalizados.
 """
 
 import logging
-import os
 import re
 import json
 from datetime import datetime
-from typing import Dict, Optional, Set
-from urllib.parse import urlparse
+from functools import cached_property
+from typing import Dict, List, Optional, Set
+from urllib.parse import parse_qsl, urlencode, urlparse
 
-import pycountry
 import requests
 from unidecode import unidecode
-from geopy.geocoders import Nominatim, GoogleV3
-from geopy.exc import GeopyError
 from dateutil import parser, tz
 from icalendar import Event, vText
+from . import gazetteer, geo_index, reverse_geocoding
+from .geocoding import GEOCODING_ERRORS, GeocodingEngine
+from .location_cache import LocationCache
 from .schemas import EventSchema
 
 logger = logging.getLogger(__name__)
 
+# Versión del normalizador. Se guarda en cada registro serializado (to_dict) para
+# que from_dict pueda hidratar directamente los registros ya normalizados.
+# Incrementar cuando cambie la lógica de normalización de __init__ o el healing
+# de _restore_from_dict (los registros con una versión anterior se vuelven a sanar).
+NORMALIZER_VERSION = 2
+
+# Versión del formato de los registros serializados (campos de to_dict /
+# EventSchema). Incrementar cuando cambie su estructura.
+SCHEMA_VERSION = 1
+
 # Keywords para tags automáticos
 TAG_KEYWORDS = {
     "python": ["python", "py", "django", "flask", "fastapi"],
@@ -89,6 +99,86 @@ def detect_platform(url: str) -> str:
     return "website"
 
 
+# Parámetros de query que no identifican al evento (tracking/atribución)
+TRACKING_PARAMS = {
+    "fbclid",
+    "gclid",
+    "igshid",
+    "mc_cid",
+    "mc_eid",
+    "ref",
+    "ref_src",
+    "aff",
+    "affiliate",
+    "_gl",
+}
+
+
+def canonical_url(url: str) -> str:
+    """
+    Normaliza una URL de evento para usarla como llave de deduplicación.
+
+    - Sin esquema, "www." ni puerto; lu.ma/luma.com -> lu.ma y
+      eventbrite.com.mx (y otros dominios) -> eventbrite.com
+    - Solo el host va en minúsculas: los paths de Luma distinguen mayúsculas
+      (lu.ma/event/evt-AbC123 y evt-abc123 son eventos distintos)
+    - Sin fragmento, parámetros de tracking (utm_*, fbclid, ...) ni "/" final
+    - Meetup: meetup.com/events/{id} (el id es global, el slug del grupo cambia)
+    - Eventbrite: eventbrite.com/e/{id} (sin el slug del título)
+
+    Args:
+        url: URL del evento
+
+    Returns:
+        URL canónica, o "" si no es una URL http(s)
+    """
+    if not url:
+        return ""
+    parsed = urlparse(url.strip())
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        return ""
+
+    host = parsed.hostname.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    path = re.sub(r"/{2,}", "/", parsed.path).rstrip("/")
+
+    if host in ("lu.ma", "luma.com"):
+        host = "lu.ma"
+    elif host.endswith("meetup.com"):
+        match = re.match(r"^/[^/]+/events/(\d+)", path)
+        if match:
+            return f"meetup.com/events/{match.group(1)}"
+        host, path = "meetup.com", path.lower()
+    elif host.startswith("eventbrite."):
+        host = "eventbrite.com"
+        match = re.match(r"^/e/(?:[^/]*-)?(\d+)$", path)
+        if match:
+            return f"eventbrite.com/e/{match.group(1)}"
+
+    query = sorted(
+        (k, v)
+        for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith("utm_")
+    )
+    canonical = host + path
+    if query:
+        canonical += "?" + urlencode(query)
+    return canonical
+
+
+def is_current_record(data: Dict) -> bool:
+    """
+    True si el registro lo generó el código actual (to_dict con las versiones
+    vigentes de esquema y normalizador): ya está sanado y from_dict → to_dict
+    lo devolvería igual.
+    """
+    return (
+        data.get("schema_version") == SCHEMA_VERSION
+        and data.get("normalizer_version") == NORMALIZER_VERSION
+    )
+
+
 def get_platform_label(platform: str) -> str:
     """
     Obtiene la etiqueta de visualización para la plataforma.
@@ -108,6 +198,54 @@ def get_platform_label(platform: str) -> str:
     return labels.get(platform, "Ver sitio web")
 
 
+# Mojibake específico observado en el cache (ej: 茅 -> é, 贸 -> ó).
+# Estos suelen ocurrir cuando UTF-8 se interpreta como una variante de Windows-1252
+# o MacRoman y luego se re-codifica incorrectamente.
+MOJIBAKE_REPLACEMENTS = {
+    "茅": "é",
+    "贸": "ó",
+    "谩": "á",
+    "铆": "í",
+    "煤": "ú",
+    "帽": "ñ",
+    "麓": "í",  # A veces el acento solo
+    "√©": "é",  # MacRoman Mojibake
+    "√°": "á",
+    "√≠": "í",
+    "√≥": "ó",
+    "√∫": "ú",
+    "√±": "ñ",
+    "√ì": "Ó",
+    "√Å": "Á",
+    "¬∫": "º",  # Paseo -> P.º
+    "¬": "",  # A veces queda solo el ¬ de un UTF-8 roto
+}
+
+# Alternancia precompilada: las llaves más largas primero para que "¬∫" gane sobre "¬"
+_MOJIBAKE_RE = re.compile(
+    "|".join(re.escape(k) for k in sorted(MOJIBAKE_REPLACEMENTS, key=len, reverse=True))
+)
+
+# Caracteres que pueden iniciar una corrección. Si el texto no contiene ninguno,
+# fix_encoding solo tiene que hacer strip().
+_ENCODING_TRIGGERS_RE = re.compile(
+    "[%s]"
+    % re.escape(
+        "".join(sorted({k[0] for k in MOJIBAKE_REPLACEMENTS} | {"Ã", "\ufffd"}))
+    )
+)
+
+# Rango CJK: \u4e00-\u9fff
+_CJK_RE = re.compile(r"[\u4e00-\u9fff]")
+_OCCIDENTAL_RE = re.compile(r"[a-zA-ZáéíóúñÁÉÍÓÚÑ]")
+
+
+class _CleanText(str):
+    """Texto ya corregido por fix_encoding; no se vuelve a escanear."""
+
+    __slots__ = ()
+
+
 def fix_encoding(text: str) -> str:
     """
     Corrige problemas comunes de codificación (mojibake).
@@ -115,15 +253,27 @@ def fix_encoding(text: str) -> str:
     Detecta y corrige casos donde texto UTF-8 fue interpretado como Latin-1 o MacRoman.
     Ejemplo: "CariÃ±o" -> "Cariño", "M茅xico" -> "México"
 
+    Se hace en una sola pasada: el texto ASCII y el texto sin caracteres
+    sospechosos salen de inmediato, la tabla de mojibake se aplica con una
+    alternancia precompilada y el resultado limpio se marca para que las
+    llamadas siguientes (ej: en to_ical_event) no lo vuelvan a escanear.
+
     Args:
         text: String que puede tener problemas de codificación
 
     Returns:
         String con codificación corregida
     """
-    if not isinstance(text, str) or not text:
+    if not isinstance(text, str) or not text or isinstance(text, _CleanText):
         return text
 
+    # Texto ASCII: no puede contener mojibake (str.isascii es O(1) en CPython)
+    if text.isascii():
+        return text.strip()
+
+    if not _ENCODING_TRIGGERS_RE.search(text):
+        return _CleanText(text.strip())
+
     # 1. Corregir Mojibake común de UTF-8 como Latin-1 (ej: Ã© -> é)
     if "Ã" in text:
         try:
@@ -132,53 +282,28 @@ def fix_encoding(text: str) -> str:
         except (UnicodeEncodeError, UnicodeDecodeError):
             pass
 
-    # 2. Corregir Mojibake específico observado en el cache (ej: 茅 -> é, 贸 -> ó)
-    # Estos suelen ocurrir cuando UTF-8 se interpreta como una variante de Windows-1252 o similar
-    # y luego se re-codifica incorrectamente.
-    replacements = {
-        "茅": "é",
-        "贸": "ó",
-        "谩": "á",
-        "铆": "í",
-        "煤": "ú",
-        "帽": "ñ",
-        "麓": "í",  # A veces el acento solo
-        "√©": "é",  # MacRoman Mojibake
-        "√°": "á",
-        "√≠": "í",
-        "√≥": "ó",
-        "√∫": "ú",
-        "√±": "ñ",
-        "√ì": "Ó",
-        "√Å": "Á",
-        "¬∫": "º",  # Paseo -> P.º
-        "¬": "",  # A veces queda solo el ¬ de un UTF-8 roto
-    }
-
-    # Solo aplicar si vemos que hay una mezcla sospechosa o caracteres típicos de mojibake
+    # 2. Reemplazar mojibake conocido en una sola pasada
     # (No queremos romper texto que legítimamente use caracteres chinos si los hubiera,
     # aunque en este contexto de eventos en México es poco probable).
-    if any(c in text for c in replacements.keys()):
-        # Si contiene 'México' o 'Mexico' mal codificado, es casi seguro que necesita fix
-        for corrupted, clean in replacements.items():
-            text = text.replace(corrupted, clean)
+    text = _MOJIBAKE_RE.sub(lambda m: MOJIBAKE_REPLACEMENTS[m.group()], text)
 
     # 3. Eliminar caracteres de reemplazo e intentar limpiar basura residual
     if "\ufffd" in text:
         text = text.replace("\ufffd", "")
-        # Si después de quitar el  quedaron caracteres chinos aislados en un texto que
+        # Si después de quitar el � quedaron caracteres chinos aislados en un texto que
         # claramente es español/inglés, es probable que sean ruido de codificación.
         # (Heurística simple para el contexto del proyecto).
-        import re
-
-        # Rango CJK: \u4e00-\u9fff
-        if re.search(r"[\u4e00-\u9fff]", text):
+        if _CJK_RE.search(text):
             # Solo si el resto del texto parece occidental
-            occidental = len(re.findall(r"[a-zA-ZáéíóúñÁÉÍÓÚÑ]", text))
-            if occidental > 5:
-                text = re.sub(r"[\u4e00-\u9fff]", "", text)
+            if len(_OCCIDENTAL_RE.findall(text)) > 5:
+                text = _CJK_RE.sub("", text)
 
-    return text.strip()
+    text = text.strip()
+    # Solo marcar como limpio si volver a aplicar fix_encoding no cambiaría nada
+    # (ej: quitar un "¬" puede dejar "√©" que una segunda pasada sí corregiría)
+    if _ENCODING_TRIGGERS_RE.search(text):
+        return text
+    return _CleanText(text)
 
 
 class EventNormalized:
@@ -196,10 +321,13 @@ class EventNormalized:
     """
 
     # Cache para subdivisiones (estados) de México
-    _mx_subdivisions_cache: Optional[Dict[str, pycountry.db.Subdivision]] = None
+    _mx_subdivisions_cache: Optional[Dict[str, geo_index.Subdivision]] = None
+
+    # Cache LRU compartido: string de ubicación limpio -> detalles resueltos
+    _location_cache = LocationCache()
 
     @classmethod
-    def _get_mx_subdivisions_lookup(cls) -> Dict[str, pycountry.db.Subdivision]:
+    def _get_mx_subdivisions_lookup(cls) -> Dict[str, geo_index.Subdivision]:
         """
         Construye una tabla de búsqueda dinámica para subdivisiones de México.
         """
@@ -208,7 +336,7 @@ class EventNormalized:
 
         lookup = {}
         try:
-            subs = pycountry.subdivisions.get(country_code="MX")
+            subs = geo_index.subdivisions_for("MX")
             for sub in subs:
                 # Normalizar nombre base (ej: "Veracruz de Ignacio de la Llave" -> "veracruz")
                 name_clean = cls._normalize_subdivision_name(sub.name)
@@ -324,11 +452,13 @@ class EventNormalized:
             raw_summary = raw_summary.replace("|", " - ")
 
         # Guardar summary limpio para uso posterior (display)
+        # (title, organizer, hash_key y tags se calculan al primer uso: ver propiedades)
         self.summary = raw_summary
-        self.title = self._normalize_title(raw_summary)
 
         self.description = self._clean_ical_property(event.get("description"))
         self.url = str(event.get("url", "")) if event.get("url") else ""
+        # UID del VEVENT (estable entre descargas en Meetup/Luma): llave de deduplicación
+        self.uid = str(event.get("uid", "")).strip() if event.get("uid") else ""
 
         # Soporte multi-fuente: lista de todas las URLs para este evento
         # Se inicializa con la URL principal, fuentes adicionales se agregan durante la deduplicación
@@ -348,18 +478,10 @@ class EventNormalized:
             if self.url and self.url not in self.sources:
                 self.sources.append(self.url)
 
-        self.organizer = self._extract_group()
-
         # Manejar fechas con timezone
         self.dtstart = self._extract_datetime(event.get("dtstart"))
         self.dtend = self._extract_datetime(event.get("dtend"))
 
-        # Calcular hash para deduplicación
-        self.hash_key = self._compute_hash()
-
-        # Tags automáticos
-        self.tags = self._extract_tags()
-
         # Flag para forzar online (ej: detectado via structured data)
         self.forced_online = False
 
@@ -376,10 +498,80 @@ class EventNormalized:
         # Homologar resultados
         self._standardize_location()
 
-    @classmethod
-    def from_dict(cls, data: Dict) -> "EventNormalized":
-        """Reconstruye un objeto EventNormalized desde un diccionario."""
-        # Crear un evento dummy de icalendar
+    # --- Campos perezosos ---
+    # Solo dtstart, la ubicación (país) y la señal de online se calculan en
+    # __init__: son los que necesita el filtro México/Online. El resto se
+    # calcula al primer acceso, así los eventos descartados no lo pagan.
+    # Son asignables (from_dict los restaura directamente).
+
+    @cached_property
+    def title(self) -> str:
+        """Título normalizado (para deduplicación y hash)."""
+        return self._normalize_title(self.summary)
+
+    @cached_property
+    def organizer(self) -> str:
+        """Nombre del grupo/organizador."""
+        return self._extract_group()
+
+    @cached_property
+    def hash_key(self) -> str:
+        """Hash para deduplicación (título + bloque de 2 horas)."""
+        return self._compute_hash()
+
+    @cached_property
+    def tags(self) -> Set[str]:
+        """Tags automáticos basados en keywords."""
+        return self._extract_tags()
+
+    def materialize(self) -> "EventNormalized":
+        """Calcula todos los campos perezosos (ej: antes de serializar o comparar)."""
+        self.title, self.organizer, self.hash_key, self.tags
+        return self
+
+    def is_mexico_or_online(self) -> bool:
+        """Filtro del pipeline: solo eventos en México o en línea."""
+        return self.country_code == "MX" or self._is_online()
+
+    @property
+    def original_event(self) -> Event:
+        """
+        Evento icalendar de origen.
+
+        Para registros hidratados por la vía rápida de from_dict (y eventos que
+        llegan de un proceso worker) se construye solo cuando se necesita
+        (to_ical_event, fallback del grupo/título).
+        """
+        if self._original_event is None and self._stub_data is not None:
+            if isinstance(self._stub_data, bytes):
+                # Evento recibido de un proceso worker (ver __getstate__)
+                self._original_event = Event.from_ical(self._stub_data)
+            else:
+                self._original_event = self._build_stub_event(self._stub_data)
+            self._stub_data = None
+        return self._original_event
+
+    @original_event.setter
+    def original_event(self, event: Event):
+        self._original_event = event
+        self._stub_data = None
+
+    def __getstate__(self) -> Dict:
+        """
+        Estado picklable y compacto (para el pool de procesos de parseo).
+
+        El evento icalendar original viaja serializado como iCalendar y se
+        vuelve a parsear solo si se accede a él.
+        """
+        state = self.__dict__.copy()
+        if self._original_event is not None:
+            state["_original_event"] = None
+            state["_stub_data"] = self._original_event.to_ical()
+        return state
+
+    @staticmethod
+    def _build_stub_event(data: Dict) -> Event:
+        """Crea el evento icalendar mínimo que representa un registro serializado."""
         event = Event()
         # Nota: El summary aquí puede ser overwriteable si lo parseamos abajo
         event.add("summary", data.get("title", ""))
@@ -397,9 +589,68 @@ class EventNormalized:
             except Exception:
                 pass
 
-        # Instanciar (esto ejecutará init y re-normalización, lo cual está bien)
-        # Pero queremos preservar valores exactos del historial/manual si ya estaban normalizados
-        instance = cls(event, data.get("source", ""), feed_name=data.get("organizer"))
+        # Restaurar summary original (Grupo|Resumen|...) en el evento también
+        formatted_title = data.get("title", "")
+        if "|" in formatted_title:
+            parts = formatted_title.split("|")
+            if len(parts) >= 2:
+                event.add("summary", parts[1])
+
+        return event
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "EventNormalized":
+        """
+        Reconstruye un objeto EventNormalized desde un diccionario.
+
+        Los registros generados con la versión actual del normalizador
+        (`normalizer_version == NORMALIZER_VERSION`) se hidratan directamente;
+        los registros legacy pasan por el pipeline completo de __init__.
+        """
+        if data.get("normalizer_version") == NORMALIZER_VERSION:
+            instance = cls._hydrate_normalized(data)
+        else:
+            # Instanciar (esto ejecutará init y re-normalización, lo cual está bien)
+            # Pero queremos preservar valores exactos del historial/manual si ya estaban normalizados
+            event = cls._build_stub_event(data)
+            instance = cls(
+                event, data.get("source", ""), feed_name=data.get("organizer")
+            )
+            # Tags automáticos del evento stub (título formateado), antes de
+            # que _restore_from_dict sobreescriba título y descripción
+            instance.tags = instance._extract_tags()
+
+        instance._restore_from_dict(data)
+        return instance
+
+    @classmethod
+    def _hydrate_normalized(cls, data: Dict) -> "EventNormalized":
+        """
+        Vía rápida de from_dict: sin parsear el evento icalendar ni re-extraer
+        URL, grupo, fechas o ubicación, ya que _restore_from_dict los sobreescribe.
+
+        Solo calcula lo que el pipeline completo aporta y el registro no guarda:
+        los tags automáticos del título/descripción del evento stub.
+        """
+        instance = cls.__new__(cls)
+        instance._original_event = None
+        instance._stub_data = data
+        instance.feed_name = data.get("organizer")
+        instance.forced_online = False
+
+        # Mismos textos que vería __init__ al leer el evento stub
+        raw_summary = cls._clean_ical_property(data.get("title", ""))
+        if "|" in raw_summary:
+            raw_summary = raw_summary.replace("|", " - ")
+        instance.title = instance._normalize_title(raw_summary)
+        instance.description = cls._clean_ical_property(data.get("description", ""))
+        instance.tags = instance._extract_tags()
+
+        return instance
+
+    def _restore_from_dict(self, data: Dict):
+        """Sobreescribe los campos con los valores exactos del diccionario."""
+        instance = self
 
         # Sobreescribir con valores exactos del diccionario para evitar re-normalización destructiva
         # Restaurar título normalizado para hashing consistente
@@ -414,8 +665,6 @@ class EventNormalized:
                 raw_summary = parts[1]
                 clean_summary_extracted = raw_summary
                 instance.title = instance._normalize_title(raw_summary)
-                # Restaurar summary en el evento original también
-                event.add("summary", parts[1])
             else:
                 instance.title = instance._normalize_title(formatted_title)
                 clean_summary_extracted = formatted_title
@@ -429,6 +678,7 @@ class EventNormalized:
 
         instance.description = data.get("description", "")
         instance.url = data.get("url", "")
+        instance.uid = data.get("uid", "")
         instance.location = data.get("location", "")
         instance.organizer = data.get("organizer", "")
 
@@ -449,8 +699,11 @@ class EventNormalized:
             # Migración: si no hay sources, inicializar con la URL principal
             instance.sources = [instance.url] if instance.url else []
 
+        dtstart_str = data.get("dtstart")
         if dtstart_str:
             instance.dtstart = parser.isoparse(dtstart_str)
+        else:
+            instance.dtstart = None
 
         dtend_str = data.get("dtend")
         if dtend_str:
@@ -467,7 +720,7 @@ class EventNormalized:
 
         # Restore location metadata if available and valid (has codes)
         # If history has invalid/empty codes, we keep the ones from initial extraction (cls() above)
-        if data.get("country_code"):
+        if is_current_record(data) or data.get("country_code"):
             instance.country = data.get("country", "")
             instance.country_code = data.get("country_code", "")
             instance.state = data.get("state", "")
@@ -477,20 +730,25 @@ class EventNormalized:
             instance.address = data.get("address", data.get("location", ""))
 
             # --- Healing / Migration ---
-            # Si el país es "Mexico" (sin acento) o la ciudad parece un lugar (headquarters, etc)
-            # re-extraer para usar la nueva lógica mejorada
-            if instance.country == "Mexico":
-                loc_details = instance._extract_location_details()
-                instance.country = loc_details["country"]
-                instance.country_code = loc_details["country_code"]
-                instance.state = loc_details["state"]
-                instance.state_code = loc_details["state_code"]
-                instance.city = loc_details["city"]
-                instance.city_code = loc_details["city_code"]
-                instance.address = loc_details.get("address_alias", instance.location)
-
-            # Homologar siempre al cargar de historia (Healing Dinámico)
-            instance._standardize_location()
+            # Los registros generados por el código actual ya se sanaron al
+            # guardarse (is_current_record): se restauran tal cual
+            if not is_current_record(data):
+                # Si el país es "Mexico" (sin acento) o la ciudad parece un lugar (headquarters, etc)
+                # re-extraer para usar la nueva lógica mejorada
+                if instance.country == "Mexico":
+                    loc_details = instance._extract_location_details()
+                    instance.country = loc_details["country"]
+                    instance.country_code = loc_details["country_code"]
+                    instance.state = loc_details["state"]
+                    instance.state_code = loc_details["state_code"]
+                    instance.city = loc_details["city"]
+                    instance.city_code = loc_details["city_code"]
+                    instance.address = loc_details.get(
+                        "address_alias", instance.location
+                    )
+
+                # Homologar al cargar de historia (Healing Dinámico)
+                instance._standardize_location()
         elif "country" in data:
             # Migration from previous format (country/state only)
             instance.address = data.get("address", data.get("location", ""))
@@ -501,6 +759,8 @@ class EventNormalized:
             instance.state_code = loc_details["state_code"]
             instance.city = loc_details["city"]
             instance.city_code = loc_details["city_code"]
+            # Igual que __init__: sanar dos veces da el mismo registro
+            instance._standardize_location()
         else:
             # Re-calculate if not in JSON
             loc_details = instance._extract_location_details()
@@ -511,11 +771,10 @@ class EventNormalized:
             instance.city = loc_details["city"]
             instance.city_code = loc_details["city_code"]
             instance.address = instance.location
+            instance._standardize_location()
 
         instance.hash_key = instance._compute_hash()
 
-        return instance
-
     def _extract_url_from_description(self) -> str:
         """
         Intenta extraer una URL del evento de la descripción.
@@ -878,7 +1137,26 @@ class EventNormalized:
     def _extract_location_details(self) -> Dict[str, str]:
         """
         Extrae detalles de ubicación (país, estado, ciudad) y sus códigos ISO.
+
+        El resultado depende solo del string de ubicación, así que se resuelve
+        a través del cache LRU compartido (ver location_cache.py).
         """
+        if not self.location or not self.location.strip():
+            return self._resolve_location_details("")
+
+        location = self.location.strip()
+        # Limpiar dobles comas y espacios extra
+        location_cleaned = re.sub(r",\s*,", ",", location)
+
+        details = self._location_cache.get(location_cleaned)
+        if details is None:
+            details = self._resolve_location_details(location_cleaned)
+            self._location_cache.put(location_cleaned, details)
+        return details
+
+    @classmethod
+    def _resolve_location_details(cls, location_cleaned: str) -> Dict[str, str]:
+        """Resuelve país/estado/ciudad de un string de ubicación ya limpio (sin cache)."""
         details = {
             "country": "",
             "country_code": "",
@@ -888,25 +1166,22 @@ class EventNormalized:
             "city_code": "",
         }
 
-        if not self.location or not self.location.strip():
-            return details
-
-        location = self.location.strip()
-        # Limpiar dobles comas y espacios extra
-        location_cleaned = re.sub(r",\s*,", ",", location)
         parts = [p.strip() for p in location_cleaned.split(",") if p.strip()]
 
         # --- 1. Detectar País ---
         country_obj = None
-        # Intentar buscar el último componente en pycountry
+        # Si el país salió de un código alpha-2 ("NL" también es Nuevo León)
+        by_alpha_2 = False
+        # Intentar buscar el último componente en el índice ISO
         if parts:
             try:
                 # Buscar por nombre exacto o código
-                country_obj = (
-                    pycountry.countries.get(name=parts[-1])
-                    or pycountry.countries.get(official_name=parts[-1])
-                    or pycountry.countries.get(alpha_2=parts[-1].upper())
-                )
+                country_obj = geo_index.get_country(
+                    name=parts[-1]
+                ) or geo_index.get_country(official_name=parts[-1])
+                if not country_obj:
+                    country_obj = geo_index.get_country(alpha_2=parts[-1].upper())
+                    by_alpha_2 = bool(country_obj)
             except Exception:
                 pass
 
@@ -921,7 +1196,7 @@ class EventNormalized:
             ]
             if any(any(kw in p.lower() for kw in mx_keywords) for p in parts):
                 try:
-                    country_obj = pycountry.countries.get(alpha_2="MX")
+                    country_obj = geo_index.get_country(alpha_2="MX")
                 except Exception:
                     pass
         if country_obj:
@@ -931,16 +1206,28 @@ class EventNormalized:
             details["country_code"] = country_obj.alpha_2
 
         # --- 2. Detectar Estado (Subdivision) ---
+        # Primero el gazetteer offline (estados, abreviaturas, municipios, colonias)
+        # Sin país (o con un código alpha-2) solo se toma México si el gazetteer
+        # encuentra municipio + estado (ej: "Monterrey, NL"), ver gazetteer.resolve
         state_obj = None
-        if country_obj and country_obj.alpha_2 == "MX":
-            lookup = self._get_mx_subdivisions_lookup()
+        place = None
+        in_mexico = bool(country_obj) and country_obj.alpha_2 == "MX"
+        if in_mexico or not country_obj or by_alpha_2:
+            place = gazetteer.resolve(parts, in_mexico=in_mexico)
+        if place:
+            if not in_mexico:
+                details["country"] = "México"
+                details["country_code"] = "MX"
+            state_obj = geo_index.get_subdivision(place.state_code)
+        elif country_obj and country_obj.alpha_2 == "MX":
+            lookup = cls._get_mx_subdivisions_lookup()
 
             # Buscar coincidencias en los componentes de la dirección
             for part in parts:
                 p_low = part.lower().strip()
 
                 # 2. Normalizar y buscar en el lookup dinámico
-                norm_name = self._normalize_subdivision_name(p_low)
+                norm_name = cls._normalize_subdivision_name(p_low)
 
                 if norm_name in lookup:
                     state_obj = lookup[norm_name]
@@ -948,17 +1235,10 @@ class EventNormalized:
 
         # Caso genérico para otros países (si lo necesitáramos)
         elif country_obj:
-            try:
-                subs = pycountry.subdivisions.get(country_code=country_obj.alpha_2)
-                for part in parts:
-                    for sub in subs:
-                        if sub.name.lower() == part.lower():
-                            state_obj = sub
-                            break
-                    if state_obj:
-                        break
-            except Exception:
-                pass
+            for part in parts:
+                state_obj = geo_index.find_subdivision(country_obj.alpha_2, part)
+                if state_obj:
+                    break
 
         if state_obj:
             details["state"] = state_obj.name
@@ -967,7 +1247,8 @@ class EventNormalized:
             # Especial: Amazon HQ en CDMX
 
         # --- 3. Detectar Ciudad ---
-        city_name = ""
+        # Solo si el gazetteer la conoce (ver el FIX de abajo)
+        city_name = place.city if place else ""
         # Usualmente la ciudad es el primer componente o el segundo
         if parts:
             # Filtrar componentes que ya identificamos como estado o país
@@ -1106,231 +1387,194 @@ class EventNormalized:
 
         return details
 
-    def geocode_location(self, cache: Optional[Dict] = None) -> tuple[bool, bool]:
+    def apply_gazetteer(self) -> bool:
         """
-        Usa geopy (GoogleV3 o Nominatim) para obtener detalles precisos de la ubicación.
-        Actualiza los campos country, state, city y sus respectivos códigos.
+        Completa estado y ciudad con el gazetteer offline, sin llamar al
+        geocodificador. Retorna True si los aplicó (ya no hace falta geocodificar).
+        """
+        if not self.location or self._is_online():
+            return False
+        details = self._extract_location_details()
+        if (
+            details["country_code"] != "MX"
+            or not details["state_code"]
+            or not details["city"]
+        ):
+            return False
+        self.country = details["country"]
+        self.country_code = details["country_code"]
+        self.state = details["state"]
+        self.state_code = details["state_code"]
+        self.city = details["city"]
+        self.city_code = details["city_code"]
+        self._standardize_location()
+        logger.debug(
+            f"Resolved offline (gazetteer): {self.location} -> {self.state}, {self.city}"
+        )
+        return True
 
-        Args:
-            cache: Diccionario opcional para cachear resultados {query: result_dict}
+    def apply_coordinates(self, latitude, longitude) -> bool:
+        """
+        Completa estado y ciudad desde coordenadas con el geocodificador inverso
+        offline (reverse_geocoding.py). Solo si el evento ya se identificó como
+        mexicano: el punto más cercano a San Diego o El Paso es Tijuana o
+        Ciudad Juárez, así que las coordenadas nunca deciden el país. Solo llena
+        los campos que faltan; si el evento ya tiene estado, la ciudad solo se
+        toma si es del mismo estado. Retorna True si llenó alguno.
+        """
+        if (self.state_code and self.city) or self.country_code != "MX":
+            return False
+        place = reverse_geocoding.reverse(latitude, longitude)
+        if not place or self.state_code not in ("", place.state_code):
+            return False
+        if not self.state_code:
+            self.state = geo_index.get_subdivision(place.state_code).name
+            self.state_code = place.state_code
+        if not self.city and place.city:
+            self.city = place.city
+            self.city_code = slugify(place.city)
+        self._standardize_location()
+        return True
 
-        Returns:
-            Tupla (éxito, usó_api): True si aplicó ubicación; True si llamó a la API (no cache).
+    def geocoding_queries(self) -> List[str]:
+        """
+        Consultas de geocodificación del evento, en orden: la ubicación limpia
+        y, si tiene más de dos partes, sin la primera parte y solo las dos últimas.
         """
         if not self.location or len(self.location.strip()) < 5:
-            return (False, False)
+            return []
 
         # Si ya es Online, no geocodear
         if self._is_online():
-            return (False, False)
-
-        used_api = False
-        try:
-            # Elegir geocodificador
-            api_key = os.getenv("GOOGLE_MAPS_API_KEY")
-            if api_key:
-                geolocator = GoogleV3(api_key=api_key)
-                service_name = "google"
-            else:
-                geolocator = Nominatim(user_agent="cron-quiles-aggregator")
-                service_name = "nominatim"
-
-            # Limpiar la query: quitar comas redundantes y partes vacías
-            location_cleaned = re.sub(r",\s*,", ",", self.location)
-            query_parts = [p.strip() for p in location_cleaned.split(",") if p.strip()]
+            return []
 
-            # Quitar URLs si hay comas (suelen ser las últimas partes)
-            query_parts = [p for p in query_parts if not p.startswith("http")]
+        # Limpiar la query: quitar comas redundantes y partes vacías
+        location_cleaned = re.sub(r",\s*,", ",", self.location)
+        query_parts = [p.strip() for p in location_cleaned.split(",") if p.strip()]
 
-            # Quitar ruidos comunes de Meetup
-            query_parts = [
-                re.sub(r"^hosted by\s+", "", p, flags=re.IGNORECASE)
-                for p in query_parts
-            ]
-
-            current_query = ", ".join(query_parts).strip()
-            current_query = fix_encoding(current_query)
-            if not current_query or len(current_query) < 4:
-                return (False, False)
-
-            # Verificar cache
-            location_data = None
-            if cache and current_query in cache:
-                logger.debug(f"Geocoding cache hit for: {current_query}")
-                raw_data = cache[current_query]
-                if raw_data:
+        # Quitar URLs si hay comas (suelen ser las últimas partes)
+        query_parts = [p for p in query_parts if not p.startswith("http")]
 
-                    class MockLocation:
-                        def __init__(self, raw):
-                            self.raw = raw
-
-                    location_data = MockLocation(raw_data)
-            else:
-                used_api = True
-                logger.debug(
-                    f"Geocoding query ({geolocator.__class__.__name__}): {current_query}"
-                )
-                # GoogleV3 no usa 'addressdetails'
-                if isinstance(geolocator, GoogleV3):
-                    location_data = geolocator.geocode(
-                        current_query, language="es", timeout=10
-                    )
-                else:
-                    location_data = geolocator.geocode(
-                        current_query, addressdetails=True, language="es", timeout=10
-                    )
-
-                # Guardar en cache
-                if cache is not None:
-                    cache[current_query] = location_data.raw if location_data else {}
-
-            if not location_data and len(query_parts) > 2:
-                # Intentar quitando la primera parte
-                fallback_query_1 = ", ".join(query_parts[1:])
-
-                if cache and fallback_query_1 in cache:
-                    logger.debug(
-                        f"Geocoding cache hit (fallback 1): {fallback_query_1}"
-                    )
-                    raw_data = cache[fallback_query_1]
-                    if raw_data:
-
-                        class MockLocation:
-                            def __init__(self, raw):
-                                self.raw = raw
-
-                        location_data = MockLocation(raw_data)
-                else:
-                    used_api = True
-                    if isinstance(geolocator, GoogleV3):
-                        location_data = geolocator.geocode(
-                            fallback_query_1, language="es", timeout=10
-                        )
-                    else:
-                        location_data = geolocator.geocode(
-                            fallback_query_1,
-                            addressdetails=True,
-                            language="es",
-                            timeout=10,
-                        )
-
-                    if cache is not None:
-                        cache[fallback_query_1] = (
-                            location_data.raw if location_data else {}
-                        )
+        # Quitar ruidos comunes de Meetup
+        query_parts = [
+            re.sub(r"^hosted by\s+", "", p, flags=re.IGNORECASE) for p in query_parts
+        ]
 
-                if not location_data:
-                    # Intentar con la parte final
-                    fallback_query_2 = ", ".join(query_parts[-2:])
+        current_query = ", ".join(query_parts).strip()
+        current_query = fix_encoding(current_query)
+        if not current_query or len(current_query) < 4:
+            return []
 
-                    if cache and fallback_query_2 in cache:
-                        logger.debug(
-                            f"Geocoding cache hit (fallback 2): {fallback_query_2}"
-                        )
-                        raw_data = cache[fallback_query_2]
-                        if raw_data:
-
-                            class MockLocation:
-                                def __init__(self, raw):
-                                    self.raw = raw
-
-                            location_data = MockLocation(raw_data)
-                    else:
-                        used_api = True
-                        if isinstance(geolocator, GoogleV3):
-                            location_data = geolocator.geocode(
-                                fallback_query_2, language="es", timeout=10
-                            )
-                        else:
-                            location_data = geolocator.geocode(
-                                fallback_query_2,
-                                addressdetails=True,
-                                language="es",
-                                timeout=10,
-                            )
+        queries = [current_query]
+        if len(query_parts) > 2:
+            queries.append(", ".join(query_parts[1:]))
+            queries.append(", ".join(query_parts[-2:]))
+        return queries
 
-                        if cache is not None:
-                            cache[fallback_query_2] = (
-                                location_data.raw if location_data else {}
-                            )
+    def geocode_location(
+        self, cache: Optional[Dict] = None, engine: Optional[GeocodingEngine] = None
+    ) -> tuple[bool, bool]:
+        """
+        Usa geopy (GoogleV3 o Nominatim, vía GeocodingEngine) para obtener detalles
+        precisos de la ubicación, salvo que el gazetteer offline ya los resuelva.
+        Actualiza los campos country, state, city y sus respectivos códigos.
 
-            if location_data:
-                # 1. Caso Google Maps
-                if "address_components" in location_data.raw:
-                    res = self._parse_google_address(location_data.raw)
-                    self.country = res["country"]
-                    self.country_code = res["country_code"]
-                    self.state = res["state"]
-                    self.state_code = res["state_code"]
-                    self.city = res["city"]
-                    self.city_code = res["city_code"]
-                    self.address = location_data.raw.get(
-                        "formatted_address", self.location
-                    )
+        Args:
+            cache: Diccionario opcional para cachear resultados {query: result_dict}
+                (si no se pasa `engine`)
+            engine: Motor compartido (cache, límite de tasa del proveedor)
 
-                # 2. Caso Nominatim
-                elif "address" in location_data.raw:
-                    address = location_data.raw.get("address", {})
-
-                    # Extraer País
-                    country_name = address.get("country", "")
-                    country_code = address.get("country_code", "").upper()
-                    if country_code:
-                        self.country_code = country_code
-                        # Normalizar nombre de país con pycountry si es posible
-                        try:
-                            c = pycountry.countries.get(alpha_2=country_code)
-                            self.country = c.name if c else country_name
-                        except (
-                            KeyError
-                        ):  # More specific exception for pycountry.countries.get
-                            self.country = country_name
-
-                    # Extraer Estado / Provincia
-                    state_name = address.get(
-                        "state", address.get("province", address.get("region", ""))
-                    )
-                    if state_name and self.country_code:
-                        self.state = state_name
-                        # Intentar obtener state_code via pycountry
-                        try:
-                            subs = pycountry.subdivisions.get(
-                                country_code=self.country_code
-                            )
-                            for sub in subs:
-                                if sub.name.lower() == state_name.lower():
-                                    self.state_code = sub.code
-                                    break
-                        except Exception:
-                            pass
+        Returns:
+            Tupla (éxito, usó_api): True si aplicó ubicación; True si llamó a la API (no cache).
+        """
+        if self.apply_gazetteer():
+            return (True, False)
+        queries = self.geocoding_queries()
+        if not queries:
+            return (False, False)
 
-                    # Extraer Ciudad
-                    city_name = address.get(
-                        "city",
-                        address.get(
-                            "town",
-                            address.get("village", address.get("suburb", "")),
-                        ),
-                    )
-                    if city_name:
-                        self.city = city_name
-                        self.city_code = slugify(city_name)
+        used_api = False
+        try:
+            if engine is None:
+                engine = GeocodingEngine(cache)
+            for query in queries:
+                raw, from_api = engine.lookup(query)
+                used_api = used_api or from_api
+                if raw:
+                    return (self.apply_geocoding(raw, engine.provider), used_api)
+        except GEOCODING_ERRORS as e:
+            logger.debug(f"Geocoding error for '{self.location}': {e}")
 
-                    self.address = location_data.raw.get("display_name", self.location)
+        return (False, used_api)
 
-                # Homologar resultados después de geocodificar
-                self._standardize_location()
+    def apply_geocoding(self, raw: Dict, service_name: str = "unknown") -> bool:
+        """
+        Aplica la respuesta raw de Google Maps o Nominatim a los campos de
+        ubicación del evento.
+        """
+        latitude = longitude = None
+        # 1. Caso Google Maps
+        if "address_components" in raw:
+            res = self._parse_google_address(raw)
+            self.country = res["country"]
+            self.country_code = res["country_code"]
+            self.state = res["state"]
+            self.state_code = res["state_code"]
+            self.city = res["city"]
+            self.city_code = res["city_code"]
+            self.address = raw.get("formatted_address", self.location)
+            coordinates = raw.get("geometry", {}).get("location", {})
+            latitude, longitude = coordinates.get("lat"), coordinates.get("lng")
+
+        # 2. Caso Nominatim
+        elif "address" in raw:
+            address = raw.get("address", {})
+
+            # Extraer País
+            country_name = address.get("country", "")
+            country_code = address.get("country_code", "").upper()
+            if country_code:
+                self.country_code = country_code
+                # Normalizar nombre de país con el índice ISO si es posible
+                c = geo_index.get_country(alpha_2=country_code)
+                self.country = c.name if c else country_name
+
+            # Extraer Estado / Provincia
+            state_name = address.get(
+                "state", address.get("province", address.get("region", ""))
+            )
+            if state_name and self.country_code:
+                self.state = state_name
+                # Intentar obtener state_code via el índice ISO
+                sub = geo_index.find_subdivision(self.country_code, state_name)
+                if sub:
+                    self.state_code = sub.code
+
+            # Extraer Ciudad
+            city_name = address.get(
+                "city",
+                address.get(
+                    "town",
+                    address.get("village", address.get("suburb", "")),
+                ),
+            )
+            if city_name:
+                self.city = city_name
+                self.city_code = slugify(city_name)
 
-                logger.info(
-                    f"Geocoded successfully ({service_name if 'service_name' in locals() else 'unknown'}): "
-                    f"{self.location} -> {self.country}, {self.state}, {self.city}"
-                )
-                return (True, used_api)
+            self.address = raw.get("display_name", self.location)
+            latitude, longitude = raw.get("lat"), raw.get("lon")
 
-        except (GeopyError, Exception) as e:
-            logger.debug(f"Geocoding error for '{self.location}': {e}")
+        # Homologar resultados después de geocodificar
+        self._standardize_location()
+        # Respuestas sin ciudad (ej: solo el estado): completar con las coordenadas
+        self.apply_coordinates(latitude, longitude)
 
-        return (False, False)
+        logger.info(
+            f"Geocoded successfully ({service_name}): "
+            f"{self.location} -> {self.country}, {self.state}, {self.city}"
+        )
+        return True
 
     def _format_title(self) -> str:
         """
@@ -1408,6 +1652,9 @@ class EventNormalized:
             "city_code": self.city_code,
             "address": self.address,
             "hash_key": self.hash_key,
+            "uid": self.uid,
+            "schema_version": SCHEMA_VERSION,
+            "normalizer_version": NORMALIZER_VERSION,
         }
 
     def to_ical_event(self) -> Event:
@@ -1546,6 +1793,10 @@ class EventNormalized:
 
                                 # Homologar de nuevo con la nueva información
                                 self._standardize_location()
+                                geo = loc.get("geo") or {}
+                                self.apply_coordinates(
+                                    geo.get("latitude"), geo.get("longitude")
+                                )
                                 return True
                 except Exception:
                     continue
@@ -1594,6 +1845,7 @@ class EventNormalized:
 
                             # Homologar de nuevo con la nueva información
                             self._standardize_location()
+                            self.apply_coordinates(venue.get("lat"), venue.get("lng"))
                             return True
                 except Exception:
                     pass
@@ -1728,6 +1980,16 @@ class EventNormalized:
                     if new_location_parts:
                         new_location = ", ".join(new_location_parts).strip()
 
+                        # Coordenadas del evento (o las del inicio de full_address)
+                        coordinate = event_data.get("coordinate") or {}
+                        latitude = coordinate.get("latitude")
+                        longitude = coordinate.get("longitude")
+                        coordinates_match = re.match(
+                            r"^(-?\d+\.\d+),\s*(-?\d+\.\d+)", new_location
+                        )
+                        if latitude is None and coordinates_match:
+                            latitude, longitude = coordinates_match.groups()
+
                         # CLEANUP: Remover coordenadas si aparecen al principio (Luma las pone en full_address)
                         # Ej: "19.42,-99.1725, Ciudad de México" -> "Ciudad de México"
                         # Patrón: número(s).número(s), número(s).número(s),
@@ -1753,6 +2015,7 @@ class EventNormalized:
                             self.city_code = loc_details["city_code"]
 
                             self._standardize_location()
+                            self.apply_coordinates(latitude, longitude)
                             return True
 
                 except Exception as e:
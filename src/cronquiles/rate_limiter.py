@@ -1,4 +1,7 @@
-"""Limitador de tasa por dominio con backoff exponencial para enriquecimiento paralelo."""
+"""
+Limitadores de tasa: por dominio con backoff exponencial para enriquecimiento
+paralelo, y token bucket por proveedor para el geocoding (geocoding.py).
+"""
 
 import logging
 import threading
@@ -25,6 +28,35 @@ class RateLimiter:
             self._last_request = time.monotonic()
 
 
+class TokenBucket:
+    """
+    Token bucket compartido entre hilos: `rate` peticiones por segundo en
+    promedio, con ráfagas de hasta `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self._lock = threading.Lock()
+        self._rate = rate
+        self._capacity = max(1, capacity)
+        self._tokens = float(self._capacity)
+        self._updated = time.monotonic()
+
+    def acquire(self):
+        """Espera hasta que haya un token disponible y lo consume."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self._capacity, self._tokens + (now - self._updated) * self._rate
+            )
+            self._updated = now
+            if self._tokens < 1:
+                # Se espera con el lock tomado: los demás hilos hacen fila
+                time.sleep((1 - self._tokens) / self._rate)
+                self._tokens = 1.0
+                self._updated = time.monotonic()
+            self._tokens -= 1
+
+
 def enrich_with_backoff(
     event, enrich_fn, rate_limiter: RateLimiter, max_retries: int = 3
 ):
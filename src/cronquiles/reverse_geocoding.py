@@ -0,0 +1,124 @@
+"""
+Reverse geocoding - Estado y ciudad desde coordenadas, sin red.
+
+Las páginas de Luma y Meetup (JSON-LD y __NEXT_DATA__) y las respuestas del
+geocodificador traen latitud y longitud, pero el estado y la ciudad se sacaban
+solo del texto o de otra consulta al proveedor. reverse() los obtiene en
+memoria: el punto de referencia más cercano (cabeceras municipales y
+coordenadas ya geocodificadas, ver gazetteer.points) dentro de
+MAX_DISTANCE_KM.
+
+Los puntos se indexan en una rejilla de CELL_DEGREES grados (GridIndex): una
+búsqueda solo revisa las celdas que alcanza el radio, no todos los puntos.
+
+No hay polígonos de los límites estatales/municipales en el repo: cerca de un
+límite el punto más cercano puede ser de la ciudad vecina. Por eso solo se
+llenan los campos que faltan y, si el evento ya trae estado, la ciudad solo se
+toma si es del mismo estado.
+
+Tampoco hay frontera: MX_BOUNDS incluye ciudades de EE.UU. (San Diego, El Paso,
+Laredo) cuyo punto más cercano es la ciudad mexicana de enfrente. reverse() no
+decide el país; EventNormalized.apply_coordinates solo lo usa con eventos que
+ya son de México.
+"""
+
+import math
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from . import gazetteer
+from .gazetteer import Place
+
+# Tamaño de celda de la rejilla (~28 km de latitud)
+CELL_DEGREES = 0.25
+
+# Distancia máxima al punto de referencia más cercano
+MAX_DISTANCE_KM = 30.0
+
+# Caja que contiene a México (y parte de EE.UU.): fuera de ella no se busca
+MX_BOUNDS = (14.3, 32.8, -118.6, -86.5)  # lat mín, lat máx, lon mín, lon máx
+
+KM_PER_DEGREE = 111.2
+
+
+def distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distancia aproximada (equirrectangular; suficiente a esta escala)."""
+    x = (lon2 - lon1) * math.cos(math.radians((lat1 + lat2) / 2))
+    return KM_PER_DEGREE * math.hypot(x, lat2 - lat1)
+
+
+class GridIndex:
+    """Índice espacial de puntos (lat, lon, valor) en celdas de `cell` grados."""
+
+    def __init__(
+        self, points: List[Tuple[float, float, object]], cell: float = CELL_DEGREES
+    ):
+        self.cell = cell
+        self._cells: Dict[Tuple[int, int], List[Tuple[float, float, object]]] = {}
+        for lat, lon, value in points:
+            self._cells.setdefault(self._key(lat, lon), []).append((lat, lon, value))
+
+    def __len__(self) -> int:
+        return sum(len(points) for points in self._cells.values())
+
+    def _key(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell), math.floor(lon / self.cell)
+
+    def nearest(self, lat: float, lon: float, max_km: float) -> Optional[object]:
+        """El valor del punto más cercano a menos de `max_km`, o None."""
+        row, col = self._key(lat, lon)
+        rows = math.ceil(max_km / (KM_PER_DEGREE * self.cell))
+        # Un grado de longitud mide menos que uno de latitud (cos de la latitud)
+        far_lat = min(abs(lat) + max_km / KM_PER_DEGREE, 89.0)
+        lon_km = KM_PER_DEGREE * math.cos(math.radians(far_lat))
+        cols = math.ceil(max_km / (lon_km * self.cell))
+        best, best_km = None, max_km
+        for r in range(row - rows, row + rows + 1):
+            for c in range(col - cols, col + cols + 1):
+                for p_lat, p_lon, value in self._cells.get((r, c), []):
+                    km = distance_km(lat, lon, p_lat, p_lon)
+                    if km <= best_km:
+                        best, best_km = value, km
+        return best
+
+
+_lock = threading.Lock()
+_index: Optional[GridIndex] = None
+
+
+def _get_index() -> GridIndex:
+    global _index
+    if _index is None:
+        with _lock:
+            if _index is None:
+                _index = GridIndex(gazetteer.points())
+    return _index
+
+
+def parse_coordinates(latitude, longitude) -> Optional[Tuple[float, float]]:
+    """(lat, lon) como floats, o None si faltan o no son válidas."""
+    try:
+        lat, lon = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180) or (lat, lon) == (0, 0):
+        return None
+    return lat, lon
+
+
+def reverse(latitude, longitude) -> Optional[Place]:
+    """
+    Estado y ciudad del punto de referencia más cercano a las coordenadas.
+
+    Returns:
+        Place, o None si las coordenadas no son válidas, están fuera de México
+        o no hay un punto de referencia a menos de MAX_DISTANCE_KM
+    """
+    coordinates = parse_coordinates(latitude, longitude)
+    if coordinates is None:
+        return None
+    lat, lon = coordinates
+    lat_min, lat_max, lon_min, lon_max = MX_BOUNDS
+    if not (lat_min <= lat <= lat_max and lon_min <= lon <= lon_max):
+        return None
+    return _get_index().nearest(lat, lon, MAX_DISTANCE_KM)
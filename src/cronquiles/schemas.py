@@ -43,6 +43,9 @@ class EventSchema(TypedDict):
     city_code: str
     address: str
     hash_key: str
+    uid: str  # UID del VEVENT original ("" si la fuente no lo tiene)
+    schema_version: int  # Versión del formato del registro (campos de este esquema)
+    normalizer_version: int  # Versión del normalizador que generó el registro
 
 
 class CommunitySchema(TypedDict):
@@ -0,0 +1,118 @@
+"""
+Serialization - Backend de JSON para los archivos persistidos y publicados.
+
+Todos los JSON que escribe el pipeline (historial, caches, índice de
+deduplicación y los `cronquiles-*.json` / `states_metadata.json` publicados)
+pasan por `dumps` / `loads`. El backend por defecto es `json` de la librería
+estándar; con `--json-backend orjson` (o `CRONQUILES_JSON_BACKEND=orjson`) se
+usa orjson si está instalado (`pip install orjson`), que es
+~10x más rápido.
+
+Ambos backends producen los mismos bytes (UTF-8 sin escapar, indentación de 2
+espacios o compacto sin espacios, mismo orden de llaves). Los floats se
+normalizan antes de serializar (`normalize_floats`): se redondean a
+FLOAT_DECIMALS decimales, así que ninguno cae en el rango donde json escribe
+exponente y orjson no (`9e-05` / `0.00009`); los enteros enormes pasan a int y
+NaN/infinito a null. Aun así el backend se elige explícitamente y no según lo
+que esté instalado, para que una misma configuración siempre genere el mismo
+archivo y los diffs del deploy solo muestren cambios reales.
+"""
+
+import json
+import logging
+import math
+import os
+from typing import Any, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # Opcional
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("json", "orjson")
+
+# Coordenadas a ~11 m, la misma precisión que los puntos de gazetteer.py. Con
+# 4 decimales el float no nulo más chico es 0.0001, que ambos backends
+# escriben sin exponente
+FLOAT_DECIMALS = 4
+# A partir de aquí repr() usa exponente ("1e+16" en json, "1e16" en orjson)
+_FLOAT_MAX = 1e16
+
+_backend = "json"
+
+
+def get_backend() -> str:
+    return _backend
+
+
+def set_backend(name: str) -> str:
+    """
+    Selecciona el backend ("json" u "orjson"). Si orjson no está instalado se
+    queda con json.
+
+    Returns:
+        El backend en uso
+    """
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError(f"Backend de JSON desconocido: {name}")
+    if name == "orjson" and orjson is None:
+        logger.warning("orjson no está instalado, se usa json de la librería estándar")
+        name = "json"
+    _backend = name
+    return _backend
+
+
+def _normalize_float(value: float) -> Any:
+    if not math.isfinite(value):
+        return None
+    if abs(value) >= _FLOAT_MAX:
+        return int(value)
+    return round(value, FLOAT_DECIMALS) + 0.0  # + 0.0: -0.0 → 0.0
+
+
+def normalize_floats(data: Any) -> Any:
+    """
+    Copia de `data` con los floats normalizados (ver docstring del módulo).
+    Los contenedores sin floats se devuelven tal cual, sin copiar.
+    """
+    if isinstance(data, float):
+        return _normalize_float(data)
+    if isinstance(data, dict):
+        items = {k: normalize_floats(v) for k, v in data.items()}
+        return data if all(items[k] is v for k, v in data.items()) else items
+    if isinstance(data, (list, tuple)):
+        values = [normalize_floats(v) for v in data]
+        return data if all(n is v for n, v in zip(values, data)) else values
+    return data
+
+
+def dumps(data: Any, indent: Optional[int] = 2) -> str:
+    """
+    Serializa `data` (indent=2: legible, para archivos versionados;
+    indent=None: compacto, para los archivos publicados).
+    """
+    data = normalize_floats(data)
+    if _backend == "orjson" and indent in (None, 2):
+        try:
+            return orjson.dumps(
+                data, option=orjson.OPT_INDENT_2 if indent == 2 else 0
+            ).decode("utf-8")
+        except TypeError:
+            # Llaves no-str, enteros de más de 64 bits, etc.: json sí los acepta
+            pass
+    if indent is None:
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return json.dumps(data, ensure_ascii=False, indent=indent)
+
+
+def loads(text: Union[str, bytes]) -> Any:
+    if _backend == "orjson":
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+if os.environ.get("CRONQUILES_JSON_BACKEND"):
+    set_backend(os.environ["CRONQUILES_JSON_BACKEND"])
@@ -0,0 +1,97 @@
+"""
+Storage - Escritura atómica de los archivos de estado (data/*.json).
+
+Los archivos se escriben en un temporal del mismo directorio que luego se
+renombra sobre el original (os.replace), así que una corrida interrumpida nunca
+deja un JSON a medias. JSONFile recuerda el contenido leído o escrito por
+última vez para no reescribir un archivo que no cambió.
+"""
+
+import hashlib
+import os
+import stat
+import tempfile
+from pathlib import Path
+from typing import Any, Optional, Union
+
+from .serialization import dumps, loads
+
+
+def atomic_write_text(path: Union[str, Path], text: str):
+    """Escribe `text` en `path` vía archivo temporal + rename."""
+    atomic_write_bytes(path, text.encode("utf-8"))
+
+
+def atomic_write_bytes(path: Union[str, Path], data: bytes):
+    """Escribe `data` en `path` vía archivo temporal + rename."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp crea el archivo con 0600: conservar los permisos del original
+        mode = stat.S_IMODE(os.stat(path).st_mode) if path.exists() else 0o644
+        os.chmod(tmp_name, mode)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+
+class JSONFile:
+    """
+    Archivo JSON con escritura atómica que no se reescribe si no cambió.
+
+    Args:
+        path: Ruta del archivo
+        indent: Indentación (None = compacto, ver serialization.dumps)
+    """
+
+    def __init__(self, path: Union[str, Path], indent: Optional[int] = 2):
+        self.path = Path(path)
+        self.indent = indent
+        self._digest: Optional[str] = None
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def load(self) -> Any:
+        """Lee y parsea el archivo (None si no existe). Recuerda su contenido."""
+        if not self.path.exists():
+            return None
+        with open(self.path, "r", encoding="utf-8") as f:
+            text = f.read()
+        data = loads(text)
+        self._digest = self._hash(text)
+        return data
+
+    def save(self, data: Any) -> bool:
+        """
+        Escribe `data` si su contenido difiere del último leído/escrito.
+
+        Returns:
+            True si se escribió el archivo, False si no había cambios
+        """
+        text = dumps(data, indent=self.indent)
+        digest = self._hash(text)
+        if self._digest is None and self.path.exists():
+            # No se leyó en esta corrida (ej: exportación): comparar con el disco
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._digest = self._hash(f.read())
+        if digest == self._digest and self.path.exists():
+            return False
+        atomic_write_text(self.path, text)
+        self._digest = digest
+        return True
@@ -0,0 +1,70 @@
+"""
+Time Window - Horizonte de fechas para descartar eventos al parsear.
+
+Los feeds de Luma e ICS genéricos suelen traer años de eventos pasados. Con una
+ventana configurada, los eventos cuyo DTSTART cae fuera se descartan en cuanto
+se lee la fecha, antes de normalizarlos, extraer su ubicación o enriquecerlos.
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Optional, Union
+
+from dateutil import parser, tz
+
+
+class TimeWindow:
+    """
+    Ventana [ahora - past_days, ahora + future_days].
+
+    Un límite en None deja ese lado abierto. Los eventos sin fecha (o con una
+    fecha que no se puede interpretar) no se descartan aquí.
+    """
+
+    def __init__(
+        self,
+        past_days: Optional[int] = None,
+        future_days: Optional[int] = None,
+        now: Optional[datetime] = None,
+    ):
+        now = now or datetime.now(tz.UTC)
+        self.past_days = past_days
+        self.future_days = future_days
+        self.start = now - timedelta(days=past_days) if past_days is not None else None
+        self.end = (
+            now + timedelta(days=future_days) if future_days is not None else None
+        )
+
+    def __repr__(self) -> str:
+        return f"TimeWindow(past_days={self.past_days}, future_days={self.future_days})"
+
+    def contains(self, dtstart: Union[datetime, date, str, None]) -> bool:
+        """
+        Indica si la fecha de inicio cae dentro de la ventana.
+
+        Args:
+            dtstart: datetime/date (DTSTART de iCalendar) o string ISO (APIs JSON)
+        """
+        if not dtstart:
+            return True
+
+        if isinstance(dtstart, str):
+            try:
+                dtstart = parser.isoparse(dtstart)
+            except (ValueError, OverflowError):
+                return True
+
+        if not isinstance(dtstart, datetime):
+            if not isinstance(dtstart, date):
+                return True
+            # Eventos de día completo
+            dtstart = datetime(dtstart.year, dtstart.month, dtstart.day)
+
+        # Igual que EventNormalized: sin timezone se asume UTC
+        if dtstart.tzinfo is None:
+            dtstart = dtstart.replace(tzinfo=tz.UTC)
+
+        if self.start is not None and dtstart < self.start:
+            return False
+        if self.end is not None and dtstart > self.end:
+            return False
+        return True
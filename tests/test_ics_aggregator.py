@@ -4,18 +4,43 @@ Tests básicos para el agregador ICS.
 Nota: Estos son tests básicos. Se pueden expandir con más casos de prueba.
 """
 
+import json
+import os
+import pickle
 import sys
+import tempfile
+import time
 import unittest
-from datetime import datetime
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
 from pathlib import Path
 
 from dateutil import tz
-from icalendar import Event
+from geopy.exc import GeocoderServiceError
+from icalendar import Calendar, Event
 
 # Agregar src al path
 src_path = Path(__file__).parent.parent / "src"
 sys.path.insert(0, str(src_path))
 
+from cronquiles.aggregators.ics import GenericICSAggregator
+from cronquiles.geocoding import GeocodingEngine
+from cronquiles.geocoding_cache import (
+    CacheEntry,
+    GeocodingCache,
+    SQLiteGeocodingCache,
+    canonical_query,
+    is_fresh,
+)
+from cronquiles.heal import HealRun
+from cronquiles.history_manager import HistoryManager
+from cronquiles import serialization
+from cronquiles.dedup import DedupIndex, event_url_key, group_duplicates
+from cronquiles.models import canonical_url, fix_encoding, is_current_record
+from cronquiles.rate_limiter import TokenBucket
+from cronquiles.reverse_geocoding import GridIndex, reverse
+from cronquiles.time_window import TimeWindow
 from cronquiles.ics_aggregator import (
     EventNormalized,
     ICSAggregator,
@@ -69,6 +94,1134 @@ class TestEventNormalized(unittest.TestCase):
         # Deben tener el mismo hash_key (mismo título, misma hora redondeada)
         self.assertEqual(event_norm1.hash_key, event_norm2.hash_key)
 
+    def test_location_details_cache(self):
+        """Test de que venues repetidos se resuelven desde el cache LRU."""
+        cache = EventNormalized._location_cache
+        cache.clear()
+
+        for _ in range(3):
+            event = Event()
+            event.add("summary", "Python Meetup")
+            event.add("location", "Wizeline, Guadalajara, Jalisco, México")
+            event.add("dtstart", datetime(2024, 3, 15, 18, 0, 0, tzinfo=tz.UTC))
+            event_norm = EventNormalized(event, "https://example.com/feed.ics")
+            self.assertEqual(event_norm.state_code, "MX-JAL")
+
+        self.assertEqual(cache.misses, 1)
+        self.assertEqual(cache.hits, 2)
+
+        # Los detalles devueltos son copias: mutarlos no contamina el cache
+        event_norm.state_code = "MX-CMX"
+        self.assertEqual(event_norm._extract_location_details()["state_code"], "MX-JAL")
+
+    def test_location_details_other_country(self):
+        """Test de país y subdivisión fuera de México usando el índice ISO precalculado."""
+        event = Event()
+        event.add("summary", "Python Meetup")
+        event.add("location", "Capital Factory, Austin, Texas, United States")
+        event.add("dtstart", datetime(2024, 3, 15, 18, 0, 0, tzinfo=tz.UTC))
+
+        event_norm = EventNormalized(event, "https://example.com/feed.ics")
+
+        self.assertEqual(event_norm.country_code, "US")
+        self.assertEqual(event_norm.state_code, "US-TX")
+
+    def test_location_details_gazetteer(self):
+        """Test de estado y ciudad resueltos offline con el gazetteer (abreviaturas, municipios, colonias)."""
+        cases = {
+            "HackerGarage, Col Americana, 44160 Guadalajara, Jal., Mexico": (
+                "MX-JAL",
+                "Guadalajara",
+            ),
+            "Tec de Monterrey, Monterrey, N.L.": ("MX-NLE", "Monterrey"),
+            "Casa Lamm, Roma Nte., Cuauhtémoc, 06700 Ciudad de México, CDMX, Mexico": (
+                "MX-CMX",
+                "Ciudad de México",
+            ),
+            "Coworking, Polanco, Mexico": ("MX-CMX", "Ciudad de México"),
+            "Universidad de Oriente, Azcarate, 72501 Heroica Puebla de Zaragoza, Pue., Mexico": (
+                "MX-PUE",
+                "Puebla",
+            ),
+            # "Guadalupe" existe en Nuevo León y en Zacatecas: decide el estado
+            "Parque Fundidora, Guadalupe, NL": ("MX-NLE", "Guadalupe"),
+            "Auditorio, Guadalupe": ("", ""),
+            # Solo el estado: la ciudad queda para el geocodificador
+            "Foro Cultural, Qro., Mexico": ("MX-QUE", ""),
+            # No es México: el último componente no es un lugar conocido
+            "Teatro, León, España": ("", ""),
+        }
+        for location, (state_code, city) in cases.items():
+            details = EventNormalized._resolve_location_details(location)
+            self.assertEqual(
+                (details["state_code"], details["city"]), (state_code, city), location
+            )
+        # Una abreviatura o un municipio sin "México" no bastan para ser México
+        not_mexico = {
+            "Amsterdam, NL": "NL",
+            "Vancouver, BC": "",
+            "Main St, Col.": "",
+            "Córdoba": "",
+            "León": "",
+            "Salamanca": "",
+        }
+        for location, country_code in not_mexico.items():
+            details = EventNormalized._resolve_location_details(location)
+            self.assertEqual(
+                (details["country_code"], details["state_code"]),
+                (country_code, ""),
+                location,
+            )
+        self.assertEqual(
+            EventNormalized._resolve_location_details("Monterrey, NL")["country_code"],
+            "MX",
+        )
+        self.assertEqual(
+            EventNormalized._resolve_location_details("Zapopan, Jalisco")[
+                "country_code"
+            ],
+            "MX",
+        )
+
+    def test_from_dict_fast_path(self):
+        """Test de que la hidratación rápida de from_dict equivale al pipeline completo."""
+        event = Event()
+        event.add("summary", "Taller de Python y Docker")
+        event.add("description", "Hands-on de machine learning")
+        event.add("location", "Wizeline, Guadalajara, Jalisco, México")
+        event.add("url", "https://www.meetup.com/python-gdl/events/123/")
+        event.add("dtstart", datetime(2024, 3, 15, 18, 0, 0, tzinfo=tz.UTC))
+        data = EventNormalized(
+            event, "https://example.com/feed.ics", feed_name="Python GDL"
+        ).to_dict()
+        data["tags"].append("manual")
+
+        legacy = dict(data)
+        del legacy["normalizer_version"]
+
+        fast = EventNormalized.from_dict(data)
+        slow = EventNormalized.from_dict(legacy)
+
+        self.assertIsNone(fast._original_event)
+        self.assertEqual(fast.to_dict(), slow.to_dict())
+        self.assertEqual(fast.tags, slow.tags)
+        self.assertEqual(fast.hash_key, slow.hash_key)
+        self.assertEqual(fast.to_ical_event().to_ical(), slow.to_ical_event().to_ical())
+
+    def test_lazy_fields(self):
+        """Test de que tags, grupo, título y hash se calculan solo al usarlos."""
+        event = Event()
+        event.add("summary", "Python Meetup")
+        event.add("location", "Capital Factory, Austin, Texas, United States")
+        event.add("dtstart", datetime(2024, 3, 15, 18, 0, 0, tzinfo=tz.UTC))
+        event_norm = EventNormalized(event, "https://example.com/feed.ics")
+
+        # El filtro México/Online solo usa los campos calculados en __init__
+        self.assertFalse(event_norm.is_mexico_or_online())
+        for field in ("title", "organizer", "hash_key", "tags"):
+            self.assertNotIn(field, vars(event_norm))
+
+        event_norm.materialize()
+        self.assertEqual(event_norm.title, "python meetup")
+        self.assertIn("python", event_norm.tags)
+        self.assertTrue(event_norm.hash_key.startswith("python meetup_"))
+
+    def test_pickle_roundtrip(self):
+        """Test de que un evento normalizado sobrevive el viaje desde un proceso worker."""
+        event = Event()
+        event.add("summary", "Python Meetup")
+        event.add("location", "Wizeline, Guadalajara, Jalisco, México")
+        event.add("url", "https://www.meetup.com/python-gdl/events/123/")
+        event.add("dtstart", datetime(2024, 3, 15, 18, 0, 0, tzinfo=tz.UTC))
+        event_norm = EventNormalized(event, "https://example.com/feed.ics")
+
+        restored = pickle.loads(pickle.dumps(event_norm))
+
+        self.assertEqual(restored.to_dict(), event_norm.to_dict())
+        self.assertEqual(restored.original_event.to_ical(), event.to_ical())
+
+
+class TestFixEncoding(unittest.TestCase):
+    """Tests para la corrección de mojibake de una sola pasada."""
+
+    def test_fix_mojibake(self):
+        self.assertEqual(fix_encoding("CariÃ±o"), "Cariño")
+        self.assertEqual(fix_encoding("M茅xico, Quer茅taro"), "México, Querétaro")
+        self.assertEqual(fix_encoding("Le√≥n, Guanajuato "), "León, Guanajuato")
+        # "¬∫" tiene prioridad sobre "¬" suelto
+        self.assertEqual(fix_encoding("P.¬∫ de la Reforma"), "P.º de la Reforma")
+        self.assertEqual(fix_encoding("  Guadalajara  "), "Guadalajara")
+
+    def test_clean_text_is_not_rescanned(self):
+        fixed = fix_encoding("Ciudad de México ")
+        self.assertEqual(fixed, "Ciudad de México")
+        # El texto ya corregido se devuelve tal cual (mismo objeto)
+        self.assertIs(fix_encoding(fixed), fixed)
+
+
+class TestTimeWindow(unittest.TestCase):
+    """Tests para la ventana de fechas aplicada al parsear feeds."""
+
+    def setUp(self):
+        self.window = TimeWindow(
+            past_days=30, future_days=365, now=datetime(2024, 3, 1, tzinfo=tz.UTC)
+        )
+
+    def test_contains(self):
+        self.assertTrue(self.window.contains(datetime(2024, 2, 15, tzinfo=tz.UTC)))
+        self.assertFalse(self.window.contains(datetime(2023, 6, 1, tzinfo=tz.UTC)))
+        self.assertFalse(self.window.contains("2026-01-10T18:00:00-06:00"))
+        # Sin timezone se asume UTC; fechas de día completo y sin fecha se conservan
+        self.assertTrue(self.window.contains("2024-03-15T18:00:00"))
+        self.assertTrue(self.window.contains(datetime(2024, 3, 15).date()))
+        self.assertTrue(self.window.contains(None))
+
+    def test_calendar_events_outside_window_are_skipped(self):
+        calendar = Calendar()
+        for year in (2022, 2024):
+            event = Event()
+            event.add("summary", f"Python Meetup {year}")
+            event.add("dtstart", datetime(year, 3, 15, 18, 0, 0, tzinfo=tz.UTC))
+            calendar.add_component(event)
+
+        aggregator = GenericICSAggregator(time_window=self.window)
+        events = aggregator.extract_events_from_calendar(
+            calendar, "https://example.com/feed.ics"
+        )
+
+        self.assertEqual([e.summary for e in events], ["Python Meetup 2024"])
+
+
+class FakeResponse:
+    apparent_encoding = "utf-8"
+
+    def __init__(self, text):
+        self.text = text
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    """Sesión HTTP de prueba: siempre responde `text` y cuenta las peticiones."""
+
+    def __init__(self, text):
+        self.text = text
+        self.headers = {}
+        self.calls = 0
+
+    def get(self, url, timeout=None):
+        self.calls += 1
+        return FakeResponse(self.text)
+
+
+class BrokenExecutor:
+    """Pool de procesos caído: cada tarea falla al pedir el resultado."""
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_exception(BrokenProcessPool("pool caído"))
+        return future
+
+
+class TestGenericICSAggregator(unittest.TestCase):
+    """Tests de descarga y parseo de feeds ICS."""
+
+    def feed(self):
+        calendar = Calendar()
+        event = Event()
+        event.add("summary", "Python Meetup")
+        event.add("dtstart", datetime(2024, 3, 15, 18, 0, 0, tzinfo=tz.UTC))
+        calendar.add_component(event)
+        return calendar.to_ical().decode("utf-8")
+
+    def test_malformed_feed_is_fetched_once(self):
+        """Un feed que no se puede parsear no se vuelve a descargar."""
+        session = FakeSession("esto no es un calendario")
+        aggregator = GenericICSAggregator(session=session, max_retries=3)
+        self.assertIsNone(aggregator.fetch_feed("https://example.com/feed.ics"))
+        self.assertEqual(session.calls, 1)
+
+        session = FakeSession(self.feed())
+        aggregator = GenericICSAggregator(session=session, max_retries=3)
+        self.assertIsNotNone(aggregator.fetch_feed("https://example.com/feed.ics"))
+        self.assertEqual(session.calls, 1)
+
+    def test_broken_pool_parses_in_process(self):
+        """Si el pool de parseo falla, el feed se parsea en el hilo actual."""
+        session = FakeSession(self.feed())
+        aggregator = GenericICSAggregator(
+            session=session, parse_executor=BrokenExecutor()
+        )
+        events = aggregator.extract("https://example.com/feed.ics")
+        self.assertEqual([e.summary for e in events], ["Python Meetup"])
+        self.assertEqual(session.calls, 1)
+
+
+class TestSerialization(unittest.TestCase):
+    """Tests para el backend de JSON (serialization.py)."""
+
+    data = {
+        "title": "Meetup Python CDMX | México",
+        "dtstart": "2024-03-15T18:00:00-06:00",
+        "tags": ["python", "ñ"],
+        "sources": [{"url": "https://lu.ma/x", "platform": "luma"}],
+        "lat": 19.4326,
+        "empty": {},
+    }
+
+    def tearDown(self):
+        serialization.set_backend("json")
+
+    def test_formats(self):
+        """Indentado (archivos versionados) y compacto (archivos publicados)."""
+        pretty = serialization.dumps(self.data)
+        self.assertEqual(pretty, json.dumps(self.data, ensure_ascii=False, indent=2))
+        compact = serialization.dumps(self.data, indent=None)
+        self.assertTrue(compact.startswith('{"title":"Meetup Python CDMX | México",'))
+        self.assertNotIn("\n", compact)
+        self.assertEqual(serialization.loads(compact), self.data)
+
+    def test_backends_same_bytes(self):
+        """orjson genera los mismos bytes que json (si está instalado)."""
+        expected = [
+            serialization.dumps(self.data),
+            serialization.dumps(self.data, indent=None),
+        ]
+        if serialization.set_backend("orjson") != "orjson":
+            self.skipTest("orjson no está instalado")
+        self.assertEqual(
+            [
+                serialization.dumps(self.data),
+                serialization.dumps(self.data, indent=None),
+            ],
+            expected,
+        )
+        # Llaves que orjson no acepta: se usa json
+        self.assertEqual(serialization.dumps({1: "a"}, indent=None), '{"1":"a"}')
+        with self.assertRaises(ValueError):
+            serialization.set_backend("yaml")
+
+    def test_floats_same_bytes(self):
+        """Un evento con floats (coordenadas, exponentes, NaN) da los mismos bytes en ambos backends."""
+        event = Event()
+        event.add("summary", "Python Meetup")
+        event.add("location", "Wizeline, Guadalajara, Jalisco, México")
+        event.add("dtstart", datetime(2024, 3, 15, 18, 0, 0, tzinfo=tz.UTC))
+        data = EventNormalized(event, "https://example.com/feed.ics").to_dict()
+        data["geometry"] = {
+            "lat": 20.676722299999998,
+            "lng": -103.3479539,
+            "importance": 9e-05,
+            "offset": -0.00001,
+            "huge": 1e16,
+            "bad": float("nan"),
+        }
+
+        expected = [
+            serialization.dumps(data).encode("utf-8"),
+            serialization.dumps(data, indent=None).encode("utf-8"),
+        ]
+        geometry = serialization.loads(expected[1])["geometry"]
+        self.assertEqual(geometry["lat"], 20.6767)
+        self.assertEqual(geometry["importance"], 0.0001)
+        self.assertEqual(geometry["offset"], 0.0)
+        self.assertIsNone(geometry["bad"])
+        self.assertNotIn(b"e-", expected[0])
+        if serialization.set_backend("orjson") != "orjson":
+            self.skipTest("orjson no está instalado")
+        self.assertEqual(
+            [
+                serialization.dumps(data).encode("utf-8"),
+                serialization.dumps(data, indent=None).encode("utf-8"),
+            ],
+            expected,
+        )
+
+
+class FakeGeolocator:
+    """Geolocalizador de prueba: responde con Nominatim raw y cuenta las consultas."""
+
+    class Location:
+        def __init__(self, raw):
+            self.raw = raw
+
+    def __init__(self):
+        self.queries = []
+
+    def geocode(self, query, **kwargs):
+        self.queries.append(query)
+        if "Colomos" not in query:
+            return None
+        return self.Location(
+            {
+                "display_name": "Guadalajara, Jalisco, México",
+                "address": {
+                    "city": "Guadalajara",
+                    "state": "Jalisco",
+                    "country": "México",
+                    "country_code": "mx",
+                },
+            }
+        )
+
+
+class TestGeocoding(unittest.TestCase):
+    """Tests para el motor de geocodificación (geocoding.py)."""
+
+    def make(self, location):
+        event = Event()
+        event.add("summary", "Python Meetup")
+        event.add("location", location)
+        event.add("dtstart", datetime(2024, 3, 15, 18, 0, 0, tzinfo=tz.UTC))
+        return EventNormalized(event, "https://example.com/feed.ics")
+
+    def test_token_bucket(self):
+        """Las ráfagas pasan sin esperar; después se respeta la tasa."""
+        bucket = TokenBucket(rate=50, capacity=3)
+        started = time.monotonic()
+        for _ in range(3):
+            bucket.acquire()
+        self.assertLess(time.monotonic() - started, 0.02)
+        for _ in range(5):
+            bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+
+    def test_engine_fallbacks_and_cache(self):
+        """Consultas únicas por nivel, fallbacks, cache compartido y eventos geocodificados."""
+        geolocator = FakeGeolocator()
+        cache = {}
+        engine = GeocodingEngine(
+            cache, workers=2, provider="google", geolocator=geolocator
+        )
+        events = [
+            self.make("Sala 3, Colomos, Providencia"),
+            self.make("Sala 3, Colomos, Providencia"),
+            self.make("Auditorio, Centro, Tequila"),
+            # Lo resuelve el gazetteer offline: no llega al proveedor
+            self.make("Wizeline, 44160 Guadalajara, Jal., Mexico"),
+        ]
+        geocoded = engine.geocode_events(events)
+
+        self.assertEqual(len(geocoded), 3)
+        self.assertEqual(events[0].state_code, "MX-JAL")
+        self.assertEqual(events[0].city, "Guadalajara")
+        self.assertEqual(events[3].city, "Guadalajara")
+        self.assertEqual(
+            engine.cache.get("Sala 3, Colomos, Providencia")["address"]["city"],
+            "Guadalajara",
+        )
+        self.assertEqual(engine.cache.get("Auditorio, Centro, Tequila"), {})
+        self.assertEqual(cache["Auditorio, Centro, Tequila"]["_cache"]["misses"], 1)
+        # Cada consulta única (incluidos los fallbacks) va una sola vez al proveedor
+        self.assertEqual(
+            sorted(geolocator.queries),
+            [
+                "Auditorio, Centro, Tequila",
+                "Centro, Tequila",
+                "Sala 3, Colomos, Providencia",
+            ],
+        )
+        # Con cache, la segunda vez no se consulta al proveedor
+        calls = len(geolocator.queries)
+        self.assertEqual(events[2].geocode_location(engine=engine), (False, False))
+        self.assertEqual(len(geolocator.queries), calls)
+
+    def test_reverse_geocoding(self):
+        """Estado y ciudad desde coordenadas con la rejilla de puntos de referencia."""
+        index = GridIndex(
+            [(20.0, -100.0, "a"), (20.1, -100.0, "b"), (20.0, -99.0, "c")]
+        )
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.nearest(20.06, -100.0, 30), "b")
+        self.assertIsNone(index.nearest(20.0, -99.5, 30))
+
+        self.assertEqual(reverse(20.70, -103.40), ("MX-JAL", "Zapopan"))
+        self.assertEqual(reverse("19.4326", "-99.1332").city, "Ciudad de México")
+        self.assertIsNone(reverse(40.4168, -3.7038))
+        self.assertIsNone(reverse(None, None))
+
+        # Respuesta con solo el estado: la ciudad sale de las coordenadas
+        event = self.make("Auditorio Telmex")
+        event.apply_geocoding(
+            {
+                "lat": "20.6767",
+                "lon": "-103.3475",
+                "address": {"state": "Jalisco", "country_code": "mx"},
+            }
+        )
+        self.assertEqual((event.state_code, event.city), ("MX-JAL", "Guadalajara"))
+        # Con otro estado ya asignado no se toma la ciudad de las coordenadas
+        event = self.make("Auditorio, Qro., Mexico")
+        self.assertFalse(event.apply_coordinates(20.6767, -103.3475))
+        self.assertEqual((event.state_code, event.city), ("MX-QUE", ""))
+        # Las coordenadas no deciden el país: San Diego y El Paso quedan
+        # junto a Tijuana y Ciudad Juárez
+        self.assertEqual(reverse(32.7157, -117.1611).city, "Tijuana")
+        for latitude, longitude in [(32.7157, -117.1611), (31.7619, -106.4850)]:
+            event = self.make("Convention Center")
+            self.assertFalse(event.apply_coordinates(latitude, longitude))
+            self.assertEqual((event.country_code, event.state_code), ("", ""))
+
+    def test_canonical_cache_keys(self):
+        """Variantes de acentos/mayúsculas/puntuación comparten entrada del cache."""
+        self.assertEqual(
+            canonical_query("Zapopan,  Jal., México"),
+            canonical_query("zapopan, jal, Mexico"),
+        )
+        raw = {"address": {"city": "Zapopan"}}
+
+        cache = GeocodingCache({"Zapopan, Jal., México": raw, "Colomos": {}})
+        self.assertEqual(cache.get("ZAPOPAN, JAL, MEXICO"), raw)
+        self.assertEqual(cache.get("colomos"), {})
+        self.assertIsNone(cache.get("Tlaquepaque"))
+
+        path = os.path.join(tempfile.mkdtemp(), "geocache.sqlite")
+        store = SQLiteGeocodingCache(path)
+        self.assertEqual(
+            store.import_dict({"Zapopan, Jal., Mexico": {}, **cache.data}), 2
+        )
+        store.set("Tlaquepaque, Jalisco", {})
+        store.close()
+
+        store = SQLiteGeocodingCache(path)
+        self.assertEqual(len(store), 3)
+        self.assertEqual(store.get("zapopan jal mexico"), raw)
+        self.assertEqual(store.get("Tlaquepaque, Jalisco"), {})
+        self.assertIsNone(store.get("Tonalá"))
+        store.close()
+
+    def test_cache_ttl_and_negative_backoff(self):
+        """Las búsquedas vacías vencen con backoff; las vencidas se reintentan y se podan."""
+        now = datetime(2026, 6, 1, tzinfo=tz.UTC)
+        negative = CacheEntry({}, datetime(2026, 5, 20, tzinfo=tz.UTC), misses=1)
+        self.assertFalse(is_fresh(negative, now))
+        self.assertTrue(is_fresh(negative._replace(misses=2), now))
+        self.assertFalse(is_fresh(CacheEntry({}, None), now))
+        self.assertTrue(is_fresh(CacheEntry({"address": {}}, None), now))
+        stale = CacheEntry({"address": {}}, datetime(2025, 5, 1, tzinfo=tz.UTC))
+        self.assertFalse(is_fresh(stale, now))
+
+        # Negativa vencida: se vuelve a consultar y suma un fallo
+        cache = {"Auditorio, Zapopan": {}}
+        geolocator = FakeGeolocator()
+        engine = GeocodingEngine(cache, provider="google", geolocator=geolocator)
+        self.assertEqual(engine.lookup("Auditorio, Zapopan"), ({}, True))
+        self.assertEqual(engine.lookup("Auditorio, Zapopan"), ({}, False))
+        self.assertEqual(cache["Auditorio, Zapopan"]["_cache"]["misses"], 1)
+        self.assertEqual(engine.stats, {"hits": 1, "misses": 0, "expired": 1})
+
+        # Positiva vencida y el proveedor falla: se sigue usando
+        class BrokenGeolocator:
+            def geocode(self, query, **kwargs):
+                raise GeocoderServiceError("down")
+
+        old = {"address": {"city": "Guadalajara"}}
+        cache = GeocodingCache()
+        cache.set("Colomos", old, cached_at=datetime(2020, 1, 1, tzinfo=tz.UTC))
+        engine = GeocodingEngine(
+            cache, provider="google", geolocator=BrokenGeolocator()
+        )
+        self.assertEqual(engine.resolve(["Colomos"]), {"Colomos": old})
+
+        # Un timeout se tolera; un error de programación no se esconde
+        class RaisingGeolocator:
+            def __init__(self, error):
+                self.error = error
+
+            def geocode(self, query, **kwargs):
+                raise self.error
+
+        engine = GeocodingEngine(
+            GeocodingCache(),
+            provider="google",
+            geolocator=RaisingGeolocator(TimeoutError("timed out")),
+        )
+        self.assertEqual(engine.resolve(["Tlaquepaque"]), {"Tlaquepaque": None})
+        engine = GeocodingEngine(
+            GeocodingCache(),
+            provider="google",
+            geolocator=RaisingGeolocator(KeyError("raw")),
+        )
+        with self.assertRaises(KeyError):
+            engine.resolve(["Tlaquepaque"])
+
+        cache.set("Centro", {})
+        self.assertEqual(cache.prune(), 1)
+        self.assertEqual(list(cache.data), ["Centro"])
+
+        store = SQLiteGeocodingCache(os.path.join(tempfile.mkdtemp(), "geo.sqlite"))
+        store.set("Colomos", old, cached_at=datetime(2020, 1, 1, tzinfo=tz.UTC))
+        store.set("Centro", {})
+        self.assertEqual(store.prune(dry_run=True), 1)
+        self.assertEqual(len(store), 2)
+        self.assertEqual(store.prune(), 1)
+        self.assertIsNone(store.get("colomos"))
+        self.assertEqual(store.get("Centro"), {})
+        store.close()
+
+
+class TestHistoryManager(unittest.TestCase):
+    """Tests para el historial y su índice de deduplicación."""
+
+    def make(self, summary, hour, minute, url):
+        event = Event()
+        event.add("summary", summary)
+        event.add("dtstart", datetime(2024, 3, 15, hour, minute, 0, tzinfo=tz.UTC))
+        event.add("url", url)
+        return EventNormalized(event, "https://example.com/feed.ics", "Python CDMX")
+
+    def test_replace_event_key_collision(self):
+        """Si la llave re-normalizada ya es de otro evento, se fusionan y queda en la traza."""
+        history = HistoryManager(os.path.join(tempfile.mkdtemp(), "history.json"))
+        history.load_history()
+        fastapi = self.make(
+            "Intro a FastAPI", 18, 0, "https://lu.ma/event/evt-introfastapi"
+        )
+        django = self.make(
+            "Taller de Django", 21, 0, "https://lu.ma/event/evt-tallerdjango"
+        )
+        history.merge_events([fastapi, django])
+
+        renamed = self.make(
+            "Taller de Django", 21, 0, "https://lu.ma/event/evt-introfastapi"
+        )
+        key = history.replace_event(fastapi.hash_key, renamed)
+        self.assertEqual(key, django.hash_key)
+        self.assertEqual(list(history.events), [django.hash_key])
+        urls = {s["url"] for s in history.events[key]["sources"]}
+        self.assertEqual(
+            urls,
+            {
+                "https://lu.ma/event/evt-introfastapi",
+                "https://lu.ma/event/evt-tallerdjango",
+            },
+        )
+        self.assertEqual(history.merge_trace[-1]["match"], "rekey")
+        self.assertEqual(
+            history.merge_trace[-1]["merged"][0]["hash_key"], fastapi.hash_key
+        )
+        # Las llaves de los dos eventos apuntan al registro fusionado
+        self.assertEqual(history.dedup_index.match(django)[0], key)
+        self.assertEqual(history.dedup_index.match(fastapi)[0], key)
+
+    def test_dedup_index_rename_remove(self):
+        """rename/remove/retain mueven o quitan solo las llaves del id (mapa inverso)."""
+        index = DedupIndex()
+        fastapi = self.make(
+            "Intro a FastAPI", 18, 0, "https://lu.ma/event/evt-introfastapi"
+        )
+        django = self.make(
+            "Taller de Django", 21, 0, "https://lu.ma/event/evt-tallerdjango"
+        )
+        index.add("a", fastapi)
+        index.add("b", django)
+
+        index.rename("a", "c")
+        self.assertEqual(index.match(fastapi), ("c", "hash"))
+        self.assertNotIn("a", set(index.keys.values()))
+
+        index.remove("c")
+        self.assertEqual(set(index.keys.values()), {"b"})
+        self.assertEqual(index.match(fastapi), ("", ""))
+
+        # Una llave que pasa a otro id deja de contarse como del anterior
+        index.add("c", fastapi)
+        moved = self.make(
+            "Intro a FastAPI", 18, 0, "https://lu.ma/event/evt-tallerdjango"
+        )
+        index.add("c", moved)
+        index.remove("b")
+        self.assertEqual(index.match(django), ("c", "url"))
+
+        self.assertEqual(index.retain(["b"]), 1)
+        self.assertEqual(index.keys, {})
+
+    def test_incremental_dedup_index(self):
+        """Los eventos nuevos se comparan contra el índice persistido del historial."""
+        history_file = os.path.join(tempfile.mkdtemp(), "history.json")
+
+        history = HistoryManager(history_file)
+        history.load_history()
+        history.merge_events(
+            [
+                self.make(
+                    "Intro a FastAPI", 17, 59, "https://lu.ma/event/evt-introfastapi"
+                )
+            ]
+        )
+        history.save_history()
+        self.assertTrue(os.path.exists(history.dedup_index_file))
+
+        # Siguiente corrida: misma sesión al otro lado del corte de bloque,
+        # copia con el título escrito distinto en otra plataforma y una sesión
+        # de continuación que no es el mismo evento
+        history = HistoryManager(history_file)
+        history.load_history()
+        self.assertFalse(history.needs_full_dedup)
+        history.merge_events(
+            [
+                self.make(
+                    "Intro a FastAPI", 18, 0, "https://lu.ma/event/evt-introfastapi"
+                ),
+                self.make(
+                    "FastAPI: Intro",
+                    18,
+                    30,
+                    "https://www.meetup.com/python-cdmx/events/12/",
+                ),
+                self.make(
+                    "Intro a FastAPI avanzado",
+                    19,
+                    30,
+                    "https://www.meetup.com/python-cdmx/events/13/",
+                ),
+                self.make(
+                    "Taller de Django", 18, 0, "https://lu.ma/event/evt-tallerdjango"
+                ),
+            ]
+        )
+        self.assertEqual(len(history.events), 3)
+        self.assertEqual(len(history.merge_trace), 2)
+        merged = history.events[history.merge_trace[-1]["kept"]["hash_key"]]
+        self.assertEqual(len(merged["sources"]), 2)
+        history.save_history()
+
+        # El índice sigue al historial al recargar
+        history = HistoryManager(history_file)
+        history.load_history()
+        self.assertEqual(set(history.dedup_index.entries), set(history.events))
+
+        # Sin índice hay que deduplicar el historial completo
+        os.remove(history.dedup_index_file)
+        history = HistoryManager(history_file)
+        history.load_history()
+        self.assertTrue(history.needs_full_dedup)
+
+    def test_save_only_when_changed(self):
+        """El historial y sus archivos no se reescriben si no cambiaron."""
+        data_dir = tempfile.mkdtemp()
+        history_file = os.path.join(data_dir, "history.json")
+
+        history = HistoryManager(history_file)
+        history.merge_events(
+            [
+                self.make(
+                    "Intro a FastAPI", 18, 0, "https://lu.ma/event/evt-introfastapi"
+                )
+            ]
+        )
+        history.save_history()
+        self.assertEqual(
+            sorted(os.listdir(data_dir)), ["history.dedup_index.json", "history.json"]
+        )
+
+        history = HistoryManager(history_file)
+        history.load_history()
+        self.assertFalse(history.dirty)
+        os.utime(history_file, ns=(0, 0))
+        history.save_history()
+        self.assertEqual(os.stat(history_file).st_mtime_ns, 0)
+
+        history.merge_events(
+            [
+                self.make(
+                    "Taller de Django", 21, 0, "https://lu.ma/event/evt-tallerdjango"
+                )
+            ]
+        )
+        self.assertTrue(history.dirty)
+        history.save_history()
+        self.assertNotEqual(os.stat(history_file).st_mtime_ns, 0)
+        # Sin temporales huérfanos de la escritura atómica
+        self.assertEqual(len(os.listdir(data_dir)), 2)
+
+    def test_healing_only_for_old_records(self):
+        """Solo los registros con sellos de versión anteriores se sanan al cargar."""
+        history_file = os.path.join(tempfile.mkdtemp(), "history.json")
+        record = self.make(
+            "Intro a FastAPI", 18, 0, "https://lu.ma/event/evt-introfastapi"
+        ).to_dict()
+        self.assertTrue(is_current_record(record))
+        legacy = dict(record)
+        del legacy["schema_version"]
+        with open(history_file, "w", encoding="utf-8") as f:
+            json.dump([legacy], f)
+
+        history = HistoryManager(history_file)
+        history.load_history()
+        self.assertEqual(history.healed_count, 1)
+        self.assertTrue(history.dirty)
+        self.assertEqual(history.events[record["hash_key"]], record)
+        history.save_history()
+
+        history = HistoryManager(history_file)
+        history.load_history()
+        self.assertEqual(history.healed_count, 0)
+        self.assertFalse(history.dirty)
+
+        # Evento visto otra vez con menos ubicación: el merge guarda un registro
+        # ya sellado y repetirlo no cambia nada
+        def seen_again():
+            event = self.make(
+                "Intro a FastAPI", 18, 0, "https://lu.ma/event/evt-introfastapi"
+            )
+            event.location = ""
+            return event
+
+        history.events[record["hash_key"]]["location"] = "Wizeline, CDMX, México"
+        history.merge_events([seen_again()])
+        merged = history.events[record["hash_key"]]
+        self.assertEqual(merged["location"], "Wizeline, CDMX, México")
+        self.assertTrue(is_current_record(merged))
+        history.save_history()
+
+        history = HistoryManager(history_file)
+        history.load_history()
+        self.assertEqual(history.healed_count, 0)
+        history.merge_events([seen_again()])
+        self.assertFalse(history.dirty)
+
+    def test_heal_run_rebuilds_dedup_index(self):
+        """heal: si cambian llaves, el índice de deduplicación queda igual al historial."""
+        data_dir = tempfile.mkdtemp()
+        history_file = os.path.join(data_dir, "history.json")
+        record = self.make(
+            "Intro a FastAPI", 18, 0, "https://lu.ma/event/evt-introfastapi"
+        ).to_dict()
+        legacy = dict(record, hash_key="intro-fastapi-legacy")
+        with open(history_file, "w", encoding="utf-8") as f:
+            json.dump([legacy], f)
+
+        run = HealRun(
+            HistoryManager(history_file),
+            checkpoint_file=os.path.join(data_dir, "heal.checkpoint.json"),
+        )
+        self.assertEqual(run.run(), 1)
+
+        history = HistoryManager(history_file)
+        history.load_history()
+        self.assertEqual(list(history.events), [record["hash_key"]])
+        self.assertEqual(list(history.dedup_index.entries), [record["hash_key"]])
+        self.assertFalse(history.needs_full_dedup)
+
+    def test_heal_run(self):
+        """heal: re-normaliza todo el historial por lotes y retoma desde el checkpoint."""
+        data_dir = tempfile.mkdtemp()
+        history_file = os.path.join(data_dir, "history.json")
+        checkpoint = os.path.join(data_dir, "heal.checkpoint.json")
+        records = [
+            self.make(title, hour, 0, f"https://lu.ma/{hour}").to_dict()
+            for title, hour in [("Intro a FastAPI", 18), ("Taller de Django", 21)]
+        ]
+        # Registro guardado con ubicación incompleta (sin país homologado)
+        records[0]["state"] = "CDMX"
+        records[0]["state_code"] = "MX-CMX"
+        records[0]["country_code"] = "MX"
+        with open(history_file, "w", encoding="utf-8") as f:
+            json.dump(records, f)
+
+        dry = HealRun(
+            HistoryManager(history_file), dry_run=True, checkpoint_file=checkpoint
+        )
+        self.assertEqual(dry.run(), 1)
+        self.assertIn("country", dry.summary())
+        self.assertFalse(os.path.exists(checkpoint))
+
+        # Corrida interrumpida: el checkpoint dice que el primer registro ya se procesó
+        run = HealRun(
+            HistoryManager(history_file), batch_size=1, checkpoint_file=checkpoint
+        )
+        run._save_checkpoint({records[0]["hash_key"]})
+        self.assertEqual(run.run(), 0)
+        self.assertFalse(os.path.exists(checkpoint))
+
+        run = HealRun(
+            HistoryManager(history_file), batch_size=1, checkpoint_file=checkpoint
+        )
+        self.assertEqual(run.run(), 1)
+        history = HistoryManager(history_file)
+        history.load_history()
+        self.assertEqual(history.events[records[0]["hash_key"]]["country"], "México")
+
+        # El tope es de intentos; solo cuentan como geocodificados los que sí lo fueron
+        run = HealRun(HistoryManager(history_file), max_geocode_attempts=2)
+        run._engine = GeocodingEngine(
+            {}, provider="google", geolocator=FakeGeolocator()
+        )
+        results = []
+        for title, location in [
+            ("Intro a FastAPI", "Bosque Los Colomos"),
+            ("Taller de Django", "Foro Tequila"),
+            ("Taller de Flask", "Bosque Los Colomos"),
+        ]:
+            event = self.make(title, 18, 0, "https://example.com")
+            event.location = location
+            results.append(event.to_dict())
+        self.assertEqual(list(run._geocode(results)), [0])
+        self.assertEqual((run.geocode_attempts, run.geocoded), (2, 1))
+
+    def test_changelog(self):
+        """Bitácora JSONL: los cambios se agregan y el snapshot solo se reescribe al compactar."""
+        data_dir = tempfile.mkdtemp()
+        history_file = os.path.join(data_dir, "history.json")
+
+        history = HistoryManager(history_file, changelog=True)
+        history.merge_events(
+            [
+                self.make(
+                    "Intro a FastAPI", 18, 0, "https://lu.ma/event/evt-introfastapi"
+                )
+            ]
+        )
+        history.save_history()
+
+        history = HistoryManager(history_file, changelog=True)
+        history.load_history()
+        history.merge_events(
+            [
+                self.make(
+                    "Taller de Django", 21, 0, "https://lu.ma/event/evt-tallerdjango"
+                )
+            ]
+        )
+        history.save_history()
+        with open(history_file, "r", encoding="utf-8") as f:
+            self.assertEqual(len(json.load(f)), 1)
+        self.assertEqual(len(history.backend.changelog.read()), 1)
+
+        # Al cargar se aplica la bitácora sobre el snapshot
+        history = HistoryManager(history_file, changelog=True)
+        history.load_history()
+        self.assertEqual(len(history.events), 2)
+
+        # Compactación por tamaño: snapshot completo y bitácora rotada
+        history.backend.changelog.max_bytes = 0
+        history.merge_events(
+            [self.make("Taller de Flask", 23, 0, "https://lu.ma/event/evt-tallerflask")]
+        )
+        history.save_history()
+        with open(history_file, "r", encoding="utf-8") as f:
+            self.assertEqual(len(json.load(f)), 3)
+        self.assertFalse(history.backend.changelog.path.exists())
+        self.assertTrue(history.backend.changelog.previous_path.exists())
+
+    def test_partitioned_history(self):
+        """Historial por mes: los meses antiguos se abren solo cuando se necesitan."""
+        data_dir = tempfile.mkdtemp()
+        history_file = os.path.join(data_dir, "history.json")
+
+        history = HistoryManager(history_file, partitioned=True)
+        history.load_history()
+        history.merge_events(
+            [
+                self.make(
+                    "Intro a FastAPI", 18, 0, "https://lu.ma/event/evt-introfastapi"
+                ),
+                self.make(
+                    "Taller de Django", 21, 0, "https://lu.ma/event/evt-tallerdjango"
+                ),
+            ]
+        )
+        history.save_history()
+        self.assertFalse(os.path.exists(history_file))
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(data_dir, "history"))),
+            ["2024-03.json", "manifest.json"],
+        )
+
+        # Marzo de 2024 queda fuera de la ventana caliente: no se carga
+        history = HistoryManager(history_file, partitioned=True)
+        history.load_history()
+        self.assertEqual(len(history.events), 0)
+        self.assertEqual(history.get_events(start="2025-01-01T00:00:00Z"), [])
+        self.assertEqual(len(history.events), 0)
+
+        # Un evento de ese mes abre la partición y se fusiona por URL
+        history.merge_events(
+            [
+                self.make(
+                    "FastAPI desde cero", 18, 0, "https://lu.ma/event/evt-introfastapi"
+                )
+            ]
+        )
+        self.assertEqual(len(history.events), 2)
+        history.save_history()
+
+        history = HistoryManager(history_file, partitioned=True)
+        history.load_history()
+        self.assertEqual(len(history.get_all_events()), 2)
+        history.export_history()
+        with open(history_file, "r", encoding="utf-8") as f:
+            self.assertEqual(len(json.load(f)), 2)
+
+    def test_retention_tiers(self):
+        """Niveles de retención: descripción recortada (tibio) y archivo comprimido (frío)."""
+        data_dir = tempfile.mkdtemp()
+        history_file = os.path.join(data_dir, "history.json")
+        archive_dir = os.path.join(data_dir, "history.archive")
+
+        history = HistoryManager(history_file, warm_days=30, warm_description_chars=20)
+        history.load_history()
+        event = self.make(
+            "Intro a FastAPI", 18, 0, "https://lu.ma/event/evt-introfastapi"
+        )
+        event.description = "Una introducción práctica a FastAPI " * 10
+        history.merge_events([event])
+        history.save_history()
+        with open(history_file, "r", encoding="utf-8") as f:
+            description = json.load(f)[0]["description"]
+        self.assertLessEqual(len(description), 20)
+        self.assertTrue(description.endswith("…"))
+
+        history = HistoryManager(history_file, cold_days=365)
+        history.load_history()
+        history.merge_events(
+            [
+                self.make(
+                    "Taller de Django", 21, 0, "https://lu.ma/event/evt-tallerdjango"
+                )
+            ]
+        )
+        history.save_history()
+        with open(history_file, "r", encoding="utf-8") as f:
+            self.assertEqual(json.load(f), [])
+        self.assertEqual(os.listdir(archive_dir), ["2024.jsonl.gz"])
+
+        # El archivo frío no se abre para ventanas recientes
+        history = HistoryManager(history_file, cold_days=365)
+        history.load_history()
+        self.assertEqual(history.get_events(start="2026-01-01T00:00:00Z"), [])
+        self.assertEqual(len(history.events), 0)
+
+        # Un evento de esas fechas abre el archivo y se fusiona por URL
+        history.merge_events(
+            [
+                self.make(
+                    "FastAPI desde cero", 18, 0, "https://lu.ma/event/evt-introfastapi"
+                )
+            ]
+        )
+        self.assertEqual(len(history.events), 2)
+        history.save_history()
+
+        history = HistoryManager(history_file, cold_days=365)
+        history.load_history()
+        titles = sorted(e["title"] for e in history.get_all_events())
+        self.assertEqual(len(titles), 2)
+        self.assertIn("FastAPI desde cero", titles[0])
+
+    def test_cold_archive_on_demand(self):
+        """El archivo frío se abre por año y solo cuando hace falta; sin cambios no se exporta."""
+        data_dir = tempfile.mkdtemp()
+        history_file = os.path.join(data_dir, "history.json")
+        history_db = os.path.join(data_dir, "history.sqlite")
+
+        def make(summary, dtstart, url):
+            event = Event()
+            event.add("summary", summary)
+            event.add("dtstart", dtstart)
+            event.add("url", url)
+            return EventNormalized(event, "https://example.com/feed.ics", "Python CDMX")
+
+        def open_history():
+            history = HistoryManager(history_file, history_db=history_db, cold_days=365)
+            opened = []
+            read = history.archive.read
+            history.archive.read = lambda year: opened.append(year) or read(year)
+            history.load_history()
+            return history, opened
+
+        history, _ = open_history()
+        history.merge_events(
+            [
+                make(
+                    "Intro a FastAPI",
+                    datetime(2023, 3, 15, 18, 0, tzinfo=tz.UTC),
+                    "https://lu.ma/event/evt-introfastapi",
+                ),
+                self.make(
+                    "Taller de Django", 21, 0, "https://lu.ma/event/evt-tallerdjango"
+                ),
+                make(
+                    "Taller de Flask",
+                    datetime.now(tz.UTC) + timedelta(days=30),
+                    "https://lu.ma/event/evt-tallerflask",
+                ),
+            ]
+        )
+        history.save_history()
+        history.export_history()
+        self.assertEqual(history.archive.years(), ["2023", "2024"])
+        self.assertEqual(history.backend.store.count(), 1)
+
+        # Corrida normal: un evento reciente no abre el archivo y, sin cambios
+        # en el historial, history.json no se vuelve a exportar
+        history, opened = open_history()
+        history.get_events(start=history.live_start)
+        history.save_history()
+        exported = []
+        history.backend.read_all = lambda: exported.append(True) or []
+        history.export_history()
+        self.assertEqual(opened, [])
+        self.assertEqual(exported, [])
+
+        # Un evento de 2024 solo abre ese año
+        history, opened = open_history()
+        history.merge_events(
+            [
+                self.make(
+                    "Django desde cero", 21, 0, "https://lu.ma/event/evt-tallerdjango"
+                )
+            ]
+        )
+        self.assertEqual(opened, ["2024"])
+        history.save_history()
+        self.assertEqual(opened, ["2024"])
+
+    def test_sqlite_store(self):
+        """Historial en SQLite: upserts por llave, lectura por mes y exportación."""
+        data_dir = tempfile.mkdtemp()
+        history_file = os.path.join(data_dir, "history.json")
+        history_db = os.path.join(data_dir, "history.sqlite")
+
+        history = HistoryManager(history_file, history_db=history_db)
+        history.load_history()
+        history.merge_events(
+            [
+                self.make(
+                    "Intro a FastAPI", 18, 0, "https://lu.ma/event/evt-introfastapi"
+                ),
+                self.make(
+                    "Taller de Django", 21, 0, "https://lu.ma/event/evt-tallerdjango"
+                ),
+            ]
+        )
+        key = next(iter(history.events))
+        history.events[key]["state_code"] = "MX-CMX"
+        history.save_history()
+        self.assertFalse(os.path.exists(history_file))
+        self.assertEqual(history.backend.store.count(), 2)
+
+        history = HistoryManager(history_file, history_db=history_db)
+        history.load_history()
+        # Marzo de 2024 es un mes frío: no se lee al cargar
+        self.assertEqual(history.events, {})
+        self.assertEqual(len(history.get_events(state_code="MX-CMX")), 1)
+        self.assertEqual(len(history.events), 2)
+        # 21:00Z = 15:00 en CDMX: la ventana se compara en UTC
+        window = history.get_events(start="2024-03-15T14:00:00-06:00")
+        self.assertEqual(len(window), 1)
+        self.assertIn("Django", window[0]["title"])
+
+        # La exportación se lee de la base, sin cargar los meses fríos
+        history = HistoryManager(history_file, history_db=history_db)
+        history.load_history()
+        history.export_history()
+        self.assertEqual(history.events, {})
+        with open(history_file, "r", encoding="utf-8") as f:
+            self.assertEqual(len(json.load(f)), 2)
+
 
 class TestICSAggregator(unittest.TestCase):
     """Tests para la clase ICSAggregator."""
@@ -79,6 +1232,47 @@ class TestICSAggregator(unittest.TestCase):
         self.assertEqual(aggregator.timeout, 30)
         self.assertEqual(aggregator.max_retries, 2)
 
+    def test_live_window_skips_cold_partitions(self):
+        """Una corrida normal con particiones no abre los meses fríos."""
+        history_file = os.path.join(tempfile.mkdtemp(), "history.json")
+        upcoming = datetime.now(tz.UTC) + timedelta(days=30)
+
+        def make(summary, dtstart, url):
+            event = Event()
+            event.add("summary", summary)
+            event.add("dtstart", dtstart)
+            event.add("url", url)
+            return EventNormalized(event, "https://example.com/feed.ics", "Python CDMX")
+
+        history = HistoryManager(history_file, partitioned=True)
+        history.load_history()
+        history.merge_events(
+            [
+                make(
+                    "Intro a FastAPI",
+                    datetime(2024, 3, 15, 18, 0, tzinfo=tz.UTC),
+                    "https://lu.ma/event/evt-introfastapi",
+                ),
+                make(
+                    "Taller de Django", upcoming, "https://lu.ma/event/evt-tallerdjango"
+                ),
+            ]
+        )
+        history.save_history()
+
+        aggregator = ICSAggregator(fast_mode=True)
+        aggregator.history_manager = HistoryManager(history_file, partitioned=True)
+        backend = aggregator.history_manager.backend
+        opened = []
+        read_unit = backend.read_unit
+        backend.read_unit = lambda unit: opened.append(unit) or read_unit(unit)
+
+        events = aggregator._aggregate_feeds([], None)
+        self.assertEqual(
+            [e.url for e in events], ["https://lu.ma/event/evt-tallerdjango"]
+        )
+        self.assertNotIn("2024-03", opened)
+
     def test_deduplicate_events(self):
         """Test de deduplicación de eventos."""
         aggregator = ICSAggregator()
@@ -103,6 +1297,149 @@ class TestICSAggregator(unittest.TestCase):
         # Debe ser el que tiene URL (prioridad)
         self.assertTrue(deduplicated[0].url.startswith("http"))
 
+    def test_deduplicate_across_hash_buckets(self):
+        """Test de duplicados separados por el corte de los bloques de 2 horas."""
+        aggregator = ICSAggregator(fuzzy_dedup=False)
+
+        def make(hour, minute):
+            event = Event()
+            event.add("summary", "Python Meetup")
+            event.add("dtstart", datetime(2024, 3, 15, hour, minute, 0, tzinfo=tz.UTC))
+            return EventNormalized(event, "https://example.com/feed.ics")
+
+        # 17:59Z y 18:00Z caen en bloques distintos pero son el mismo evento
+        boundary = [make(17, 59), make(18, 0)]
+        self.assertNotEqual(boundary[0].hash_key, boundary[1].hash_key)
+        self.assertEqual(len(aggregator.deduplicate_events(boundary)), 1)
+
+        # Dos sesiones a exactamente 2 horas siguen separadas
+        sessions = [make(16, 0), make(18, 0)]
+        self.assertEqual(len(aggregator.deduplicate_events(sessions)), 2)
+
+        # Una serie cada hora no se encadena: ningún grupo abarca 2 horas o más
+        series = [make(hour, 0) for hour in range(9, 18)]
+        groups = group_duplicates(series)
+        self.assertEqual(len(groups), 5)
+        for group in groups:
+            starts = [event.dtstart for event in group]
+            self.assertLess(max(starts) - min(starts), timedelta(hours=2))
+
+    def test_deduplicate_by_uid_and_url(self):
+        """Test de duplicados por UID / URL canónica aunque cambie el título."""
+        aggregator = ICSAggregator(fuzzy_dedup=False)
+
+        def make(summary, day, uid=None, url=None):
+            event = Event()
+            event.add("summary", summary)
+            event.add("dtstart", datetime(2024, 3, day, 18, 0, 0, tzinfo=tz.UTC))
+            if uid:
+                event.add("uid", uid)
+            if url:
+                event.add("url", url)
+            return EventNormalized(event, "https://example.com/feed.ics")
+
+        by_url = [
+            make(
+                "Intro a FastAPI",
+                15,
+                url="https://www.meetup.com/python-cdmx/events/1/",
+            ),
+            make(
+                "Taller: FastAPI desde cero",
+                15,
+                url="https://meetup.com/python-cdmx/events/1?utm_source=luma",
+            ),
+        ]
+        self.assertEqual(len(aggregator.deduplicate_events(by_url)), 1)
+
+        by_uid = [
+            make("Intro a FastAPI", 15, uid="evt-1"),
+            make("FastAPI 101", 15, uid="evt-1"),
+        ]
+        self.assertEqual(len(aggregator.deduplicate_events(by_uid)), 1)
+
+        # Recurrencias con el mismo UID en días distintos no se unen
+        recurring = [
+            make("Intro a FastAPI", 15, uid="evt-2"),
+            make("FastAPI 101", 22, uid="evt-2"),
+        ]
+        self.assertEqual(len(aggregator.deduplicate_events(recurring)), 2)
+
+        # La página de un calendario de Luma no identifica a un evento
+        by_calendar = [
+            make("Intro a FastAPI", 15, url="https://lu.ma/cdmx-tech"),
+            make("Taller de Django", 15, url="https://luma.com/cdmx-tech"),
+        ]
+        self.assertEqual(len(aggregator.deduplicate_events(by_calendar)), 2)
+        self.assertEqual(
+            event_url_key("https://luma.com/event/evt-AbC123"),
+            "lu.ma/event/evt-AbC123",
+        )
+        # Los ids de Luma distinguen mayúsculas: no son la misma página
+        self.assertNotEqual(
+            event_url_key("https://lu.ma/event/evt-AbC123"),
+            event_url_key("https://lu.ma/event/evt-abc123"),
+        )
+
+        # El historial reconoce la actualización de un evento conocido por su UID
+        history = HistoryManager(os.path.join(tempfile.mkdtemp(), "history.json"))
+        history.merge_events([by_uid[0]])
+        history.merge_events([by_uid[1]])
+        self.assertEqual(len(history.events), 1)
+        self.assertIn(by_uid[1].hash_key, history.events)
+
+    def test_fuzzy_deduplicate_events(self):
+        """Test de deduplicación difusa: mismo evento con títulos distintos."""
+        aggregator = ICSAggregator()
+
+        def make(summary, minute, url):
+            event = Event()
+            event.add("summary", summary)
+            event.add("dtstart", datetime(2024, 3, 15, 18, minute, 0, tzinfo=tz.UTC))
+            event.add("url", url)
+            return EventNormalized(event, "https://example.com/feed.ics", "Python CDMX")
+
+        events = [
+            make(
+                "Python CDMX: Intro a FastAPI",
+                0,
+                "https://www.meetup.com/python-cdmx/events/1/",
+            ),
+            make(
+                "Intro a FastAPI - Python CDMX",
+                30,
+                "https://lu.ma/event/evt-introfastapi",
+            ),
+            # Variante con tokens propios en ambos títulos: no es el mismo evento
+            make("Taller de Django", 0, "https://lu.ma/event/evt-tallerdjango"),
+            make("Taller de Flask", 0, "https://lu.ma/event/evt-tallerflask"),
+        ]
+        self.assertNotEqual(events[0].hash_key, events[1].hash_key)
+
+        deduplicated = aggregator.deduplicate_events(events)
+
+        self.assertEqual(len(deduplicated), 3)
+        self.assertEqual(len(deduplicated[0].sources), 2)
+        self.assertEqual(len(aggregator.dedup_trace), 1)
+        self.assertEqual(len(aggregator.dedup_trace[0]["merged"]), 1)
+
+        self.assertEqual(
+            len(ICSAggregator(fuzzy_dedup=False).deduplicate_events(events)), 4
+        )
+
+        # Una sesión que contiene el título de otra, o el siguiente número de
+        # una serie, no son el mismo evento
+        for titles in [
+            ("Taller de Python", "Taller de Python avanzado"),
+            ("Meetup #12: Intro a FastAPI", "Intro a FastAPI"),
+            ("Python Meetup #12", "Python Meetup #13"),
+        ]:
+            events = [
+                make(titles[0], 0, "https://www.meetup.com/python-cdmx/events/1/"),
+                make(titles[1], 30, "https://lu.ma/event/evt-introfastapi"),
+            ]
+            self.assertEqual(len(ICSAggregator().deduplicate_events(events)), 2, titles)
+
     def test_extract_luma_link(self):
         """Test de extracción de link de Luma desde la descripción."""
         event = Event()
@@ -174,6 +1511,30 @@ class TestCommunityURLExtraction(unittest.TestCase):
             detect_platform_from_url("https://other-site.com/events"), "website"
         )
 
+    def test_canonical_url(self):
+        """Test de URL canónica para comparar eventos entre plataformas."""
+        self.assertEqual(
+            canonical_url(
+                "https://www.meetup.com/Python-CDMX/events/123/?utm_source=x"
+            ),
+            "meetup.com/events/123",
+        )
+        self.assertEqual(
+            canonical_url("https://LUMA.com/Intro-FastAPI#tickets"),
+            "lu.ma/Intro-FastAPI",
+        )
+        self.assertEqual(
+            canonical_url(
+                "https://www.eventbrite.com.mx/e/taller-python-987654?aff=ebdssbdestsearch"
+            ),
+            "eventbrite.com/e/987654",
+        )
+        self.assertEqual(
+            canonical_url("http://example.com:8080/evento/?b=2&a=1&fbclid=z"),
+            "example.com/evento?a=1&b=2",
+        )
+        self.assertEqual(canonical_url(""), "")
+
     def test_get_platform_label(self):
         """Test de etiquetas de plataforma para comunidades."""
         self.assertEqual(get_platform_label_for_community("meetup"), "Meetup")
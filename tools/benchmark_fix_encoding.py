@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: fix_encoding actual (una pasada) vs. la implementación anterior
+(cadena de `in` + `str.replace` por cada entrada de la tabla).
+
+Usa como corpus los textos reales de data/history.json y data/geocoding_cache.json
+más algunos casos de mojibake, verifica que ambas versiones den el mismo resultado
+y mide el tiempo de cada una.
+
+Uso:
+    python tools/benchmark_fix_encoding.py [--rounds 20]
+"""
+
+import argparse
+import json
+import re
+import sys
+import timeit
+from pathlib import Path
+
+# Add src to path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+from cronquiles.models import MOJIBAKE_REPLACEMENTS, fix_encoding
+
+
+def legacy_fix_encoding(text: str) -> str:
+    """Copia de fix_encoding antes de la versión de una sola pasada."""
+    if not isinstance(text, str) or not text:
+        return text
+
+    if "Ã" in text:
+        try:
+            return text.encode("latin-1").decode("utf-8")
+        except (UnicodeEncodeError, UnicodeDecodeError):
+            pass
+
+    replacements = MOJIBAKE_REPLACEMENTS
+    if any(c in text for c in replacements.keys()):
+        for corrupted, clean in replacements.items():
+            text = text.replace(corrupted, clean)
+
+    if "�" in text:
+        text = text.replace("�", "")
+        if re.search(r"[一-鿿]", text):
+            occidental = len(re.findall(r"[a-zA-ZáéíóúñÁÉÍÓÚÑ]", text))
+            if occidental > 5:
+                text = re.sub(r"[一-鿿]", "", text)
+
+    return text.strip()
+
+
+def load_corpus():
+    corpus = [
+        "CariÃ±o en MÃ©xico",
+        "M茅xico, Quer茅taro",
+        "Le√≥n, Guanajuato",
+        "P.¬∫ de la Reforma 222",
+        "Taller de Python � en CDMX 铆",
+        "  Guadalajara, Jal.  ",
+    ]
+    history_file = project_root / "data" / "history.json"
+    if history_file.exists():
+        with open(history_file, "r", encoding="utf-8") as f:
+            for event in json.load(f):
+                for field in ("title", "description", "location", "address"):
+                    if event.get(field):
+                        corpus.append(event[field])
+    cache_file = project_root / "data" / "geocoding_cache.json"
+    if cache_file.exists():
+        with open(cache_file, "r", encoding="utf-8") as f:
+            corpus.extend(json.load(f).keys())
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    # Copias frescas (str puro) para que la marca de texto limpio no afecte la 1ª pasada
+    corpus = [str(t) for t in load_corpus()]
+
+    mismatches = [t for t in corpus if fix_encoding(t) != legacy_fix_encoding(t)]
+    print(f"Corpus: {len(corpus)} textos, diferencias: {len(mismatches)}")
+    for t in mismatches[:5]:
+        print(f"  {t[:60]!r}")
+
+    def run(fn, texts):
+        for t in texts:
+            fn(t)
+
+    # Escenario real: el mismo texto pasa varias veces (limpieza iCal, título, to_ical_event)
+    already_fixed = [fix_encoding(t) for t in corpus]
+
+    results = {
+        "anterior (texto crudo)": timeit.timeit(
+            lambda: run(legacy_fix_encoding, corpus), number=args.rounds
+        ),
+        "actual (texto crudo)": timeit.timeit(
+            lambda: run(fix_encoding, corpus), number=args.rounds
+        ),
+        "anterior (texto ya corregido)": timeit.timeit(
+            lambda: run(legacy_fix_encoding, already_fixed), number=args.rounds
+        ),
+        "actual (texto ya corregido)": timeit.timeit(
+            lambda: run(fix_encoding, already_fixed), number=args.rounds
+        ),
+    }
+    for name, seconds in results.items():
+        per_call = seconds / (args.rounds * len(corpus)) * 1e6
+        print(f"{name:32s} {seconds * 1000:8.1f} ms  ({per_call:.2f} µs/llamada)")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Genera src/cronquiles/data/mx_gazetteer.json (ver gazetteer.py).
+
+Ejecutar de nuevo al cambiar MUNICIPALITIES/STATE_ABBREVIATIONS/MUNICIPALITY_SEATS
+o para sumar las colonias y coordenadas nuevas del cache de geocodificación.
+
+Uso:
+    python tools/build_gazetteer.py [--cache data/geocoding_cache.json]
+"""
+
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+# Add src to path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+from cronquiles.gazetteer import GAZETTEER_FILE, build_gazetteer
+from cronquiles.storage import JSONFile
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+
+def main(cache_file="data/geocoding_cache.json"):
+    gazetteer = build_gazetteer(JSONFile(cache_file).load() or {})
+    GAZETTEER_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(GAZETTEER_FILE, "w", encoding="utf-8") as f:
+        json.dump(gazetteer, f, ensure_ascii=False, separators=(",", ":"))
+        f.write("\n")
+
+    logger.info(
+        f"Gazetteer generado en {GAZETTEER_FILE} "
+        f"({len(gazetteer['states'])} llaves de estado, "
+        f"{len(gazetteer['municipalities'])} de municipio, "
+        f"{len(gazetteer['colonias'])} de colonia)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--cache", default="data/geocoding_cache.json")
+    args = parser.parse_args()
+    main(args.cache)
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Genera src/cronquiles/data/geo_index.json a partir de pycountry.
+
+Ejecutar de nuevo cada vez que se actualice pycountry en uv.lock.
+"""
+
+import json
+import logging
+import sys
+from pathlib import Path
+
+# Add src to path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+from cronquiles.geo_index import INDEX_FILE, build_index
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+
+def main():
+    index = build_index()
+    INDEX_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(INDEX_FILE, "w", encoding="utf-8") as f:
+        # Compacto pero determinista: una entrada por línea sería más legible,
+        # pero el artefacto se regenera completo y no se edita a mano.
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+        f.write("\n")
+
+    logger.info(
+        f"Geo index generado en {INDEX_FILE} "
+        f"(pycountry {index['pycountry_version'] or '?'}: "
+        f"{len(index['countries'])} países, {len(index['subdivisions'])} subdivisiones)"
+    )
+
+
+if __name__ == "__main__":
+    main()
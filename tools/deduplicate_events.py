@@ -77,7 +77,11 @@ def deduplicate():
     logger.info(f"Final count: {len(reindexed_events)}")
 
     # Update HM internal state and save
-    hm.events = reindexed_events
+    hm.replace_events(reindexed_events)
+    # Las llaves cambiaron: el índice de deduplicación se reconstruye completo
+    hm.rebuild_dedup_index(
+        [EventNormalized.from_dict(item) for item in reindexed_events.values()]
+    )
     hm.save_history()
 
 if __name__ == "__main__":
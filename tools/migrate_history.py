@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Migra el historial a las versiones actuales de esquema y normalizador.
+
+Al cargar, HistoryManager solo sana (from_dict → to_dict) los registros con un
+sello `schema_version` / `normalizer_version` anterior. Este script lo hace de
+una vez para todo el historial (incluidas las particiones frías) y lo guarda,
+de modo que las corridas siguientes ya no pagan ese costo.
+
+Uso:
+    python tools/migrate_history.py [--history-db data/history.sqlite]
+                                    [--history-partitions] [--all] [--dry-run]
+"""
+
+import sys
+import argparse
+import logging
+from pathlib import Path
+
+# Add src to path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+from cronquiles.heal import HealRun
+from cronquiles.history_manager import HistoryManager
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+
+def migrate(
+    history_file="data/history.json",
+    history_db=None,
+    partitioned=False,
+    all_records=False,
+    dry_run=False,
+):
+    hm = HistoryManager(history_file, history_db=history_db, partitioned=partitioned)
+
+    if all_records:
+        # Volver a sanar todo aunque el sello sea el actual (ej: cambió
+        # geo_index.json sin subir NORMALIZER_VERSION): mismo healing que
+        # `cron-quiles heal` (heal_record), que también guarda y exporta
+        run = HealRun(hm, dry_run=dry_run)
+        changed = run.run()
+        logger.info(f"Re-healed {len(hm.events)} records: {changed} changed")
+        if dry_run:
+            logger.info("Dry run: nothing written.")
+        else:
+            logger.info("Done.")
+        return
+
+    hm.load_history()
+    # Abre también las particiones frías (que se sanan al abrirse)
+    events = hm.get_all_events()
+    logger.info(f"{hm.healed_count} of {len(events)} records were from older versions")
+
+    if dry_run:
+        logger.info("Dry run: nothing written.")
+        return
+    hm.save_history()
+    hm.export_history()
+    logger.info("Done.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--history", default="data/history.json")
+    parser.add_argument("--history-db", default=None)
+    parser.add_argument("--history-partitions", action="store_true")
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Volver a sanar todos los registros, no solo los de versiones anteriores",
+    )
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    migrate(
+        args.history,
+        history_db=args.history_db,
+        partitioned=args.history_partitions,
+        all_records=args.all,
+        dry_run=args.dry_run,
+    )
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Borra las entradas vencidas del cache de geocodificación.
+
+Las respuestas con resultado vencen al año de guardarse y las búsquedas sin
+resultado al terminar su backoff (ver geocoding_cache.py). Las corridas ya
+vuelven a consultar las entradas vencidas que necesitan; este script además
+las quita del archivo para que no crezca con ubicaciones que ya no aparecen.
+
+Uso:
+    python tools/prune_geocoding_cache.py [--cache data/geocoding_cache.json]
+                                          [--geocache-db data/geocoding_cache.sqlite]
+                                          [--dry-run]
+"""
+
+import sys
+import argparse
+import logging
+from pathlib import Path
+
+# Add src to path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+from cronquiles.geocoding_cache import GeocodingCache, SQLiteGeocodingCache
+from cronquiles.storage import JSONFile
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+
+def prune(cache_file="data/geocoding_cache.json", geocache_db=None, dry_run=False):
+    if geocache_db:
+        cache = SQLiteGeocodingCache(geocache_db)
+        total = len(cache)
+        pruned = cache.prune(dry_run=dry_run)
+        cache.close()
+        logger.info(f"{pruned} of {total} entries in {geocache_db} are stale")
+        if dry_run:
+            logger.info("Dry run: nothing written.")
+        else:
+            logger.info("Done.")
+        return
+
+    json_file = JSONFile(cache_file)
+    cache = GeocodingCache(json_file.load() or {})
+    total = len(cache)
+    pruned = cache.prune()
+    logger.info(f"{pruned} of {total} entries in {cache_file} are stale")
+    if dry_run:
+        logger.info("Dry run: nothing written.")
+        return
+    if json_file.save(cache.data):
+        logger.info("Done.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--cache", default="data/geocoding_cache.json")
+    parser.add_argument("--geocache-db", default=None)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    prune(args.cache, geocache_db=args.geocache_db, dry_run=args.dry_run)
@@ -17,8 +17,8 @@ def sort_history():
     logger.info("Sorting history via HistoryManager...")
     hm = HistoryManager("data/history.json")
     hm.load_history()
-    # Save triggers the sort
-    hm.save_history()
+    # Save triggers the sort (force: aunque no haya eventos modificados)
+    hm.save_history(force=True)
     logger.info("Done.")
 
 if __name__ == "__main__":